@@ -0,0 +1,75 @@
+"""Bills per minute of the Bill Auditor's batch mode at 1, 4 and 8 workers, over a stub Langflow.
+
+    python batch_load_test.py --bills 24 --workers 1 4 8 --latency 1.0
+
+Each bill runs what a batch-mode job runs in code.py (bill_audit_task): hash
+and read the upload, the local rate, duplicate and unbundling checks, then the
+model audit, as one job on a JobQueue "batch" lane of --workers threads. The
+stub from load_test.py answers every audit after --latency seconds, so with
+enough workers throughput should grow with the lane's size. Every bill is
+different, so no audit comes from the response cache.
+"""
+import argparse
+import os
+import time
+
+from jobs import DONE, JobQueue
+from load_test import start_stub
+from prompts import DEFAULT_BILL_OPTIONS
+from service import ChronoService
+from uploads import NamedUpload
+
+ITEMS = [("Room Rent (General Ward) x 3 days", 12000), ("Complete Blood Count (CBC)", 1500), ("MRI Brain", 9000),
+         ("Inj. Ceftriaxone 1g x 5", 2250), ("ECG", 900), ("Consultation Charges", 1500), ("Nursing Charges", 3000)]
+
+
+def bill(n):
+    """Synthetic bill n as a text upload; the patient number keeps every bill's audit request distinct"""
+    lines = ["CITY HOSPITAL - FINAL BILL", f"Patient No: {n:06d}"]
+    lines += [f"{name} | {amount + n % 7}" for name, amount in ITEMS]
+    return NamedUpload("\n".join(lines).encode(), f"bill-{n:04d}.txt")
+
+
+def batch_rate(service, bills, workers):
+    """(bills per minute, failures) auditing bills on a batch lane of workers threads"""
+    queue = JobQueue(max_workers=1, lanes={"batch": workers})
+    options = {**DEFAULT_BILL_OPTIONS, "city": "Mumbai", "hospital_type": "Private"}
+
+    def audit(upload):
+        return service.bill([service.read_document(upload, "analyze_bill")], options)
+
+    started = time.perf_counter()
+    jobs = [queue.submit(audit, upload, lane="batch") for upload in bills]
+    for job in jobs:
+        job.wait_done()
+    elapsed = time.perf_counter() - started
+    for pool in [queue.pool, *queue.lanes.values()]:
+        pool.shutdown()
+    failures = sum(job.status != DONE or not job.result.get("success") for job in jobs)
+    return len(bills) / elapsed * 60, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure batch bill audits per minute against worker count")
+    parser.add_argument("--bills", type=int, default=24, help="bills audited per worker count (default 24)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="batch lane sizes to compare")
+    parser.add_argument("--latency", type=float, default=1.0, help="stub Langflow answer time in seconds")
+    args = parser.parse_args(argv)
+    stub = start_stub(args.latency)
+    os.environ["LANGFLOW_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}"
+    os.environ.setdefault("LANGFLOW_FLOW_BILL", "bill")
+    os.environ["LANGFLOW_POOL_SIZE"] = str(max(args.workers))
+    service = ChronoService.from_env()
+    print(f"{args.bills} bills per run, {args.latency:.2f}s backend latency")
+    try:
+        for run, workers in enumerate(args.workers):
+            bills = [bill(run * args.bills + i) for i in range(args.bills)]
+            per_minute, failures = batch_rate(service, bills, workers)
+            print(f"{workers:2d} workers {per_minute:8.0f} bills/min" + (f"  ({failures} failed)" if failures else ""))
+    finally:
+        service.close()
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
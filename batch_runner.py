@@ -0,0 +1,216 @@
+"""Run CHRONOCHECK tools headlessly over a directory of files or a JSONL of requests.
+
+    python batch_runner.py bill ./bills --out bills.jsonl --concurrency 8
+    python batch_runner.py qna questions.jsonl --out answers.jsonl --options '{"language": "Hindi"}'
+
+Every input becomes one record: a file of the directory (report, medicine and
+bill only) or one JSON object per line, with --options as defaults for any
+field the record leaves out. Results are appended to --out as JSON lines as
+soon as each record finishes; that file is also the checkpoint, so re-running
+the same command skips records already written (--retry-failed re-runs the
+unsuccessful ones, whose newer line then supersedes the old one).
+
+Record fields per tool (all but the first are optional):
+
+    qna       question, level, language
+    report    file | text, analysis_focus, patient_age, normal_ranges, recommendations, risk_flags, notes, output_lang
+    hospital  query, location, specializations, preferences, insurance, pincode, radius_km
+    medicine  file | text | medicines, detail_level, conditions, sections
+    bill      file | text, overcharges, duplicates, unbundling, upcoding, hospital_type, insurance_type, city, notes
+    symptom   symptoms, age, gender, duration, severity, known_conditions, current_meds
+
+The backend is the Langflow deployment configured by LANGFLOW_* variables
+(see langflow_client.py) or, without LANGFLOW_BASE_URL, api_integration.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bill_audit import bill_findings
+from extraction import DocumentExtractor
+from prompts import DEFAULT_BILL_OPTIONS, DEFAULT_MEDICINE_SECTIONS
+from service import ChronoService, text_document
+from uploads import NamedUpload
+
+TOOLS = ("qna", "report", "hospital", "medicine", "bill", "symptom")
+FILE_TOOLS = ("report", "medicine", "bill")
+FILE_SUFFIXES = (".txt", ".pdf", ".docx", ".jpg", ".jpeg", ".png")
+TOOL_METHODS = {"report": "analyze_report", "medicine": "explain_medicines", "bill": "analyze_bill"}
+
+
+def iter_records(tool, source, defaults):
+    """(record id, record) pairs from a directory of files or a JSONL file, lazily"""
+    if os.path.isdir(source):
+        if tool not in FILE_TOOLS:
+            sys.exit(f"{tool} takes a JSONL of requests, not a directory")
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(FILE_SUFFIXES) and not name.startswith("."):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), {**defaults, "file": path}
+        return
+    with open(source, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                record = {**defaults, **json.loads(line)}
+                yield str(record.get("id", n)), record
+
+
+def load_checkpoint(path, retry_failed):
+    """Ids already written to the output; with retry_failed, only the successful ones"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:  # a line cut short by an interrupted run
+                continue
+            if row.get("success") or not retry_failed:
+                done.add(row["id"])
+            else:
+                done.discard(row["id"])
+    return done
+
+
+class Runner:
+    """Maps each record onto a service call and shapes the result line"""
+
+    def __init__(self, tool, service):
+        self.tool = tool
+        self.service = service
+
+    def document(self, record):
+        """The record's file, or its inline text, as a service Document"""
+        if "text" in record or "file" not in record:
+            return text_document(self.tool, record.get("text", ""))
+        with open(record["file"], "rb") as f:
+            upload = NamedUpload(f.read(), os.path.basename(record["file"]))
+        return self.service.read_document(upload, TOOL_METHODS[self.tool])
+
+    def run(self, record):
+        r, service = record, self.service
+        if self.tool == "qna":
+            result = service.qna(r["question"], r.get("level", "Patient-Friendly"), r.get("language", "English"))
+        elif self.tool == "hospital":
+            result = service.hospitals(r["query"], r.get("location", "Pune"), r.get("specializations", ()),
+                                       r.get("preferences", ()), r.get("insurance", ""), r.get("pincode", ""),
+                                       r.get("radius_km"))
+        elif self.tool == "symptom":
+            result = service.symptoms(r["symptoms"], r.get("age", 30), r.get("gender", "Male"), r.get("duration", ""),
+                                      r.get("severity", 5), r.get("known_conditions", ""), r.get("current_meds", ""))
+        elif self.tool == "report":
+            result = service.report(self.document(r),
+                                    r.get("analysis_focus", "Comprehensive"), r.get("patient_age", 35),
+                                    r.get("normal_ranges", True), r.get("recommendations", True),
+                                    r.get("risk_flags", True), r.get("notes", ""), r.get("output_lang", "English"))
+        elif self.tool == "medicine":
+            result = service.medicines(self.document(r), r.get("detail_level", "Basic"), r.get("medicines", ""),
+                                       r.get("conditions", ""), r.get("sections", DEFAULT_MEDICINE_SECTIONS))
+        else:
+            options = {k: r.get(k, v) for k, v in DEFAULT_BILL_OPTIONS.items()}
+            result = service.bill([self.document(r)], options)
+        row = {"success": bool(result.get("success")), "message": result.get("message", ""),
+               "error": result.get("error")}
+        if self.tool == "bill":
+            findings = bill_findings(row["message"], result["local"])
+            row["overcharge"] = float(findings["overcharge"].sum())
+            row["flagged_items"] = int((findings["overcharge"] > 0).sum())
+        if self.tool == "hospital":
+            row["hospitals"] = [h.name for h in result["local"]]
+        if self.tool == "symptom":
+            row["pre_triage"] = result["pre_triage"]["level"]
+            row["red_flags"] = list(result["pre_triage"]["flags"])
+        return row
+
+
+def run_batch(tool, source, out, concurrency=4, defaults=None, retry_failed=False, log=sys.stderr):
+    """Process every pending record of source, appending one JSON line per record to out"""
+    done = load_checkpoint(out, retry_failed)
+    os.environ.setdefault("LANGFLOW_POOL_SIZE", str(concurrency))
+    extractor = DocumentExtractor(max_workers=min(concurrency, os.cpu_count() or 1)) if tool in FILE_TOOLS else None
+    try:
+        service = ChronoService.from_env(extractor=extractor)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    runner = Runner(tool, service)
+    records = ((rid, r) for rid, r in iter_records(tool, source, defaults or {}) if rid not in done)
+    counts = {"ok": 0, "failed": 0}
+    started = time.time()
+
+    def work(rid, record):
+        t0 = time.time()
+        try:
+            row = runner.run(record)
+        except Exception as e:
+            row = {"success": False, "message": "", "error": f"{type(e).__name__}: {e}"}
+        return {"id": rid, "tool": tool, **row, "elapsed": round(time.time() - t0, 3)}
+
+    _end_last_line(out)
+    with open(out, "a", encoding="utf-8") as sink, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        try:
+            for rid, record in records:
+                pending.add(pool.submit(work, rid, record))
+                if len(pending) >= concurrency * 2:  # bounded read-ahead
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    _write(finished, sink, counts, log)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _write(finished, sink, counts, log)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("interrupted; re-run the same command to resume", file=log)
+        finally:
+            service.close()
+    total = counts["ok"] + counts["failed"]
+    elapsed = time.time() - started
+    print(f"{total} records in {elapsed:.1f}s ({total / elapsed * 60 if elapsed else 0:.0f}/min), "
+          f"{counts['failed']} failed, {len(done)} skipped from checkpoint", file=log)
+    return counts
+
+
+def _end_last_line(path):
+    """Terminate a line cut short by an interrupted run so new results start on their own line"""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _write(futures, sink, counts, log):
+    for future in futures:
+        if future.cancelled():
+            continue
+        row = future.result()
+        sink.write(json.dumps(row, ensure_ascii=False) + "\n")
+        sink.flush()
+        counts["ok" if row["success"] else "failed"] += 1
+        print(f"[{counts['ok'] + counts['failed']}] {row['id']}: {'ok' if row['success'] else row['error']}"
+              f" ({row['elapsed']:.1f}s)", file=log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a CHRONOCHECK tool over many inputs")
+    parser.add_argument("tool", choices=TOOLS)
+    parser.add_argument("input", help="directory of files (report/medicine/bill) or a .jsonl of requests")
+    parser.add_argument("--out", required=True, help="JSONL results file; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=4, help="records processed at once (default 4)")
+    parser.add_argument("--options", default="{}", help="JSON object of defaults for every record")
+    parser.add_argument("--retry-failed", action="store_true", help="re-run records whose last result failed")
+    args = parser.parse_args(argv)
+    counts = run_batch(args.tool, args.input, args.out, max(1, args.concurrency),
+                       json.loads(args.options), args.retry_failed)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
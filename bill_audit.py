@@ -0,0 +1,583 @@
+"""Instant local rate audit for hospital bill line items.
+
+Reference prices are loaded once per process into a dense array indexed by
+(item, city, hospital type), with the "*" wildcard rows of the CSV resolved
+up front. Bill lines are matched to reference items through a hashed n-gram
+index and priced in one vectorized pass against reference x quantity; only
+lines without a confident match, or whose quantity cannot be read, need the
+model. Reference items priced per day, per session or per strip need a stated
+quantity ("3 days", "x 2", "10 tabs"); other items default to one.
+
+Duplicate and unbundled charges are found locally too, across every bill of
+an admission: exact repeats by hashing, near repeats by comparing each line
+with its neighbours after sorting by amount, and package components by the
+rules in data/bundle_components.csv.
+"""
+import csv
+import io
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from text_index import NgramIndex, normalize, vectorize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PRICES_PATH = os.path.join(DATA_DIR, "reference_prices.csv")
+BUNDLES_PATH = os.path.join(DATA_DIR, "bundle_components.csv")
+MATCH_THRESHOLD = 0.6
+NEAR_DUPLICATE = 0.85
+DUPLICATE_WINDOW = 8
+DUPLICATE_DIM = 512   # short item names need few buckets; keeps long bills' vectors small
+ANY = "*"
+
+_DOSAGE_FORM = re.compile(r"^(tab|tablet|cap|capsule|inj|injection|syp|syrup|iv)\b\.?\s*", re.I)
+_UNIT_GAP = re.compile(r"(\d)\s+(mg|mcg|g|ml|iu|units?)\b")
+_MONEY = re.compile(r"^(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d{1,2})?)\s*(?:/-)?$", re.I)
+# charges that legitimately repeat once per day of the stay
+_RECURRING = re.compile(r"per\s*day|/\s*day|daily|room\s+rent|bed\s+charge|nursing|diet|visit|icu|oxygen|monitoring",
+                        re.I)
+# the date or "Day N" of a bill line: 12/03/2024, 12-03-24, 12 Mar 2024, 2024-03-12, Day 3
+_DAY = re.compile(
+    r"\b(?:(?P<d>\d{1,2})[/.-](?P<m>\d{1,2})[/.-](?P<y>\d{2}(?:\d{2})?)"
+    r"|(?P<md>\d{1,2})[\s-]*(?P<mon>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?[\s,-]*(?P<my>\d{2}(?:\d{2})?)"
+    r"|(?P<iy>\d{4})-(?P<im>\d{1,2})-(?P<id>\d{1,2})"
+    r"|day\s*(?P<n>\d+))\b", re.I)
+_LEADING_DAY = re.compile(r"^\s*(?:" + _DAY.pattern + r")\s*[:|,-]?\s*", re.I)
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_AMOUNT = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+_TOTAL_ROW = re.compile(r"^[*_\s]*(grand\s+|sub)?total\b", re.I)
+# header keyword -> column, checked in this order ("Bill Item" is an item, "Billed Price" is billed)
+_AUDIT_COLUMNS = (
+    ("overcharge", ("overcharge", "excess", "difference", "saving")),
+    ("reference", ("ref", "standard", "std", "nppa", "cghs", "mrp", "expected")),
+    ("billed", ("billed", "charged", "amount", "price", "cost")),
+    ("item", ("item", "description", "particular", "service", "medicine", "test")),
+    ("note", ("analysis", "note", "remark", "comment", "finding", "status", "issue")),
+)
+
+# a stated quantity inside an item name: "x 2", "x10", "3 days", "10 tabs", "2 strips", "qty: 4"
+_QUANTITY = re.compile(
+    r"(?:^|\s)(?:[x×*]\s*(?P<times>\d+(?:\.\d+)?)|qty\.?\s*:?\s*(?P<qty>\d+(?:\.\d+)?)|(?P<count>\d+(?:\.\d+)?)\s*"
+    r"(?P<unit>days?|nights?|sessions?|visits?|strips?|packs?|tabs?|tablets?|caps?|capsules?|nos?\.?|units?|vials?|"
+    r"amps?|ampoules?|bottles?|pcs|pieces|pairs?))(?=[\s,;)]|$)", re.I)
+_PACKS = re.compile(r"strips?|packs?", re.I)
+_RATE = re.compile(r"@\s*(?:₹|rs\.?|inr)?\s*\d[\d,]*(?:\.\d+)?(?:\s*/-)?", re.I)
+# reference items priced per unit of time or per pack, which need a stated quantity
+_METERED = re.compile(r"\((?:per\s+(?:day|session)|strip\s+of\s+\d+)\)", re.I)
+_PACK_SIZE = re.compile(r"\(strip\s+of\s+(\d+)\)", re.I)
+
+_TEXT_LINE = re.compile(
+    r"^\s*(?:\d+[.)]\s+)?(?P<name>[^\d\s|][^|\t]*?)\s*(?:[:\t]|\s)\s*"
+    r"(?:₹|rs\.?|inr)?\s*(?P<amount>\d[\d,]*(?:\.\d{1,2})?)\s*(?:/-)?\s*$", re.I)
+
+
+# names, amounts, raw lines; quantities: the stated count, NaN when none is stated, 0 when the row has numbers
+# that cannot be told apart; packs: whether the count is in strips or packs rather than single units;
+# days: the line's date or day of stay (see line_day), "" when none is given; numbers: 1-based line
+# numbers in the bill text, which with the bill's position identify a line across all the checks
+BillLines = namedtuple("BillLines", "names amounts raw quantities packs days numbers")
+
+
+def line_day(text):
+    """Normalized date ("12/3/24") or day of stay ("day 3") a bill line is for, "" when it states none"""
+    match = _DAY.search(text)
+    if not match:
+        return ""
+    g = match.groupdict()
+    if g["n"]:
+        return f"day {int(g['n'])}"
+    if g["mon"]:
+        day, month, year = g["md"], _MONTHS.index(g["mon"].lower()[:3]) + 1, g["my"]
+    elif g["iy"]:
+        day, month, year = g["id"], g["im"], g["iy"]
+    else:
+        day, month, year = g["d"], g["m"], g["y"]
+    return f"{int(day)}/{int(month)}/{int(year) % 100}"
+
+
+def normalize_item(name):
+    """Canonical form used for matching: lowercase, no punctuation, no dosage-form prefix"""
+    return normalize(_DOSAGE_FORM.sub("", name.strip()))
+
+
+def canonical_item(name):
+    """Word-order-insensitive form used for near-duplicate checks"""
+    text = _UNIT_GAP.sub(r"\1\2", normalize_item(name))
+    return " ".join(sorted(t for t in text.split() if not _DOSAGE_FORM.fullmatch(t)))
+
+
+def parse_money(text):
+    match = _MONEY.match(text.strip())
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+def line_quantity(text):
+    """(quantity or NaN, whether it counts strips or packs) stated in an item name or cell"""
+    match = _QUANTITY.search(text)
+    if not match:
+        return np.nan, False
+    count = match.group("times") or match.group("qty") or match.group("count")
+    return float(count), bool(match.group("unit") and _PACKS.fullmatch(match.group("unit")))
+
+
+def item_name(name):
+    """The name without its stated quantity or unit rate, for matching against reference items"""
+    return _RATE.sub(" ", _QUANTITY.sub(" ", name)).strip() or name
+
+
+def _row_quantity(cells, amount):
+    """(quantity, packs) from the cells between a table row's item name and its amount"""
+    quantity, packs = line_quantity(" ".join(cells))
+    if not np.isnan(quantity):
+        return quantity, packs
+    numbers = [v for v in map(parse_money, cells) if v is not None]
+    if not numbers:
+        return np.nan, False
+    # qty and rate columns: the pair whose product is the amount, the quantity being the smaller
+    for i, a in enumerate(numbers):
+        for b in numbers[i + 1:]:
+            if min(a, b) > 0 and np.isclose(a * b, amount, rtol=0.005):
+                return min(a, b), False
+    if len(numbers) == 1 and np.isclose(numbers[0], amount):
+        return 1.0, False   # a rate column equal to the amount
+    return 0.0, False
+
+
+def parse_bill_lines(text):
+    """BillLines for every line that looks like "item ... amount".
+
+    Handles pipe/tab separated rows (the amount is the last money cell, a
+    quantity the cells before it) and free-text lines ending in an amount.
+    """
+    names, amounts, raw, quantities, packs, days, numbers = [], [], [], [], [], [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        quantity, pack = np.nan, False
+        if "|" in line:
+            cells = [c.strip() for c in line.strip().strip("|").split("|")]
+            at = next((i for i, c in enumerate(cells) if re.search(r"[A-Za-z]", c) and not _DAY.fullmatch(c)), None)
+            end = next((i for i in range(len(cells) - 1, -1, -1) if parse_money(cells[i]) is not None), None)
+            name = cells[at] if at is not None else None
+            amount = parse_money(cells[end]) if end is not None else None
+            if name and amount is not None:
+                quantity, pack = line_quantity(name)
+                if np.isnan(quantity) and at < end:
+                    quantity, pack = _row_quantity(cells[at + 1:end], amount)
+        else:
+            match = _TEXT_LINE.match(_LEADING_DAY.sub("", line))
+            name, amount = (match.group("name"), parse_money(match.group("amount"))) if match else (None, None)
+            if name:
+                quantity, pack = line_quantity(name)
+        if name and amount is not None and not re.match(r"^\s*(sub)?total|grand total|amount", name, re.I):
+            names.append(name.strip())
+            amounts.append(amount)
+            raw.append(line.strip())
+            quantities.append(quantity)
+            packs.append(pack)
+            days.append(line_day(line))
+            numbers.append(number)
+    return BillLines(names, np.asarray(amounts, dtype=np.float64), raw, np.asarray(quantities, dtype=np.float64),
+                     np.asarray(packs, dtype=bool), days, numbers)
+
+
+class ReferencePriceIndex:
+    """Reference prices as a (items, cities, hospital types) array plus a fuzzy item-name index"""
+
+    def __init__(self, items, cities, hospital_types, prices):
+        self.items = items
+        self.cities = {c: i for i, c in enumerate(cities)}
+        self.hospital_types = {t: i for i, t in enumerate(hospital_types)}
+        self.prices = prices
+        self.metered = np.fromiter((bool(_METERED.search(item)) for item in items), dtype=bool, count=len(items))
+        self.pack_size = np.array([int(m.group(1)) if (m := _PACK_SIZE.search(item)) else 1 for item in items],
+                                  dtype=np.float64)
+        self.index = NgramIndex([normalize_item(item) for item in items])
+
+    @classmethod
+    def load(cls, path=PRICES_PATH):
+        with open(path, encoding="utf-8") as f:
+            rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+        items = sorted({r["item"] for r in rows})
+        cities = [ANY] + sorted({r["city"] for r in rows} - {ANY})
+        types = [ANY] + sorted({r["hospital_type"] for r in rows} - {ANY})
+        item_ix = {item: i for i, item in enumerate(items)}
+        city_ix = {c: i for i, c in enumerate(cities)}
+        type_ix = {t: i for i, t in enumerate(types)}
+        raw = np.full((len(items), len(cities), len(types)), np.nan)
+        for r in rows:
+            raw[item_ix[r["item"]], city_ix[r["city"]], type_ix[r["hospital_type"]]] = float(r["price"])
+        # most specific row wins: (city, type) > (city, *) > (*, type) > (*, *)
+        resolved = raw.copy()
+        for fallback in (raw[:, :, :1], raw[:, :1, :], raw[:, :1, :1]):
+            resolved = np.where(np.isnan(resolved), fallback, resolved)
+        return cls(items, cities, types, resolved)
+
+    def audit(self, names, billed, city=ANY, hospital_type=ANY, threshold=MATCH_THRESHOLD, quantities=None,
+              packs=None):
+        """Match and price all lines at once against reference x quantity; returns a dict of equal-length columns.
+
+        quantities and packs are as in BillLines (NaN, not stated, when omitted). A line stays unmatched
+        when its quantity cannot be determined: a row with unreadable numbers, or no stated quantity for
+        an item priced per day, session or strip.
+        """
+        c = self.cities.get(city, 0)
+        t = self.hospital_types.get(hospital_type, 0)
+        if not names:
+            empty = np.zeros(0)
+            return {"name": [], "item": [], "score": empty, "billed": empty, "quantity": empty, "reference": empty,
+                    "overcharge": empty, "matched": np.zeros(0, dtype=bool)}
+        quantities = np.full(len(names), np.nan) if quantities is None else np.asarray(quantities, dtype=np.float64)
+        packs = np.zeros(len(names), dtype=bool) if packs is None else np.asarray(packs, dtype=bool)
+        scores, idx = self.index.search([normalize_item(item_name(n)) for n in names], k=1)
+        scores, idx = scores[:, 0], idx[:, 0]
+        unit_price = self.prices[idx, c, t]
+        # reference units billed: single tablets of a strip-priced item are a fraction of a strip
+        units = np.where(packs, quantities, quantities / self.pack_size[idx])
+        units = np.where(np.isnan(quantities) & ~self.metered[idx], 1.0, units)
+        units[quantities == 0] = np.nan
+        matched = (scores >= threshold) & ~np.isnan(unit_price) & ~np.isnan(units)
+        reference = np.where(matched, unit_price * units, np.nan)
+        overcharge = np.where(matched, np.maximum(billed - np.nan_to_num(reference), 0.0), 0.0)
+        return {
+            "name": list(names),
+            "item": [self.items[i] if m else None for i, m in zip(idx, matched)],
+            "score": scores,
+            "billed": billed,
+            "quantity": np.where(matched, units, np.nan),
+            "reference": reference,
+            "overcharge": overcharge,
+            "matched": matched,
+        }
+
+
+def audit_rows(audit, numbers=None):
+    """Matched lines as display rows for st.dataframe, with their bill line numbers when given"""
+    rows = []
+    for i in np.flatnonzero(audit["matched"]):
+        rows.append({
+            **({"Line": numbers[i]} if numbers is not None else {}),
+            "Bill Item": audit["name"][i],
+            "Reference Item": audit["item"][i],
+            "Qty": float(audit["quantity"][i]),
+            "Billed (₹)": float(audit["billed"][i]),
+            "Reference (₹)": float(audit["reference"][i]),
+            "Overcharge (₹)": float(audit["overcharge"][i]),
+        })
+    return rows
+
+
+def _cells(line):
+    return [c.strip() for c in line.strip().strip("|").split("|")]
+
+
+def _header_columns(cells):
+    """column name -> cell index for a markdown table header, or None if it isn't an audit table"""
+    columns = {}
+    for i, cell in enumerate(cells):
+        label = cell.lower()
+        for column, keywords in _AUDIT_COLUMNS:
+            if column not in columns and any(k in label for k in keywords):
+                columns[column] = i
+                break
+    return columns if "item" in columns and ("billed" in columns or "overcharge" in columns) else None
+
+
+def _amounts(cells):
+    """Float column from money cells; NaN where a cell holds no number ("Included in Surgery")"""
+    out = np.full(len(cells), np.nan)
+    for i, cell in enumerate(cells):
+        match = _AMOUNT.search(cell)
+        if match:
+            out[i] = float(match.group().replace(",", ""))
+    return out
+
+
+def parse_audit_table(markdown):
+    """Rows of every audit table in a markdown report as typed columns, in one pass over the lines.
+
+    Returns {"item", "note": lists of str; "billed", "reference", "overcharge": float arrays;
+    "line": the (bill position, line number) a local check found the row on, None for report rows}.
+    Where a row states no overcharge it is derived as max(billed - reference, 0); total rows
+    are dropped so the sum is never counted twice.
+    """
+    raw = {"item": [], "billed": [], "reference": [], "overcharge": [], "note": []}
+    columns = None
+    for line in markdown.splitlines():
+        if not line.lstrip().startswith("|"):
+            columns = None
+            continue
+        cells = _cells(line)
+        if columns is None:
+            columns = _header_columns(cells)
+            continue
+        if all(set(c) <= set(":- ") for c in cells):
+            continue
+        item = cells[columns["item"]] if columns["item"] < len(cells) else ""
+        if not item or _TOTAL_ROW.match(item):
+            continue
+        for column in raw:
+            i = columns.get(column)
+            raw[column].append(cells[i] if i is not None and i < len(cells) else "")
+    billed, reference, stated = (_amounts(raw[c]) for c in ("billed", "reference", "overcharge"))
+    derived = np.fmax(billed - reference, 0.0)
+    overcharge = np.where(np.isnan(stated), np.nan_to_num(derived), stated)
+    return {
+        "item": [item.strip("*_ ") for item in raw["item"]],
+        "billed": billed,
+        "reference": reference,
+        "overcharge": overcharge,
+        "note": raw["note"],
+        "line": [None] * len(raw["item"]),
+    }
+
+
+def findings_frame(table):
+    """Audit table columns as a display mapping for st.dataframe, largest overcharge first"""
+    order = np.argsort(-table["overcharge"], kind="stable")
+    return {
+        "Item": [table["item"][i] for i in order],
+        "Billed (₹)": table["billed"][order],
+        "Reference (₹)": table["reference"][order],
+        "Overcharge (₹)": table["overcharge"][order],
+        "Note": [table["note"][i] for i in order],
+    }
+
+
+def load_bundle_rules(path=BUNDLES_PATH):
+    """[(procedure regex, component regex, note)] from the bundle component table"""
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    return [(re.compile(r["procedure"], re.I), re.compile(r["component"], re.I), r["note"]) for r in rows]
+
+
+def find_duplicates(names, amounts, sources, days=None, window=DUPLICATE_WINDOW, threshold=NEAR_DUPLICATE):
+    """{line index: note} for lines that repeat an earlier line, in O(n log n + n * window).
+
+    Lines for different days (see line_day) are separate charges; undated lines of per-day
+    categories such as room rent are never flagged, since their repeats are the days of the stay.
+    """
+    n = len(names)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    days = days if days is not None else [""] * n
+    recurring = np.fromiter((bool(_RECURRING.search(name)) and not day for name, day in zip(names, days)),
+                            dtype=bool, count=n)
+    keys = [normalize_item(name) for name in names]
+    flags = {}
+    first = {}
+    for i, key in enumerate(keys):
+        if recurring[i]:
+            continue
+        j = first.setdefault((key, round(float(amounts[i]), 2), days[i]), i)
+        if j != i:
+            flags[i] = _duplicate_note("Exact duplicate", j, i, names, sources)
+    if n < 2:
+        return flags
+    # near duplicates share an amount but not the exact wording: sort by amount, compare neighbours
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[sorted(range(n), key=keys.__getitem__)] = np.arange(n)
+    order = np.lexsort((ranks, amounts))
+    vectors = vectorize([canonical_item(name) for name in names], dim=DUPLICATE_DIM)[order]
+    ordered_amounts = amounts[order]
+    for offset in range(1, min(window, n - 1) + 1):
+        sims = np.einsum("ij,ij->i", vectors[:-offset], vectors[offset:])
+        same_amount = np.isclose(ordered_amounts[:-offset], ordered_amounts[offset:], rtol=0.01)
+        for k in np.flatnonzero((sims >= threshold) & same_amount):
+            a, b = sorted((int(order[k]), int(order[k + offset])))
+            if b not in flags and not recurring[b] and days[a] == days[b]:
+                flags[b] = _duplicate_note("Possible duplicate", a, b, names, sources)
+    return flags
+
+
+def _duplicate_note(kind, original, repeat, names, sources):
+    where = f"in {sources[original]}" if sources[original] != sources[repeat] else "on the same bill"
+    return f"{kind} of \"{names[original]}\" {where}"
+
+
+def find_unbundled(names, rules):
+    """{line index: note} for package components billed next to their procedure"""
+    flags = {}
+    for procedure, component, note in rules:
+        components = [i for i, name in enumerate(names) if component.search(name)]
+        if not components:
+            continue
+        parent = next((name for name in names if procedure.search(name) and not component.search(name)), None)
+        if parent is None:
+            continue
+        for i in components:
+            flags.setdefault(i, f"Unbundled from \"{parent}\": {note}")
+    return flags
+
+
+def check_line_items(names, amounts, sources, rules, duplicates=True, unbundling=True, days=None, lines=None):
+    """Duplicate and unbundled lines as audit-table columns (see parse_audit_table); lines are their keys"""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    flags = {}
+    if unbundling:
+        flags.update(find_unbundled(names, rules))
+    if duplicates:
+        for i, note in find_duplicates(names, amounts, sources, days).items():
+            flags[i] = f"{flags[i]}; {note}" if i in flags else note
+    index = np.fromiter(sorted(flags), dtype=np.int64, count=len(flags))
+    billed = amounts[index] if len(index) else np.zeros(0)
+    return {
+        "item": [names[i] for i in index],
+        "billed": billed,
+        "reference": np.full(len(index), np.nan),
+        "overcharge": billed.copy(),
+        "note": [flags[i] for i in index],
+        "line": [lines[i] if lines is not None else None for i in index],
+    }
+
+
+def rate_table(rows):
+    """Rate-check rows as audit-table columns; the rate check prices the first bill, position 0"""
+    return {
+        "item": [r["Bill Item"] for r in rows],
+        "billed": np.array([r["Billed (₹)"] for r in rows], dtype=np.float64),
+        "reference": np.array([r["Reference (₹)"] for r in rows], dtype=np.float64),
+        "overcharge": np.array([r["Overcharge (₹)"] for r in rows], dtype=np.float64),
+        "note": [f"{'Above' if r['Overcharge (₹)'] > 0 else 'Within'} the reference rate for "
+                 f"{_units(r)}{r['Reference Item']}" for r in rows],
+        "line": [(0, r["Line"]) if "Line" in r else None for r in rows],
+    }
+
+
+def _units(row):
+    """ "3 x " before the reference item of a rate-check row billed for 3 of its units, else "" """
+    return "" if row.get("Qty", 1) == 1 else f"{row['Qty']:g} x "
+
+
+def merge_tables(report, local):
+    """Local findings plus the report's rows, in bill line order.
+
+    A row from an earlier local check is replaced only by a local row for the same bill line, so a
+    duplicate line's row stands next to the rate-check row of the line it repeats; the model's own
+    rows are dropped for any item found locally.
+    """
+    seen = {normalize_item(item) for item in local["item"]}
+    lines = set(local["line"])
+    keep = np.fromiter((line not in lines if line is not None else normalize_item(item) not in seen
+                        for item, line in zip(report["item"], report["line"])),
+                       dtype=bool, count=len(report["item"]))
+    merged = {}
+    for column in ("item", "note", "line"):
+        merged[column] = list(local[column]) + [v for v, k in zip(report[column], keep) if k]
+    for column in ("billed", "reference", "overcharge"):
+        merged[column] = np.concatenate([local[column], report[column][keep]])
+    # located rows first, by bill line; the report's own rows after them in their order
+    order = sorted(range(len(merged["item"])),
+                   key=lambda i: (merged["line"][i] is None, merged["line"][i] or (0, 0)))
+    for column in ("item", "note", "line"):
+        merged[column] = [merged[column][i] for i in order]
+    for column in ("billed", "reference", "overcharge"):
+        merged[column] = merged[column][np.asarray(order, dtype=np.int64)]
+    return merged
+
+
+def rate_check(document_text, city, hospital_type, index):
+    """Price bill lines locally; returns (matched rows, overcharge total, text left for the model)"""
+    lines = parse_bill_lines(document_text)
+    audit = index.audit(lines.names, lines.amounts, city, hospital_type, quantities=lines.quantities,
+                        packs=lines.packs)
+    rows = audit_rows(audit, lines.numbers)
+    if not rows:
+        return [], 0, document_text
+    checked = {line for line, matched in zip(lines.raw, audit["matched"]) if matched}
+    remaining = "\n".join(line for line in document_text.splitlines() if line.strip() not in checked)
+    summary = "\n".join(f"- {r['Bill Item']}: billed ₹{r['Billed (₹)']:,.0f}, reference ₹{r['Reference (₹)']:,.0f}"
+                        f" for {_units(r)}{r['Reference Item']}" for r in rows)
+    remaining += f"\n\nAlready rate-checked locally (do not re-price or add to your total):\n{summary}"
+    return rows, int(audit["overcharge"].sum()), remaining
+
+
+def line_item_checks(bills, duplicates, unbundling, rules):
+    """Duplicate and unbundled charges across all (name, text) bills of one admission"""
+    names, amounts, sources, days, keys = [], [], [], [], []
+    for position, (source, text) in enumerate(bills):
+        lines = parse_bill_lines(text)
+        names += lines.names
+        amounts += list(lines.amounts)
+        sources += [source] * len(lines.names)
+        days += lines.days
+        keys += [(position, number) for number in lines.numbers]
+    return check_line_items(names, amounts, sources, rules, duplicates, unbundling, days, keys)
+
+
+def bill_findings(message, local):
+    """The report's itemized table merged with the local checks; local rows replace the report's"""
+    findings = merge_tables(parse_audit_table(message), rate_table(local.get("rate_rows", [])))
+    if local.get("line_checks"):
+        findings = merge_tables(findings, local["line_checks"])
+    return findings
+
+
+def finding_records(bill, findings):
+    """JSON-ready dicts, one per finding of a bill"""
+    for i, item in enumerate(findings["item"]):
+        yield {
+            "bill": bill,
+            "item": item,
+            "billed": _number(findings["billed"][i]),
+            "reference": _number(findings["reference"][i]),
+            "overcharge": _number(findings["overcharge"][i]),
+            "note": findings["note"][i],
+        }
+
+
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+
+def findings_csv(bills):
+    """CSV export of [(bill name, status, findings)]: one row per finding"""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=["bill", "item", "billed", "reference", "overcharge", "note"])
+    writer.writeheader()
+    for bill, _, findings in bills:
+        writer.writerows(finding_records(bill, findings))
+    return out.getvalue()
+
+
+def findings_jsonl(bills):
+    """JSONL export of [(bill name, status, findings)]: one line per bill"""
+    lines = []
+    for bill, status, findings in bills:
+        records = [{k: v for k, v in r.items() if k != "bill"} for r in finding_records(bill, findings)]
+        lines.append(json.dumps({
+            "bill": bill,
+            "status": status,
+            "overcharge": float(findings["overcharge"].sum()),
+            "findings": records,
+        }, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def benchmark(lines=5000, repeat=20, seed=0):
+    """Milliseconds per parse_audit_table call over a synthetic report of lines audit-table rows"""
+    import random
+    import time
+    rng = random.Random(seed)
+    items = ["Room Rent", "CBC", "Paracetamol 500mg", "Surgeon Fee", "ICU Charges", "Dressing", "MRI Brain"]
+    rows = ["## Bill audit", "", "| Item | Billed (₹) | Reference (₹) | Overcharge (₹) | Note |",
+            "|---|---|---|---|---|"]
+    for i in range(lines):
+        billed = rng.randint(100, 50_000)
+        reference = billed - rng.randint(-500, 2000)
+        overcharge = f"₹{max(billed - reference, 0):,}" if rng.random() < 0.7 else ""
+        rows.append(f"| **{rng.choice(items)} {i}** | ₹{billed:,} | ₹{reference:,} | {overcharge} | check rate |")
+        if rng.random() < 0.01:   # reports split findings over several tables
+            rows += ["", "Further items:", "", rows[2], rows[3]]
+    rows.append(f"| **Total** | | | ₹{lines * 500:,} | |")
+    report = "\n".join(rows)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        table = parse_audit_table(report)
+    elapsed = time.perf_counter() - started
+    return elapsed / repeat * 1e3, len(table["item"]), len(report) / 1e6
+
+
+if __name__ == "__main__":
+    per_parse, parsed, mb = benchmark()
+    print(f"{per_parse:.1f} ms per parse of {parsed:,} audit-table lines ({mb:.2f} MB of markdown)")
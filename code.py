@@ -1,30 +1,35 @@
 import streamlit as st
 import time
-import base64
 import json
+import os
 import re
 from datetime import datetime
 
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, STREAMING, JobQueue
+from uploads import UploadTooLarge, hash_upload, iter_base64, iter_zip_uploads
+from md_tables import LARGE_TABLE_ROWS, split_markdown, table_digest, table_markdown, to_arrow
+from bill_audit import bill_findings, findings_csv, findings_frame, findings_jsonl
+from prompts import MEDICINE_SECTIONS, triage_section
+from hospital_directory import PREFERENCES, SPECIALIZATIONS, hospital_rows
+from prescriptions import prescription_rows
+from service import ChronoService
+
 # ========== API INTEGRATION ==========
-try:
-    from api_integration import LangflowAPI
-    api = LangflowAPI()
-except ImportError:
-    class DummyAPI:
-        def qna_medical(self, question):
-            return {"success": True, "message": f"**Answer:** This would come from your Q&A Langflow flow.\n\nQuestion: {question}"}
-        def analyze_report(self, user_message, file_uploaded=False, file_name=None):
-            if file_uploaded:
-                return {"success": True, "message": f"**Report Analysis:** Analysis for uploaded file: {file_name}\n\nAI analysis of your medical report.\n\nMessage: {user_message}"}
-            return {"success": True, "message": f"**Report Analysis:** {user_message}"}
-        def find_hospitals(self, query, location=""):
-            return {"success": True, "message": f"**Hospital Recommendations:**\n\nLooking for: {query} in {location if location else 'your area'}"}
-        def explain_medicines(self, user_message, file_uploaded=False, file_name=None):
-            if file_uploaded:
-                return {"success": True, "message": f"**Medicine Explanation:** Analysis for uploaded file: {file_name}\n\nAI analysis of your prescription.\n\nMessage: {user_message}"}
-            return {"success": True, "message": f"**Medicine Explanation:** {user_message}"}
-        def analyze_bill(self, user_message, file_uploaded=False, file_name=None):
-            audit_report = """Medical Billing Audit Report
+class DummyAPI:
+    def qna_medical(self, question):
+        return {"success": True, "message": f"**Answer:** This would come from your Q&A Langflow flow.\n\nQuestion: {question}"}
+    def analyze_report(self, user_message, file_uploaded=False, file_name=None):
+        if file_uploaded:
+            return {"success": True, "message": f"**Report Analysis:** Analysis for uploaded file: {file_name}\n\nAI analysis of your medical report.\n\nMessage: {user_message}"}
+        return {"success": True, "message": f"**Report Analysis:** {user_message}"}
+    def find_hospitals(self, query, location=""):
+        return {"success": True, "message": f"**Hospital Recommendations:**\n\nLooking for: {query} in {location if location else 'your area'}"}
+    def explain_medicines(self, user_message, file_uploaded=False, file_name=None):
+        if file_uploaded:
+            return {"success": True, "message": f"**Medicine Explanation:** Analysis for uploaded file: {file_name}\n\nAI analysis of your prescription.\n\nMessage: {user_message}"}
+        return {"success": True, "message": f"**Medicine Explanation:** {user_message}"}
+    def analyze_bill(self, user_message, file_uploaded=False, file_name=None):
+        audit_report = """Medical Billing Audit Report
 
 | Bill Item | Billed Price (₹) | Standard/Ref Price (₹) | Potential Overcharge (₹) | Auditor's Expert Analysis |
 | :--- | :--- | :--- | :--- | :--- |
@@ -37,10 +42,27 @@ except ImportError:
 **Total Potential Overcharge: ₹5,025.00**
 
 **Recommendation:** Request a reduction of ₹5,025.00 from hospital TPA or management."""
-            return {"success": False, "error": "API unavailable", "message": audit_report, "demo_mode": True}
-        def symptom_check(self, symptoms, age, gender):
-            return {"success": True, "message": f"Symptom analysis for: {symptoms}"}
-    api = DummyAPI()
+        return {"success": False, "error": "API unavailable", "message": audit_report, "demo_mode": True}
+    def symptom_check(self, symptoms, age, gender):
+        return {"success": True, "message": f"Symptom analysis for: {symptoms}"}
+    def translate(self, message):
+        return {"success": True, "message": f"**Translation:** {message}"}
+    def stream(self, tool, *args, **kwargs):
+        result = getattr(self, tool)(*args, **kwargs)
+        message = result.pop("message", "")
+        if message:
+            result["stream"] = (tok for tok in re.split(r'(\s+)', message) if tok)
+        return result
+
+@st.cache_resource
+def get_service():
+    """The tool service (cached, coalescing client, upload store, extraction pool), one per server process"""
+    return ChronoService.from_env(fallback=DummyAPI)
+
+service = get_service()
+api = service.api
+BATCH_WORKERS = int(os.environ.get("CHRONOCHECK_BATCH_WORKERS", "4"))
+BILL_TYPES = ['txt','pdf','docx','jpg','png','jpeg']
 
 # ========== PAGE CONFIG ==========
 st.set_page_config(
@@ -590,60 +612,278 @@ def info_box(text, kind="info"):
     icons = {"info":"ℹ️","warn":"⚠️","success":"✅","danger":"🚨"}
     st.markdown(f'<div class="{kind}-box">{icons.get(kind,"ℹ️")} {text}</div>', unsafe_allow_html=True)
 
-def render_result(text, title="AI Analysis"):
+def result_header(title):
     st.markdown(f"""
     <div class="result-box fade-up">
         <h3>⚕️ {title.upper()}</h3>
     </div>
     """, unsafe_allow_html=True)
-    st.markdown(text)
+
+@st.cache_resource(max_entries=64)
+def arrow_table(digest, _header, _rows):
+    """Typed Arrow table for a markdown table, built once per content hash"""
+    return to_arrow(_header, _rows)
+
+def render_markdown(text):
+    """Markdown answer with large tables moved into sortable, filterable dataframes"""
+    blocks = split_markdown(text)
+    if not any(b[0] == "table" and len(b[2]) >= LARGE_TABLE_ROWS for b in blocks):
+        st.markdown(text)
+        return
+    for block in blocks:
+        if block[0] == "text":
+            if block[1].strip():
+                st.markdown(block[1])
+            continue
+        _, header, rows = block
+        if len(rows) < LARGE_TABLE_ROWS:
+            st.markdown(table_markdown(header, rows))
+        else:
+            st.dataframe(arrow_table(table_digest(header, rows), header, rows),
+                         use_container_width=True, hide_index=True)
+
+def render_result(text, title="AI Analysis"):
+    """Draw an answer (a string or a stream of chunks) and return its full text"""
+    result_header(title)
+    if isinstance(text, str):
+        render_markdown(text)
+        return text
+    placeholder = st.empty()
+    with placeholder.container():
+        streamed = st.write_stream(text)
+    full = streamed if isinstance(streamed, str) else "".join(map(str, streamed))
+    with placeholder.container():   # redrawn once complete, so large tables become dataframes
+        render_markdown(full)
+    return full
 
 def file_to_base64(uploaded_file):
-    """Convert uploaded file to base64 string for API transmission"""
+    """Stream an uploaded file as base64 chunks for API transmission"""
     if uploaded_file is None:
         return None
-    return base64.b64encode(uploaded_file.read()).decode()
+    return iter_base64(uploaded_file)
 
-def extract_text_from_file(uploaded_file):
-    """Try to extract readable text from uploaded file"""
+def upload_digest(uploaded_file):
+    """SHA-256 of an upload, hashed once per uploaded file in this session"""
     if uploaded_file is None:
-        return ""
-    try:
-        file_type = uploaded_file.type
-        content = uploaded_file.read()
-        uploaded_file.seek(0)  # reset
-        if 'text' in file_type:
-            return content.decode('utf-8', errors='ignore')
-        return f"[Binary file: {uploaded_file.name}, size: {len(content)} bytes]"
-    except:
-        return f"[File: {uploaded_file.name}]"
-
-def animated_analyzing(steps):
-    """Show animated step-by-step analysis progress"""
-    placeholder = st.empty()
-    for i, step in enumerate(steps):
+        return None
+    digests = st.session_state.upload_digests
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = hash_upload(uploaded_file)
+    return digests[uploaded_file.file_id]
+
+def read_upload(uploaded_file, tool):
+    """Extracted text (or backend copy) of an upload, reused for every later click on the same content"""
+    if uploaded_file is None:
+        return None
+    return service.read_document(uploaded_file, tool, digest=upload_digest(uploaded_file))
+
+def bill_audit_options():
+    """Audit check and context widgets shared by single and batch audits"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**🔍 Audit Checks:**")
+        check_overcharges  = st.checkbox("Overcharges vs. standard rates", True)
+        check_duplicates   = st.checkbox("Duplicate / double-billed items", True)
+        check_unbundling   = st.checkbox("Unbundling of procedure charges", True)
+        check_upcoding     = st.checkbox("Upcoding / unnecessary upgrades", True)
+    with col2:
+        hospital_type = st.selectbox("Hospital Type:", ["Private","Government","Trust Hospital","Corporate Chain"])
+        insurance_type = st.selectbox("Payment Mode:", ["Self Pay","Health Insurance","CGHS","ECHS","Ayushman Bharat","ESI"])
+        city = st.selectbox("City (for local rate comparison):", [
+            "Pune","Mumbai","Delhi","Chennai","Bangalore","Hyderabad","Kolkata","Nagpur"
+        ])
+    return {"overcharges": check_overcharges, "duplicates": check_duplicates,
+            "unbundling": check_unbundling, "upcoding": check_upcoding,
+            "hospital_type": hospital_type, "insurance_type": insurance_type, "city": city}
+
+class StageProgress:
+    """Step-by-step progress card that advances as real pipeline stages finish"""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.current = 0
+        self.started = time.perf_counter()
+        self.placeholder = st.empty()
+        self.render()
+
+    def render(self):
         dots_html = ""
-        for j, s in enumerate(steps):
-            if j < i:
+        for j, s in enumerate(self.steps):
+            if j < self.current:
                 cls = "done"; label = "✓"
-            elif j == i:
+            elif j == self.current:
                 cls = "active"; label = str(j+1)
             else:
                 cls = "pending"; label = str(j+1)
             dots_html += f'<div class="step-dot {cls}">{label}</div>'
-            if j < len(steps)-1:
-                dots_html += f'<div class="step-line {"done" if j < i else ""}"></div>'
-        placeholder.markdown(f"""
+            if j < len(self.steps)-1:
+                dots_html += f'<div class="step-line {"done" if j < self.current else ""}"></div>'
+        step = self.steps[min(self.current, len(self.steps)-1)]
+        elapsed = time.perf_counter() - self.started
+        self.placeholder.markdown(f"""
         <div class="glass-card">
             <div style="font-size:13px;color:var(--text-muted);margin-bottom:12px;font-weight:600;letter-spacing:1px;">ANALYZING</div>
             <div class="step-progress">{dots_html}</div>
             <div style="font-size:13px;color:var(--text-sec);margin-top:12px;">
-                🔬 {step}
+                🔬 {step} <span style="float:right;color:var(--text-muted);">{elapsed:.1f}s</span>
             </div>
         </div>
         """, unsafe_allow_html=True)
-        time.sleep(0.6)
-    placeholder.empty()
+
+    def advance(self, steps=1):
+        """Mark the current stage(s) as finished and move to the next one"""
+        self.current = min(self.current + steps, len(self.steps))
+        self.render()
+
+    def follow(self, job):
+        """Keep the card live until the job's call returns, then return (result, body)"""
+        while not job.wait_started(timeout=0.25):
+            self.render()
+        if job.streaming:
+            self.advance()  # request accepted, waiting for the first byte
+            return job.result, self.track(job.follow())
+        self.advance(2)  # blocking call: first byte and full body arrive together
+        self.done()
+        return job.result, job.text
+
+    def track(self, chunks):
+        """Pass a chunk stream through, advancing on the first byte and finishing at the end"""
+        first = True
+        for chunk in chunks:
+            if first:
+                self.advance()
+                first = False
+            yield chunk
+        self.advance(1 if not first else 2)
+        self.done()
+
+    def done(self):
+        self.placeholder.empty()
+
+def stream_failed(job):
+    """After an answer has been drawn: True, with the error shown, if its stream broke off partway"""
+    if job.status != FAILED:
+        return False
+    st.error(f"❌ The answer was cut off before it was complete: {job.result.get('error') or job.error}")
+    return True
+
+@st.cache_resource
+def get_job_queue():
+    """Shared bounded worker pool for tool calls; jobs outlive reruns"""
+    return JobQueue(lanes={"batch": BATCH_WORKERS})
+
+def submit_job(page, fn, *args, meta=None, **kwargs):
+    """Run a service call as a background job, streaming, and remember it for this page"""
+    return submit_jobs(page, [(fn, args, kwargs, meta)])[0]
+
+def submit_jobs(page, calls):
+    """Run several (service method, args, kwargs, meta) calls concurrently as one page request"""
+    queue = get_job_queue()
+    jobs = [queue.submit(fn, *args, stream=True, meta=meta, **kwargs) for fn, args, kwargs, meta in calls]
+    st.session_state.jobs[page] = [job.id for job in jobs]
+    st.session_state.total_queries += 1
+    return jobs
+
+def expand_uploads(files):
+    """Uploaded bills with every .zip replaced by the bills inside it"""
+    bills = []
+    for f in files:
+        if f.name.lower().endswith(".zip"):
+            bills.extend(iter_zip_uploads(f, tuple(f".{t}" for t in BILL_TYPES)))
+        else:
+            bills.append(f)
+    return bills
+
+def bill_audit_task(options):
+    """Worker function auditing one bill of a batch end to end: hash, extract, check, audit"""
+    def audit(upload):
+        return service.bill([service.read_document(upload, "analyze_bill")], options)
+    return audit
+
+def submit_batch(page, fn, items, meta=None):
+    """Run fn(item) for every item on the bounded batch lane, one job per item"""
+    queue = get_job_queue()
+    jobs = [queue.submit(fn, item, meta={**(meta or {}), "file": getattr(item, "name", str(item))}, lane="batch")
+            for item in items]
+    st.session_state.jobs[page] = [job.id for job in jobs]
+    st.session_state.total_queries += 1
+    return jobs
+
+def red_flag_banner(triage):
+    """Instant local warning-sign banner, shown while the full assessment is generated"""
+    if triage is None or not triage.level:
+        return
+    flags = ", ".join(triage.flags)
+    if triage.level == "emergency":
+        st.markdown(f'''<div class="danger-box">🚨 <strong>Possible emergency — {flags}.</strong> Call <strong>108</strong> or go to the nearest emergency department now; do not wait for the full assessment.</div>''', unsafe_allow_html=True)
+    else:
+        st.markdown(f'''<div class="warn-box">⚠️ <strong>Urgent — {flags}.</strong> See a doctor today; the full assessment follows below.</div>''', unsafe_allow_html=True)
+
+def triage_tab(full, quick):
+    """The short triage answer as soon as it returns, or the full report's triage part if that came first"""
+    def quick_ready():
+        return quick is not None and quick.status == DONE and quick.result.get("success")
+
+    slot = st.empty()
+    slot.markdown("⏳ *Getting the triage level...*")
+    while not (quick_ready() or full.done):
+        full.wait_done(timeout=0.1)
+    with slot.container():
+        if quick_ready():
+            render_result(quick.text, "Triage Level")
+        elif full.result.get("success"):
+            render_result(triage_section(full.text) or full.text, "Triage Level")
+        else:
+            st.error(f"❌ {full.result.get('error', 'Unknown error')}")
+            return
+        st.caption("Possible conditions, red flags and care advice are under 📋 Full Assessment.")
+
+def page_jobs(page):
+    """Jobs of the latest request from this page in this session, while they're retained"""
+    jobs = [get_job_queue().get(job_id) for job_id in st.session_state.jobs.get(page, [])]
+    return [job for job in jobs if job is not None]
+
+def page_job(page):
+    jobs = page_jobs(page)
+    return jobs[0] if jobs else None
+
+def render_sections(jobs):
+    """Draw one section per job in submission order, each as soon as its job finishes"""
+    slots = {job.id: st.empty() for job in jobs}
+    pending = list(jobs)
+    for job in pending:
+        slots[job.id].markdown(f"⏳ *{job.meta['section']}...*")
+    while pending:
+        for job in [j for j in pending if j.done]:
+            with slots[job.id].container():
+                st.markdown(f"### {job.meta['section']}")
+                if job.result.get("success"):
+                    st.markdown(job.text)
+                else:
+                    st.error(f"❌ {job.result.get('error', 'Unknown error')}")
+            pending.remove(job)
+        if pending:
+            pending[0].wait_done(timeout=0.1)
+
+def job_response(job, progress=None):
+    """(result, body) of a job; the body follows the stream live while the job runs"""
+    if job.done:
+        if progress:
+            progress.done()
+        return job.result, job.text
+    if progress is None:
+        progress = StageProgress(["Waiting for a worker...", "Sending request...",
+                                  "Receiving answer...", "Formatting answer..."])
+        if job.status != QUEUED:
+            progress.advance()
+    return progress.follow(job)
+
+def first_completion(job):
+    """True exactly once per session for a completed job (history and savings bookkeeping)"""
+    if job.status != DONE or job.id in st.session_state.recorded_jobs:
+        return False
+    st.session_state.recorded_jobs.add(job.id)
+    return True
 
 
 # ========== SESSION STATE ==========
@@ -655,6 +895,12 @@ if 'total_queries' not in st.session_state:
     st.session_state.total_queries = 0
 if 'total_savings' not in st.session_state:
     st.session_state.total_savings = 0
+if 'upload_digests' not in st.session_state:
+    st.session_state.upload_digests = {}
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+if 'recorded_jobs' not in st.session_state:
+    st.session_state.recorded_jobs = set()
 
 # ========== SIDEBAR ==========
 with st.sidebar:
@@ -687,6 +933,7 @@ with st.sidebar:
 
     # Sidebar live stats
     now = datetime.now()
+    cache_stats = api.cache.stats()
     st.markdown(f"""
     <div style="padding:0 8px;">
         <div style="font-size:10px;color:var(--text-muted);letter-spacing:2px;font-weight:700;margin-bottom:10px;">SESSION STATS</div>
@@ -702,6 +949,10 @@ with st.sidebar:
             <span class="sidebar-stat-label">Session</span>
             <span class="sidebar-stat-val">{now.strftime('%H:%M')}</span>
         </div>
+        <div class="sidebar-stat-row">
+            <span class="sidebar-stat-label">Cache Hits</span>
+            <span class="sidebar-stat-val">{cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}</span>
+        </div>
         <div class="sidebar-stat-row">
             <span class="sidebar-stat-label">AI Status</span>
             <span class="sidebar-stat-val" style="color:var(--accent3);">● ONLINE</span>
@@ -840,54 +1091,52 @@ elif st.session_state.selected_tool == "🧠 Medical Q&A":
                 st.markdown(f"*{a[:120]}...*")
                 st.markdown("---")
 
+    progress = None
     if st.button("🔍 Get Medical Answer", type="primary", use_container_width=True):
         if not question.strip():
             st.warning("⚠️ Please enter your question.")
         else:
             lang_name = output_language.split(" (")[0]
             level = expertise.split(" —")[0]
+            progress = StageProgress([
+                "Parsing medical query...",
+                f"Requesting {level} response in {lang_name}...",
+                "Receiving answer...",
+                "Formatting structured answer..."
+            ])
 
-            level_prompts = {
-                "Patient-Friendly": "Please explain this simply, as if talking to a patient with no medical background. Avoid jargon. Use analogies where helpful.",
-                "Medical Student": "Explain at a medical student level. Include relevant pathophysiology, clinical correlations, and medical terminology with brief explanations.",
-                "Professional": "Provide a comprehensive, professional clinical analysis. Include mechanisms, differentials, clinical guidelines, evidence-based recommendations, and full medical terminology."
-            }
-
-            enhanced_q = question
-            enhanced_q += f"\n\n[Instruction: {level_prompts.get(level, '')}]"
-            if lang_name != "English":
-                enhanced_q += f"\n\n[CRITICAL: Respond ENTIRELY in {lang_name}. All explanations, headings, and content must be in {lang_name}.]"
-
-            with st.spinner(""):
-                animated_analyzing([
-                    "Parsing medical query...",
-                    "Retrieving medical knowledge base...",
-                    f"Generating {level} response in {lang_name}...",
-                    "Formatting structured answer..."
-                ])
-                result = api.qna_medical(enhanced_q)
+            progress.advance()
+            submit_job("qna", service.qna, question, level, lang_name,
+                       meta={"question": question, "level": level, "lang_name": lang_name})
 
-            st.session_state.total_queries += 1
+    job = page_job("qna")
+    if job:
+        result, body = job_response(job, progress)
+        meta = job.meta
 
-            if result.get("success"):
-                answer = result["message"]
-                st.session_state.qna_history.append((question, answer))
-
-                st.markdown(f"""
-                <div class="glass-card fade-up">
-                    <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:12px;">
-                        <div style="font-size:11px;color:var(--text-muted);letter-spacing:2px;font-weight:700;">YOUR QUESTION</div>
-                        <div style="font-size:10px;color:var(--accent);background:rgba(56,189,248,0.1);padding:3px 10px;border-radius:10px;border:1px solid var(--border-hi);">{level} · {lang_name}</div>
-                    </div>
-                    <div style="font-size:14px;color:var(--text-sec);font-style:italic;">"{question}"</div>
+        if result.get("success"):
+            st.markdown(f"""
+            <div class="glass-card fade-up">
+                <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:12px;">
+                    <div style="font-size:11px;color:var(--text-muted);letter-spacing:2px;font-weight:700;">YOUR QUESTION</div>
+                    <div style="font-size:10px;color:var(--accent);background:rgba(56,189,248,0.1);padding:3px 10px;border-radius:10px;border:1px solid var(--border-hi);">{meta['level']} · {meta['lang_name']}</div>
                 </div>
-                """, unsafe_allow_html=True)
+                <div style="font-size:14px;color:var(--text-sec);font-style:italic;">"{meta['question']}"</div>
+            </div>
+            """, unsafe_allow_html=True)
 
-                st.markdown("<br/>", unsafe_allow_html=True)
-                render_result(answer, f"AI Answer — {level}")
-                info_box("This is AI-generated information. Always consult a licensed healthcare professional for medical decisions.", "warn")
-            else:
-                st.error(f"❌ {result.get('error', 'Unknown error')}")
+            st.markdown("<br/>", unsafe_allow_html=True)
+            render_result(body, f"AI Answer — {meta['level']}")
+            if not stream_failed(job):
+                if result.get("similar_question"):
+                    st.caption(f"♻️ Answered from an earlier question: \"{result['similar_question']}\" ({result['similarity']:.0%} match)")
+                elif result.get("translated_from"):
+                    st.caption(f"🌐 Translated into {meta['lang_name']} from the English answer")
+            if first_completion(job):
+                st.session_state.qna_history.append((meta['question'], job.text))
+            info_box("This is AI-generated information. Always consult a licensed healthcare professional for medical decisions.", "warn")
+        else:
+            st.error(f"❌ {result.get('error', 'Unknown error')}")
 
 
 # ================================================================
@@ -937,41 +1186,52 @@ elif st.session_state.selected_tool == "📄 Report Analyzer":
         additional_notes = st.text_area("Additional Context (optional)",
             height=80, placeholder="E.g., Patient has Type 2 Diabetes, on Metformin 500mg. Compare with previous CBC from last month...")
 
+        progress = None
         if st.button("🔬 Analyze Report", type="primary", use_container_width=True):
             analysis_focus = analysis_type.split(" —")[0]
-            parts = [f"{analysis_focus} analysis", f"Patient age: {patient_age}"]
-            if include_normal_range: parts.append("Include normal ranges")
-            if include_recommendations: parts.append("Provide actionable recommendations")
-            if include_risk_flags: parts.append("Flag any critical/risk values with urgency level")
-            if additional_notes: parts.append(f"Additional context: {additional_notes}")
-            if output_lang != "English": parts.append(f"Respond in {output_lang}")
-
-            analysis_msg = " | ".join(parts)
-
-            with st.spinner(""):
-                animated_analyzing([
-                    "Reading uploaded document...",
-                    "Extracting medical parameters...",
-                    f"Running {analysis_focus} analysis...",
-                    "Cross-referencing medical databases...",
-                    "Generating structured report..."
-                ])
-                result = api.analyze_report(analysis_msg, file_uploaded=True, file_name=uploaded_file.name)
-
-            st.session_state.total_queries += 1
+            progress = StageProgress([
+                "Reading uploaded document...",
+                "Extracting medical parameters...",
+                f"Preparing {analysis_focus} analysis...",
+                "Sending report for analysis...",
+                "Receiving analysis...",
+                "Generating structured report..."
+            ])
+            try:
+                upload_digest(uploaded_file)
+                progress.advance()
+                document = read_upload(uploaded_file, "analyze_report")
+                progress.advance(2)
+
+                submit_job("report", service.report, document, analysis_focus, patient_age, include_normal_range,
+                           include_recommendations, include_risk_flags, additional_notes, output_lang,
+                           meta={"file_name": uploaded_file.name, "file_size": file_size,
+                                 "analysis_focus": analysis_focus, "patient_age": patient_age,
+                                 "output_lang": output_lang})
+            except UploadTooLarge as e:
+                progress.done()
+                progress = None
+                st.error(f"❌ {e}")
+
+        job = page_job("report")
+        if job:
+            result, body = job_response(job, progress)
+            meta = job.meta
 
             if result.get("success"):
                 tab1, tab2 = st.tabs(["📋 Analysis Results", "ℹ️ About This Report"])
                 with tab1:
-                    render_result(result["message"], "Report Analysis")
+                    render_result(body, "Report Analysis")
+                    if not stream_failed(job) and result.get("translated_from"):
+                        st.caption(f"🌐 Translated into {meta['output_lang']} from the English analysis")
                     info_box("Results are AI-generated. Consult your doctor for clinical decisions.", "warn")
                 with tab2:
                     st.markdown(f"""
-                    **File:** {uploaded_file.name}
-                    **Size:** {file_size:.1f} KB
-                    **Analysis type:** {analysis_focus}
-                    **Patient age context:** {patient_age} years
-                    **Language:** {output_lang}
+                    **File:** {meta['file_name']}
+                    **Size:** {meta['file_size']:.1f} KB
+                    **Analysis type:** {meta['analysis_focus']}
+                    **Patient age context:** {meta['patient_age']} years
+                    **Language:** {meta['output_lang']}
                     """)
             else:
                 st.error(f"❌ {result.get('error')}")
@@ -995,53 +1255,54 @@ elif st.session_state.selected_tool == "🏥 Hospital Finder":
     with col1:
         query = st.text_input("🔍 What medical service do you need?",
             placeholder="E.g., Cardiac bypass surgery, NICU, Cancer chemotherapy, Bone marrow transplant...")
-        specializations = st.multiselect("Specializations needed:", [
-            "Cardiology","Neurology","Orthopedics","Pediatrics","Oncology",
-            "Nephrology","Gastroenterology","Pulmonology","General Surgery",
-            "Emergency & Trauma","Dermatology","Psychiatry","Ophthalmology",
-            "ENT","Gynecology","Urology","Endocrinology","Rheumatology"
-        ])
+        specializations = st.multiselect("Specializations needed:", SPECIALIZATIONS)
     with col2:
-        location = st.selectbox("📍 City / Region", [
-            "Pune","Mumbai","Delhi","Chennai","Bangalore","Hyderabad",
-            "Kolkata","Ahmedabad","Nagpur","Nashik","Aurangabad",
-            "Indore","Bhopal","Lucknow","Jaipur","Chandigarh"
-        ])
-        preferences = st.multiselect("Preferences:", [
-            "NABH Accredited","NABL Lab","Insurance Empanelled",
-            "24×7 Emergency","Government Hospital","Private Hospital",
-            "Teaching Hospital","Day Care Center"
-        ])
+        cities = service.directory.city_names
+        location = st.selectbox("📍 City / Region", cities, index=cities.index("Pune") if "Pune" in cities else 0)
+        pincode = st.text_input("📮 Or near pincode (optional):", max_chars=6, placeholder="E.g., 411038").strip()
+        radius_km = st.select_slider("Search radius:", options=[0, 2, 5, 10, 25, 50, 100], value=0,
+            format_func=lambda km: f"{km} km" if km else "Nearest", disabled=not pincode)
+        preferences = st.multiselect("Preferences:", PREFERENCES)
 
     insurance_info = st.text_input("Insurance / TPA (optional):",
         placeholder="E.g., Star Health, Medi Assist, CGHS, Ayushman Bharat...")
 
+    progress = None
     if st.button("🔍 Find Best Hospitals", type="primary", use_container_width=True):
         if not query:
             st.warning("Please describe what you're looking for.")
         else:
-            search_q = f"Find hospitals in {location} for: {query}"
-            if specializations: search_q += f" | Specializations: {', '.join(specializations)}"
-            if preferences: search_q += f" | Preferences: {', '.join(preferences)}"
-            if insurance_info: search_q += f" | Insurance: {insurance_info}"
-            search_q += " | Provide hospital names, estimated costs, contact info, and recommendation reasoning."
-
-            with st.spinner(""):
-                animated_analyzing([
-                    f"Searching hospitals in {location}...",
-                    "Filtering by specialization...",
-                    "Checking accreditation and quality ratings...",
-                    "Ranking by relevance to your needs..."
-                ])
-                result = api.find_hospitals(search_q, location)
-
-            st.session_state.total_queries += 1
-
-            if result.get("success"):
-                render_result(result["message"], f"Hospitals in {location}")
-                info_box("Always verify hospital details, availability, and costs directly before visiting.", "warn")
-            else:
-                st.error(f"❌ {result.get('error')}")
+            place = service.directory.locate(pincode) if pincode else None
+            if pincode and place is None:
+                st.warning(f"Pincode {pincode} is not in the local pincode list; showing hospitals in {location}.")
+            where = f"near {place.name}, {place.city} ({place.pincode})" if place else f"in {location}"
+            progress = StageProgress([
+                f"Ranking hospitals {where}...",
+                "Requesting recommendation reasoning...",
+                "Receiving recommendations...",
+                "Formatting recommendations..."
+            ])
+            shortlist = service.local_hospitals(query, location, specializations, preferences, insurance_info,
+                                                pincode=pincode, radius_km=radius_km or None)
+            progress.advance()
+
+            submit_job("hospital", service.hospitals, query, location, specializations, preferences,
+                       insurance_info, pincode, radius_km or None, meta={"location": where, "shortlist": shortlist})
+
+    job = page_job("hospital")
+    if job:
+        shortlist = job.meta.get("shortlist")
+        if shortlist:
+            result_header(f"Hospitals {job.meta['location']}")
+            st.dataframe(hospital_rows(shortlist), use_container_width=True, hide_index=True)
+        result, body = job_response(job, progress)
+
+        if result.get("success"):
+            render_result(body, "Why these hospitals" if shortlist else f"Hospitals {job.meta['location']}")
+            stream_failed(job)
+            info_box("Always verify hospital details, availability, and costs directly before visiting.", "warn")
+        else:
+            st.error(f"❌ {result.get('error')}")
 
 
 # ================================================================
@@ -1066,10 +1327,28 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
 
     st.markdown("<br/>", unsafe_allow_html=True)
 
+    def add_medicine():
+        """Append the name picked in the autocomplete box to the typed list"""
+        name = st.session_state.medicine_add
+        typed = st.session_state.get("medicine_input", "").rstrip()
+        if name:
+            st.session_state.medicine_input = f"{typed}\n{name}" if typed else name
+        st.session_state.medicine_add = ""
+
     # Medicine name input (works even without file)
     medicine_input = st.text_area("💊 Or type medicine names / prescription text:",
-        height=100,
+        height=100, key="medicine_input",
         placeholder="E.g., Tab. Metformin 500mg BD, Tab. Atorvastatin 40mg OD, Tab. Amlodipine 5mg OD\n\nOr just: Metformin, Aspirin, Pantoprazole")
+    st.selectbox("➕ Add a medicine (type to search brands and generics):", [""] + service.recognizer.names,
+        key="medicine_add", on_change=add_medicine)
+
+    # recognised locally as the user types, before anything is sent
+    prescription = service.recognize(medicine_input)
+    if prescription.rows:
+        st.dataframe(prescription_rows(prescription), use_container_width=True, hide_index=True)
+    for item in prescription.unrecognised:
+        suggestions = service.recognizer.did_you_mean(item)
+        st.caption(f"❔ Not recognised: {item}" + (f" — did you mean {', '.join(suggestions)}?" if suggestions else ""))
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -1084,43 +1363,69 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
         include_timing = st.checkbox("⏰ Best Time to Take", True)
         include_missed = st.checkbox("📌 Missed Dose Guidance", False)
 
+    parallel_sections = st.checkbox("⚡ Parallel sections — one faster request per enabled section", False,
+        help="Sends each section as its own smaller request at the same time and shows each one as soon as it's ready")
+
+    progress = None
     if st.button("🔬 Analyze Medicines", type="primary", use_container_width=True):
         if not uploaded_file and not medicine_input.strip():
             st.warning("Please upload a prescription or enter medicine names.")
         else:
-            parts = [f"{detail_level} medicine analysis"]
-            if medicine_input.strip(): parts.append(f"Medicines/text: {medicine_input}")
-            if patient_conditions: parts.append(f"Patient conditions: {patient_conditions}")
-            if include_generics: parts.append("List generic alternatives with cost savings percentage")
-            if check_interactions: parts.append("Check all drug-drug interactions with severity levels")
-            if include_side_effects: parts.append("List common and serious side effects")
-            if include_food: parts.append("List food-drug interactions")
-            if include_timing: parts.append("Provide optimal timing for each medicine")
-            if include_missed: parts.append("Include missed dose instructions")
-
-            analysis_msg = " | ".join(parts)
-
-            with st.spinner(""):
-                animated_analyzing([
-                    "Reading prescription...",
-                    "Identifying medicines and doses...",
-                    "Checking interaction database...",
-                    "Finding generic alternatives...",
-                    "Compiling medicine guide..."
-                ])
-                result = api.explain_medicines(analysis_msg,
-                    file_uploaded=bool(uploaded_file),
-                    file_name=uploaded_file.name if uploaded_file else None)
-
-            st.session_state.total_queries += 1
-
-            if result.get("success"):
-                tab1, tab2, tab3 = st.tabs(["💊 Medicine Guide", "💰 Cost Savings", "⚠️ Safety Notes"])
-                with tab1:
-                    render_result(result["message"], "Prescription Analysis")
-                with tab2:
-                    if include_generics:
-                        st.markdown("""
+            progress = StageProgress([
+                "Reading prescription...",
+                "Identifying medicines and doses...",
+                "Preparing interaction and generics checks...",
+                "Sending prescription for analysis...",
+                "Receiving medicine guide...",
+                "Compiling medicine guide..."
+            ])
+            try:
+                upload_digest(uploaded_file)
+                progress.advance()
+                document = read_upload(uploaded_file, "explain_medicines")
+                progress.advance()
+                toggles = [include_generics, check_interactions, include_side_effects, include_food, include_timing, include_missed]
+                enabled = [key for key, on in zip(MEDICINE_SECTIONS, toggles) if on]
+
+                if parallel_sections and len(enabled) > 1:
+                    calls = [(service.medicine_section, (key, document, detail_level, medicine_input, patient_conditions), {},
+                              {"section": MEDICINE_SECTIONS[key][0], "include_generics": include_generics})
+                             for key in enabled]
+                    progress.advance()
+                    submit_jobs("medicine", calls)
+                    progress.done()
+                    progress = None
+                else:
+                    progress.advance()
+
+                    submit_job("medicine", service.medicines, document, detail_level, medicine_input, patient_conditions,
+                               enabled, meta={"include_generics": include_generics})
+            except UploadTooLarge as e:
+                progress.done()
+                progress = None
+                st.error(f"❌ {e}")
+
+    jobs = page_jobs("medicine")
+    if jobs:
+        job = jobs[0]
+        sectioned = "section" in job.meta
+        if sectioned:
+            result = {"success": True}
+        else:
+            result, body = job_response(job, progress)
+
+        if result.get("success"):
+            tab1, tab2, tab3 = st.tabs(["💊 Medicine Guide", "💰 Cost Savings", "⚠️ Safety Notes"])
+            with tab1:
+                if sectioned:
+                    result_header("Prescription Analysis")
+                    render_sections(jobs)
+                else:
+                    render_result(body, "Prescription Analysis")
+                    stream_failed(job)
+            with tab2:
+                if job.meta["include_generics"]:
+                    st.markdown("""
 ### 💰 How to Save on Medicines
 
 **Key strategies:**
@@ -1135,11 +1440,11 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
 | Branded Atorvastatin | ₹150–200/strip | Atorvastatin 40mg | ~78% |
 | Branded Amlodipine | ₹60–100/strip | Amlodipine 5mg | ~80% |
 | Branded Pantoprazole | ₹70–90/strip | Pantoprazole 40mg | ~75% |
-                        """)
-                    else:
-                        st.info("Enable 'Generic Alternatives' to see cost savings.")
-                with tab3:
-                    st.markdown("""
+                    """)
+                else:
+                    st.info("Enable 'Generic Alternatives' to see cost savings.")
+            with tab3:
+                st.markdown("""
 ### ⚠️ Medicine Safety Checklist
 
 - ✅ Always take medicines at the prescribed dose and time
@@ -1148,10 +1453,10 @@ elif st.session_state.selected_tool == "💊 Medicine Explainer":
 - ⚠️ Never share prescription medicines with others
 - 🚨 Seek emergency care for severe allergic reactions (rash, breathing difficulty, swelling)
 - 📞 Keep Poison Control helpline handy: **1800-11-9000**
-                    """)
-                    info_box("This information is educational. Always consult your prescribing doctor before making changes.", "warn")
-            else:
-                st.error(f"❌ {result.get('error')}")
+                """)
+                info_box("This information is educational. Always consult your prescribing doctor before making changes.", "warn")
+        else:
+            st.error(f"❌ {result.get('error')}")
 
 
 # ================================================================
@@ -1171,58 +1476,128 @@ elif st.session_state.selected_tool == "💰 Bill Auditor":
     </div>
     """, unsafe_allow_html=True)
 
-    uploaded_file = st.file_uploader("📤 Upload Medical Bill",
-        type=['txt','pdf','docx','jpg','png','jpeg'],
+    batch_mode = st.toggle("📦 Batch mode — audit many bills or a .zip at once",
+        help="For billing desks and TPAs: every bill is extracted and audited separately, several at a time")
+    uploaded_file = None if batch_mode else st.file_uploader("📤 Upload Medical Bill",
+        type=BILL_TYPES,
         help="Upload your hospital bill, discharge summary with costs, or pharmacy invoice")
 
-    if uploaded_file:
+    if batch_mode:
+        batch_files = st.file_uploader("📤 Upload Bills",
+            type=BILL_TYPES + ['zip'], accept_multiple_files=True,
+            help="Select many bills, or one .zip of bills")
+        if batch_files:
+            st.markdown(f'<div class="success-box">✅ <strong>{len(batch_files)} file(s)</strong> selected — bills are audited {BATCH_WORKERS} at a time</div>', unsafe_allow_html=True)
+            st.markdown("<br/>", unsafe_allow_html=True)
+            options = bill_audit_options()
+            options["notes"] = st.text_area("Context for every bill (optional):",
+                height=80, placeholder="E.g., All bills are cashless claims under a Star Health group policy...")
+
+            if st.button("🔍 Audit All Bills", type="primary", use_container_width=True):
+                try:
+                    bills = expand_uploads(batch_files)
+                except Exception as e:
+                    bills = []
+                    st.error(f"❌ Could not read the upload: {e}")
+                if bills:
+                    submit_batch("bill_batch", bill_audit_task(options), bills)
+
+        jobs = page_jobs("bill_batch")
+        if jobs:
+            board = st.empty()
+            labels = {QUEUED: "⏳ Queued", RUNNING: "⚙️ Auditing", STREAMING: "⚙️ Auditing",
+                      DONE: "✅ Done", FAILED: "❌ Failed", CANCELLED: "🚫 Cancelled"}
+            while True:
+                pending = [job for job in jobs if not job.done]
+                finished = len(jobs) - len(pending)
+                with board.container():
+                    st.progress(finished / len(jobs), text=f"{finished} of {len(jobs)} bills audited")
+                    st.dataframe([{"Bill": job.meta["file"], "Status": labels[job.status]} for job in jobs],
+                                 use_container_width=True, hide_index=True)
+                if not pending:
+                    break
+                pending[0].wait_done(timeout=0.5)
+
+            audited = []
+            for job in jobs:
+                result = job.result or {}
+                findings = bill_findings(result.get("message") or job.text, result.get("local", {}))
+                status = ("failed" if job.status == FAILED else "cancelled" if job.status == CANCELLED
+                          else "demo" if result.get("demo_mode")
+                          else "ok" if result.get("success") else "error")
+                audited.append((job.meta["file"], status, findings))
+                if first_completion(job):
+                    st.session_state.total_savings += int(findings["overcharge"].sum())
+
+            with board.container():
+                result_header("Batch Audit Summary")
+                total = sum(int(f["overcharge"].sum()) for _, _, f in audited)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Bills audited", len(audited), f"{sum(s == 'failed' for _, s, _ in audited)} failed")
+                col2.metric("Potential overcharge", f"₹{total:,}")
+                col3.metric("Items flagged", sum(int((f["overcharge"] > 0).sum()) for _, _, f in audited))
+                st.dataframe([{"Bill": bill, "Status": labels[job.status] if status != "error" else "⚠️ Error",
+                               "Items flagged": int((f["overcharge"] > 0).sum()), "Overcharge (₹)": float(f["overcharge"].sum())}
+                              for job, (bill, status, f) in zip(jobs, audited)],
+                             use_container_width=True, hide_index=True)
+                col1, col2 = st.columns(2)
+                col1.download_button("⬇️ Findings (CSV)", findings_csv(audited),
+                                     file_name="bill_audit_findings.csv", mime="text/csv", use_container_width=True)
+                col2.download_button("⬇️ Per-bill results (JSONL)", findings_jsonl(audited),
+                                     file_name="bill_audit_results.jsonl", mime="application/jsonl", use_container_width=True)
+        elif not batch_files:
+            st.markdown("""
+            <div class="glass-card" style="text-align:center;padding:48px;opacity:0.6;">
+                <div style="font-size:48px;margin-bottom:12px;">📦</div>
+                <div style="color:var(--text-muted);font-size:14px;">Upload bills or a .zip to start a batch audit</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+    elif uploaded_file:
         file_size = uploaded_file.size / 1024
         st.markdown(f'<div class="success-box">✅ <strong>{uploaded_file.name}</strong> — {file_size:.1f} KB</div>', unsafe_allow_html=True)
         st.markdown("<br/>", unsafe_allow_html=True)
 
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**🔍 Audit Checks:**")
-            check_overcharges  = st.checkbox("Overcharges vs. standard rates", True)
-            check_duplicates   = st.checkbox("Duplicate / double-billed items", True)
-            check_unbundling   = st.checkbox("Unbundling of procedure charges", True)
-            check_upcoding     = st.checkbox("Upcoding / unnecessary upgrades", True)
-        with col2:
-            hospital_type = st.selectbox("Hospital Type:", ["Private","Government","Trust Hospital","Corporate Chain"])
-            insurance_type = st.selectbox("Payment Mode:", ["Self Pay","Health Insurance","CGHS","ECHS","Ayushman Bharat","ESI"])
-            city = st.selectbox("City (for local rate comparison):", [
-                "Pune","Mumbai","Delhi","Chennai","Bangalore","Hyderabad","Kolkata","Nagpur"
-            ])
+        options = bill_audit_options()
+
+        other_bills = st.file_uploader("➕ Other bills from the same admission (optional)",
+            type=BILL_TYPES, accept_multiple_files=True,
+            help="Pharmacy, lab or interim bills — duplicates and unbundled items are checked across all of them")
 
-        additional_notes = st.text_area("Additional context (optional):",
+        options["notes"] = st.text_area("Additional context (optional):",
             height=80, placeholder="E.g., Admitted for appendectomy, 3-day stay, semi-private room, covered under Star Health policy...")
 
+        progress = None
         if st.button("🔍 Audit This Bill", type="primary", use_container_width=True):
-            parts = ["Comprehensive medical bill audit"]
-            if check_overcharges: parts.append("Check all items vs. standard government/NPPA rates")
-            if check_duplicates: parts.append("Identify duplicate charges")
-            if check_unbundling: parts.append("Flag unbundled procedure items")
-            if check_upcoding: parts.append("Flag potential upcoding")
-            parts.append(f"Hospital type: {hospital_type} | Payment: {insurance_type} | City: {city}")
-            if additional_notes: parts.append(f"Context: {additional_notes}")
-            parts.append("Provide an itemized table, total potential overcharge, and specific recommendations to dispute each item.")
-
-            analysis_msg = " | ".join(parts)
-
-            with st.spinner(""):
-                animated_analyzing([
-                    "Reading bill items...",
-                    "Comparing with NPPA / government standard rates...",
-                    "Scanning for duplicate and bundled charges...",
-                    "Calculating overcharge totals...",
-                    "Generating dispute recommendations..."
-                ])
-                result = api.analyze_bill(analysis_msg, file_uploaded=True, file_name=uploaded_file.name)
-
-            st.session_state.total_queries += 1
+            progress = StageProgress([
+                "Reading bill items...",
+                "Extracting line items...",
+                "Preparing rate, duplicate and bundling checks...",
+                "Sending bill for audit...",
+                "Receiving audit...",
+                "Calculating overcharge totals..."
+            ])
+            try:
+                digest = upload_digest(uploaded_file)
+                progress.advance()
+                documents = [read_upload(uploaded_file, "analyze_bill")]
+                if options["duplicates"] or options["unbundling"]:
+                    documents += [read_upload(other, "analyze_bill") for other in other_bills or []
+                                  if upload_digest(other) != digest]
+                progress.advance(2)
+
+                submit_job("bill", service.bill, documents, options)
+            except UploadTooLarge as e:
+                progress.done()
+                progress = None
+                st.error(f"❌ {e}")
+
+        job = page_job("bill")
+        if job:
+            result, body = job_response(job, progress)
 
             success = result.get("success", False)
-            message = result.get("message", "")
+            message = body
             is_demo = result.get("demo_mode", False)
 
             if is_demo:
@@ -1235,12 +1610,23 @@ elif st.session_state.selected_tool == "💰 Bill Auditor":
             if message:
                 tab1, tab2 = st.tabs(["📊 Audit Report", "📋 How to Dispute"])
                 with tab1:
-                    render_result(message, "Bill Audit Report")
-                    # Extract potential savings from message if available
-                    savings_match = re.search(r'₹([\d,]+)\.00.*[Oo]vercharge', message)
-                    if savings_match:
-                        savings_num = int(savings_match.group(1).replace(',',''))
-                        st.session_state.total_savings += savings_num
+                    local = result.get("local", {})
+                    rate_rows = local.get("rate_rows", [])
+                    if rate_rows:
+                        result_header("Instant Rate Check")
+                        st.dataframe(rate_rows, use_container_width=True, hide_index=True)
+                        st.caption(f"{len(rate_rows)} items priced locally against reference rates · ₹{local['local_overcharge']:,} above reference")
+                    message = render_result(message, "Bill Audit Report")
+                    stream_failed(job)
+                    # Savings come from the report's itemized table; rows computed locally replace the report's
+                    findings = bill_findings(message, local)
+                    if findings["item"]:
+                        result_header("Itemized Findings")
+                        st.dataframe(findings_frame(findings), use_container_width=True, hide_index=True)
+                    savings_num = int(findings["overcharge"].sum())
+                    if savings_num:
+                        if first_completion(job):
+                            st.session_state.total_savings += savings_num
                         st.markdown(f"""
                         <div class="success-box" style="text-align:center;padding:20px;">
                             <div style="font-size:28px;font-weight:900;color:var(--accent3);">₹{savings_num:,}</div>
@@ -1335,54 +1721,33 @@ elif st.session_state.selected_tool == "🚨 Symptom Checker":
     </div>
     """, unsafe_allow_html=True)
 
+    progress = None
     if st.button("🔍 Analyze Symptoms", type="primary", use_container_width=True):
         if not symptoms.strip():
             st.warning("Please describe your symptoms.")
         else:
-            prompt = f"""Patient: {age}-year-old {gender}
-Symptoms: {symptoms}
-Duration: {duration}
-Severity: {severity}/10
-Known conditions: {known_conditions if known_conditions else 'None'}
-Current medications: {current_meds if current_meds else 'None'}
-
-Please provide:
-1. TRIAGE LEVEL: (Emergency / Urgent / Semi-Urgent / Non-Urgent) with color coding
-2. POSSIBLE CONDITIONS: Top 3-5 differential diagnoses with likelihood
-3. RED FLAGS: Any emergency warning signs to watch for
-4. IMMEDIATE ACTIONS: What to do right now
-5. RECOMMENDED SPECIALIST: Which type of doctor to consult
-6. HOME CARE: Safe symptomatic relief while awaiting appointment
-7. TIMELINE: When to seek care (immediately / within 24h / within a week / routine)
-
-Format clearly with headings. Include a clear triage classification at the top."""
-
-            with st.spinner(""):
-                animated_analyzing([
-                    "Parsing symptom profile...",
-                    f"Analyzing {age}-year-old {gender} patient data...",
-                    "Running differential diagnosis engine...",
-                    "Calculating triage urgency...",
-                    "Generating care recommendations..."
-                ])
-                result = api.qna_medical(prompt)
-
-            st.session_state.total_queries += 1
-
-            if result.get("success"):
-                answer = result["message"]
-
-                tab1, tab2 = st.tabs(["🩺 Triage Assessment", "📞 Emergency Contacts"])
-                with tab1:
-                    render_result(answer, "Symptom Triage Report")
-                    st.markdown("""
-                    <div class="danger-box">
-                        🚨 <strong>DISCLAIMER:</strong> This AI triage is NOT a diagnosis. It is for informational guidance only.
-                        Always consult a qualified physician. In any emergency, call <strong>108</strong> immediately.
-                    </div>
-                    """, unsafe_allow_html=True)
-                with tab2:
-                    st.markdown("""
+            progress = StageProgress([
+                "Parsing symptom profile...",
+                f"Requesting triage for {age}-year-old {gender} patient...",
+                "Receiving assessment...",
+                "Generating care recommendations..."
+            ])
+            pre_triage = service.pre_triage(symptoms, age, severity, known_conditions)
+            progress.advance()
+            # the short triage-only call races the full assessment and is dropped if it loses
+            profile = (symptoms, age, gender, duration, severity, known_conditions, current_meds)
+            meta = {"pre_triage": pre_triage}
+            full, quick = submit_jobs("symptom", [(service.symptoms, profile, {}, meta),
+                                                  (service.symptom_triage, profile, {}, meta)])
+            full.add_done_callback(lambda job: job.status == DONE and quick.cancel())
+
+    jobs = page_jobs("symptom")
+    if jobs:
+        job = jobs[0]
+        red_flag_banner(job.meta.get("pre_triage"))
+        tab1, tab2, tab3 = st.tabs(["🩺 Triage", "📋 Full Assessment", "📞 Emergency Contacts"])
+        with tab3:
+            st.markdown("""
 ### 📞 Emergency & Health Helplines (India)
 
 | Service | Number |
@@ -1397,7 +1762,20 @@ Format clearly with headings. Include a clear triage classification at the top."
 | 🤰 Janani Suraksha Yojana | **102** |
 
 *Save these in your phone!*
-                    """)
+            """)
+        with tab1:
+            triage_tab(job, jobs[1] if len(jobs) > 1 else None)
+        with tab2:
+            result, body = job_response(job, progress)
+            if result.get("success"):
+                render_result(body, "Symptom Triage Report")
+                stream_failed(job)
+                st.markdown("""
+                <div class="danger-box">
+                    🚨 <strong>DISCLAIMER:</strong> This AI triage is NOT a diagnosis. It is for informational guidance only.
+                    Always consult a qualified physician. In any emergency, call <strong>108</strong> immediately.
+                </div>
+                """, unsafe_allow_html=True)
             else:
                 st.error(f"❌ {result.get('error', 'Unknown error')}")
 
@@ -0,0 +1,179 @@
+"""Local text extraction for PDF, DOCX and image uploads.
+
+Parsing runs in a bounded pool of worker processes so CPU-heavy work never
+blocks the Streamlit server. Multi-page PDFs are split into page batches that
+are extracted in parallel under one deadline set when they are submitted.
+A running task cannot be cancelled, so workers still busy at the deadline are
+terminated and the pool is replaced; the spooled file is deleted only once
+every task on it has finished. Every backend is an
+optional dependency; missing ones simply extract nothing and the caller falls
+back to sending the file to the model.
+
+    pip install pypdf python-docx pytesseract pillow   # plus the tesseract binary
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from uploads import MAX_EXTRACT_MEMORY_BYTES, iter_chunks, limit_address_space, upload_view
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+
+PAGE_TIMEOUT = 10.0       # seconds per PDF page
+DOCUMENT_TIMEOUT = 60.0   # seconds for a DOCX or an image
+PAGES_PER_TASK = 8
+RECYCLE_WAIT = 5.0        # seconds for a terminated pool's futures to settle
+OCR_LANGS = os.environ.get("CHRONOCHECK_OCR_LANGS", "eng+hin")
+
+
+# ---------- worker-side functions (run in child processes) ----------
+def pdf_page_count(path):
+    return len(PdfReader(path).pages)
+
+
+def pdf_pages_text(path, start, stop):
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def docx_text(path):
+    document = docx.Document(path)
+    lines = [p.text for p in document.paragraphs if p.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            lines.append(" | ".join(cell.text.strip() for cell in row.cells))
+    return "\n".join(lines)
+
+
+def image_text(path):
+    with Image.open(path) as image:
+        return pytesseract.image_to_string(image, lang=OCR_LANGS)
+
+
+# ---------- dispatcher ----------
+def document_kind(file_name, content_type):
+    name = (file_name or "").lower()
+    content_type = content_type or ""
+    if content_type == "application/pdf" or name.endswith(".pdf"):
+        return "pdf" if PdfReader else None
+    if "wordprocessingml" in content_type or name.endswith(".docx"):
+        return "docx" if docx else None
+    if content_type.startswith("image/") or name.endswith((".png", ".jpg", ".jpeg")):
+        return "image" if pytesseract else None
+    return None
+
+
+class DocumentExtractor:
+    """Extracts text from uploads on a bounded, process-wide worker pool"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self.pool = self._new_pool()
+        self.recycled = 0
+
+    def _new_pool(self):
+        # spawn: forking the multi-threaded Streamlit server is not safe; each worker's memory is capped
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context("spawn"),
+                                   initializer=limit_address_space, initargs=(MAX_EXTRACT_MEMORY_BYTES,))
+
+    def supports(self, file_name, content_type):
+        return document_kind(file_name, content_type) is not None
+
+    def extract(self, fileobj, file_name, content_type):
+        """Text of a PDF/DOCX/image upload, or "" when no local backend can read it"""
+        kind = document_kind(file_name, content_type)
+        if kind is None:
+            return ""
+        path = spool_to_disk(fileobj, os.path.splitext(file_name or "")[1])
+        try:
+            if kind == "pdf":
+                return self._pdf(path)
+            fn = docx_text if kind == "docx" else image_text
+            [text] = self._run([(fn, path)], DOCUMENT_TIMEOUT)
+            return "" if isinstance(text, BaseException) else text
+        except Exception:  # corrupt documents fall back to the model
+            return ""
+        finally:
+            os.unlink(path)   # _run returns only once no worker is reading it
+
+    def _pdf(self, path):
+        [pages] = self._run([(pdf_page_count, path)], PAGE_TIMEOUT)
+        if isinstance(pages, BaseException):
+            return ""
+        batches = [(start, min(start + PAGES_PER_TASK, pages))
+                   for start in range(0, pages, PAGES_PER_TASK)]
+        # batches run concurrently, max_workers at a time, so the budget is a wave's pages per wave
+        waves = -(-len(batches) // self.max_workers)
+        outcomes = self._run([(pdf_pages_text, path, start, stop) for start, stop in batches],
+                             PAGE_TIMEOUT * min(pages, PAGES_PER_TASK * waves))
+        parts = []
+        for (start, stop), texts in zip(batches, outcomes):
+            if isinstance(texts, FutureTimeout):
+                texts = [f"[page {i + 1}: extraction timed out]" for i in range(start, stop)]
+            elif isinstance(texts, MemoryError):
+                texts = [f"[page {i + 1}: over the extraction memory limit]" for i in range(start, stop)]
+            elif isinstance(texts, BaseException):
+                texts = [f"[page {i + 1}: unreadable]" for i in range(start, stop)]
+            for i, text in enumerate(texts, start + 1):
+                if text.strip():
+                    parts.append(f"--- Page {i} ---\n{text.strip()}")
+        return "\n\n".join(parts)
+
+    def _run(self, calls, timeout):
+        """Result or exception of each (fn, *args) call, all sharing one deadline from submission.
+
+        Calls still running at the deadline become FutureTimeout and their pool is recycled; returns
+        only once every call has settled, so the caller may delete the files they read.
+        """
+        with self._lock:
+            pool = self.pool
+        futures = [pool.submit(fn, *args) for fn, *args in calls]
+        _, pending = wait(futures, timeout=timeout)
+        if pending:
+            self._recycle(pool)
+            wait(pending, timeout=RECYCLE_WAIT)
+        outcomes = [FutureTimeout() if f in pending else f.exception() or f.result() for f in futures]
+        if any(isinstance(o, BrokenProcessPool) for o in outcomes):
+            self._recycle(pool)   # a crashed worker breaks the whole pool
+        return outcomes
+
+    def _recycle(self, pool):
+        """Terminate a pool's workers and replace it; other uploads' tasks on it fail and fall back"""
+        with self._lock:
+            if self.pool is not pool:
+                return
+            self.pool = self._new_pool()
+            self.recycled += 1
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()   # the executor has no public way to stop a running task
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def spool_to_disk(fileobj, suffix=""):
+    """Copy an upload to a temp file chunk by chunk so worker processes can open it by path"""
+    fd, path = tempfile.mkstemp(prefix="chronocheck-", suffix=suffix)
+    with os.fdopen(fd, "wb") as out, upload_view(fileobj) as view:
+        for chunk in iter_chunks(view):
+            out.write(chunk)
+    return path
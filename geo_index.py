@@ -0,0 +1,87 @@
+"""Grid index for nearest-hospital search by coordinates.
+
+Points are bucketed into fixed latitude/longitude cells (geohash-style
+buckets with integer keys) and stored sorted by cell key: one sorted key
+array plus the points' coordinates in the same order. Cells on one latitude
+row have consecutive keys, so a radius query looks up every row's key range
+with one vectorised searchsorted and measures distance only to the points in
+those cells. Nearest-neighbour callers widen the radius until enough points
+qualify. Longitudes do not wrap at ±180°, which no Indian query comes near.
+
+Pincode centroids come from data/pincodes.csv, so a pincode search works
+offline.
+"""
+import csv
+import os
+from collections import namedtuple
+
+import numpy as np
+
+PINCODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pincodes.csv")
+EARTH_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_KM / 180   # along a meridian
+CELL_DEGREES = 0.05                     # about 5.5 km of latitude
+
+Place = namedtuple("Place", "pincode name city lat lon")
+
+
+def load_pincodes(path=PINCODES_PATH):
+    """{pincode: Place} from the local centroid file"""
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    return {r["pincode"]: Place(r["pincode"], r["name"], r["city"], float(r["lat"]), float(r["lon"])) for r in rows}
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGrid:
+    """Points bucketed by grid cell, answering radius queries nearest first"""
+
+    def __init__(self, lat, lon, cell=CELL_DEGREES):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        self.cell = cell
+        self.columns = int(np.ceil(360 / cell)) + 1
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))   # points without coordinates are left out
+        keys = self._keys(lat[valid], lon[valid])
+        order = np.argsort(keys, kind="stable")
+        self.ids = valid[order]           # caller's index of each stored point
+        self.keys = keys[order]
+        self.lat, self.lon = lat[self.ids], lon[self.ids]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90) / self.cell).astype(np.int64)
+
+    def _column(self, lon):
+        return np.floor((np.asarray(lon) + 180) / self.cell).astype(np.int64)
+
+    def _keys(self, lat, lon):
+        return self._row(lat) * self.columns + self._column(lon)
+
+    def within(self, lat, lon, radius_km):
+        """(point indices, distances in km) of the points within radius_km, nearest first"""
+        span = radius_km / KM_PER_DEGREE
+        south, north = max(lat - span, -90.0), min(lat + span, 90.0)
+        cos = np.cos(np.radians(max(abs(south), abs(north))))
+        span_lon = 180.0 if cos < 1e-9 else min(span / cos, 180.0)
+        rows = np.arange(self._row(south), self._row(north) + 1) * self.columns
+        starts = np.searchsorted(self.keys, rows + self._column(max(lon - span_lon, -180.0)), side="left")
+        ends = np.searchsorted(self.keys, rows + self._column(min(lon + span_lon, 180.0)), side="right")
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        # the concatenated ranges [starts[i], ends[i]) without a Python loop
+        slots = np.arange(total) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        distances = haversine_km(lat, lon, self.lat[slots], self.lon[slots])
+        inside = distances <= radius_km
+        slots, distances = slots[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.ids[slots[order]], distances[order]
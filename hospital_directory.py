@@ -0,0 +1,398 @@
+"""Local hospital directory for the Hospital Finder.
+
+data/hospitals.csv is compiled into bitsets. Hospitals are grouped by city,
+best first (NABH accredited, then most beds), each city padded to whole
+64-bit words, and every feature (speciality, NABH/NABL, 24×7 emergency,
+government/private, teaching, day care, each TPA or scheme) is one row of
+uint64 words over all hospitals. A search slices its city's words out of the
+requested features' rows and ANDs them, and the first k set bits are the top
+k. When fewer than k hospitals have everything, the rest are ranked by how
+many of the requested features they have. Only the reasoning for the top
+matches is left to the model.
+
+Searches near a pincode use a GeoGrid over the hospitals' coordinates
+(geo_index.py) instead of a city: hospitals within the radius, nearest
+first, tested against the same bitsets through their bit positions.
+
+The compiled arrays are kept next to the CSV as an .npz (no pickles) and
+rebuilt whenever the CSV is newer.
+"""
+import csv
+import os
+import re
+import tempfile
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+
+from geo_index import PINCODES_PATH, GeoGrid, haversine_km, load_pincodes
+from red_flags import trie_pattern
+from text_index import normalize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+HOSPITALS_PATH = os.path.join(DATA_DIR, "hospitals.csv")
+TERMS_PATH = os.path.join(DATA_DIR, "hospital_terms.csv")
+TOP_K = 5
+NEAREST_START_KM = 5     # k-nearest searches widen from this radius, doubling each time
+NEAREST_MAX_KM = 4000    # wider than India
+NEAREST_DIRECT = 4096    # at most this many all-feature matches nationwide are measured without the grid
+FORMAT_VERSION = 1   # bump when the compiled layout changes, so stale .npz files are rebuilt
+TPA = "TPA: "
+
+SPECIALIZATIONS = (
+    "Cardiology", "Neurology", "Orthopedics", "Pediatrics", "Oncology",
+    "Nephrology", "Gastroenterology", "Pulmonology", "General Surgery",
+    "Emergency & Trauma", "Dermatology", "Psychiatry", "Ophthalmology",
+    "ENT", "Gynecology", "Urology", "Endocrinology", "Rheumatology",
+)
+_SPECIALIZATIONS = frozenset(SPECIALIZATIONS)
+PREFERENCES = (
+    "NABH Accredited", "NABL Lab", "Insurance Empanelled",
+    "24×7 Emergency", "Government Hospital", "Private Hospital",
+    "Teaching Hospital", "Day Care Center",
+)
+TEXT_COLUMNS = ("name", "area", "ownership")   # lists (specialities, TPAs, ...) are read back from the bitsets
+NUMBER_COLUMNS = {"pincode": np.int32, "lat": np.float32, "lon": np.float32, "beds": np.int32}
+
+# matched/missing: the requested features this hospital has / lacks; distance_km only for searches near a pincode
+Hospital = namedtuple("Hospital", "name city area pincode ownership beds accreditations specializations tpas "
+                                  "matched missing distance_km", defaults=(None,))
+
+
+def split_list(value):
+    return [v.strip() for v in (value or "").split(";") if v.strip()]
+
+
+def hospital_features(row):
+    """Directory features of one CSV row, named as on the Hospital Finder page"""
+    accreditations, tpas = split_list(row["accreditations"]), split_list(row["tpas"])
+    features = split_list(row["specializations"])
+    features += [label for label, has in (
+        ("NABH Accredited", "NABH" in accreditations),
+        ("NABL Lab", "NABL" in accreditations),
+        ("Insurance Empanelled", bool(tpas)),
+        ("24×7 Emergency", row["emergency"] == "Y"),
+        ("Government Hospital", row["ownership"] == "Government"),
+        ("Private Hospital", row["ownership"] != "Government"),
+        ("Teaching Hospital", row["teaching"] == "Y"),
+        ("Day Care Center", row["day_care"] == "Y"),
+    ) if has]
+    return features + [TPA + t for t in tpas]
+
+
+def load_terms(path=TERMS_PATH):
+    """{normalised term: feature}"""
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    return {normalize(r["term"]): r["feature"] for r in rows}
+
+
+def _blob(strings):
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _unblob(array, count):
+    return array.tobytes().decode("utf-8").split("\n") if count else []
+
+
+def _first_bits(words, k):
+    """Positions of the first k set bits of a uint64 bitset"""
+    positions = []
+    for w in np.flatnonzero(words).tolist():
+        word = int(words[w])
+        while word and len(positions) < k:
+            low = word & -word
+            positions.append(w * 64 + low.bit_length() - 1)
+            word ^= low
+        if len(positions) == k:
+            break
+    return positions
+
+
+class HospitalDirectory:
+    """Hospitals grouped by city with one bitset per feature, searched by bitset intersection"""
+
+    def __init__(self, columns, cities, city_rows, features, bits, terms=None, pincodes=None):
+        self.columns = columns            # column -> list/array with one entry per hospital
+        self.city_names = list(cities)
+        self.cities = {c: i for i, c in enumerate(cities)}
+        self.city_rows = np.asarray(city_rows, dtype=np.int64)   # hospitals of city i: rows [r[i], r[i + 1])
+        self.city_words = np.concatenate([[0], np.cumsum((np.diff(self.city_rows) + 63) // 64)])
+        self.feature_names = list(features)
+        self.features = {f: i for i, f in enumerate(features)}
+        self.bits = bits                  # (features, words) uint64
+        present = np.zeros(int(self.city_words[-1]) * 64, dtype=bool)
+        for c, n in enumerate(np.diff(self.city_rows)):
+            present[self.city_words[c] * 64:self.city_words[c] * 64 + n] = True
+        self.present = np.packbits(present, bitorder="little").view("<u8")
+        rows = np.arange(self.city_rows[-1])
+        self.row_city = np.searchsorted(self.city_rows, rows, side="right") - 1
+        self.positions = self.city_words[self.row_city] * 64 + rows - self.city_rows[self.row_city]   # row -> bit
+        self.bit_rows = np.full(len(present), -1, dtype=np.int64)
+        self.bit_rows[self.positions] = rows
+        self.grid = GeoGrid(columns["lat"], columns["lon"])
+        self.pincodes = pincodes if pincodes is not None else {}
+        terms = terms if terms is not None else {}
+        insurance = {normalize(f[len(TPA):]): f for f in features if f.startswith(TPA)}
+        insurance.update({t: f for t, f in terms.items() if f.startswith(TPA)})
+        self.query_terms = {t: f for t, f in terms.items() if not f.startswith(TPA)}
+        self.insurance_terms = insurance
+        self.query_re = re.compile(rf"\b({trie_pattern(self.query_terms)})\b") if self.query_terms else None
+        self.insurance_re = re.compile(rf"\b({trie_pattern(insurance)})\b") if insurance else None
+
+    # ---------- building and storage ----------
+    @classmethod
+    def from_rows(cls, rows, terms=None):
+        rows = sorted(rows, key=lambda r: (r["city"], "NABH" not in split_list(r["accreditations"]),
+                                           -int(r["beds"] or 0)))
+        cities = sorted({r["city"] for r in rows})
+        city_rows = np.searchsorted([r["city"] for r in rows], cities + [chr(0x10FFFF)], side="left")
+        city_words = np.concatenate([[0], np.cumsum((np.diff(city_rows) + 63) // 64)])
+        row_features = [hospital_features(r) for r in rows]
+        features = list(dict.fromkeys(list(SPECIALIZATIONS) + list(PREFERENCES)
+                                      + sorted({f for fs in row_features for f in fs})))
+        feature_ix = {f: i for i, f in enumerate(features)}
+        flags = np.zeros((len(features), int(city_words[-1]) * 64), dtype=bool)
+        city_ix = {c: i for i, c in enumerate(cities)}
+        for row, (r, fs) in enumerate(zip(rows, row_features)):
+            c = city_ix[r["city"]]
+            flags[[feature_ix[f] for f in fs], city_words[c] * 64 + row - city_rows[c]] = True
+        bits = np.packbits(flags, axis=1, bitorder="little").view("<u8")
+        columns = {name: [r[name] for r in rows] for name in TEXT_COLUMNS}
+        columns.update({name: np.array([r[name] or ("nan" if dtype is np.float32 else 0) for r in rows], dtype=dtype)
+                        for name, dtype in NUMBER_COLUMNS.items()})
+        return cls(columns, cities, city_rows, features, bits, terms)
+
+    @classmethod
+    def from_csv(cls, path=HOSPITALS_PATH, terms=None):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_rows(list(csv.DictReader(line for line in f if not line.startswith("#"))), terms)
+
+    def save(self, path):
+        """Write the compiled directory as a compressed, pickle-free .npz, replacing it whole"""
+        n = len(self.columns["name"])
+        arrays = {f"text_{name}": _blob(self.columns[name]) for name in TEXT_COLUMNS}
+        arrays.update({name: self.columns[name] for name in NUMBER_COLUMNS})
+        # readers in other sessions or processes must never open a half-written archive
+        fd, staging = tempfile.mkstemp(prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, version=np.array([FORMAT_VERSION]), count=np.array([n]), cities=_blob(self.city_names), city_rows=self.city_rows,
+                         features=_blob(self.feature_names), bits=self.bits, **arrays)
+            os.replace(staging, path)
+        except BaseException:
+            os.unlink(staging)
+            raise
+
+    @classmethod
+    def read(cls, path, terms=None):
+        with np.load(path, allow_pickle=False) as z:
+            if "version" not in z or int(z["version"][0]) != FORMAT_VERSION:
+                raise ValueError(f"{path} was compiled by another version")
+            n = int(z["count"][0])
+            columns = {name: _unblob(z[f"text_{name}"], n) for name in TEXT_COLUMNS}
+            columns.update({name: z[name] for name in NUMBER_COLUMNS})
+            city_rows = z["city_rows"]
+            return cls(columns, _unblob(z["cities"], len(city_rows) - 1), city_rows,
+                       _unblob(z["features"], len(z["bits"])), z["bits"], terms)
+
+    @classmethod
+    def load(cls, path=HOSPITALS_PATH, terms_path=TERMS_PATH, pincodes_path=PINCODES_PATH):
+        """The directory from its compiled .npz, compiling and caching it when missing or older than the CSV"""
+        directory = cls._load(path, load_terms(terms_path))
+        directory.pincodes = load_pincodes(pincodes_path)
+        return directory
+
+    @classmethod
+    def _load(cls, path, terms):
+        compiled = os.path.splitext(path)[0] + ".npz"
+        if os.path.exists(compiled) and os.path.getmtime(compiled) >= os.path.getmtime(path):
+            try:
+                return cls.read(compiled, terms)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                pass
+        directory = cls.from_csv(path, terms)
+        try:
+            directory.save(compiled)
+        except OSError:
+            pass
+        return directory
+
+    # ---------- search ----------
+    def requested(self, query="", specializations=(), preferences=(), insurance=""):
+        """Features asked for: the selections, then those named in the query and insurance text"""
+        found = []
+        for pattern, terms, text in ((self.query_re, self.query_terms, query),
+                                     (self.insurance_re, self.insurance_terms, insurance)):
+            if pattern is not None and text:
+                found += [terms[re.sub(r"\s+", " ", m)] for m in pattern.findall(normalize(text))]
+        return list(dict.fromkeys(list(specializations) + list(preferences) + found))
+
+    def search(self, city, features=(), k=TOP_K):
+        """Top k hospitals of city having all features, then those having most of them"""
+        c = self.cities.get(city)
+        if c is None:
+            return []
+        ws, we = self.city_words[c], self.city_words[c + 1]
+        ids = [self.features[f] for f in features if f in self.features]
+        if not ids:
+            top = _first_bits(self.present[ws:we], k)
+        else:
+            block = self.bits[ids, ws:we]
+            top = _first_bits(np.bitwise_and.reduce(block, axis=0), k)
+            if len(top) < k:
+                # count each hospital's requested features; within a count, storage order is rank order
+                counts = np.unpackbits(block.view(np.uint8), axis=1, bitorder="little").sum(axis=0)
+                top = []
+                for level in range(len(ids), 0, -1):
+                    top += np.flatnonzero(counts == level)[:k - len(top)].tolist()
+                    if len(top) == k:
+                        break
+        top = np.array(top, dtype=np.int64)
+        return self._hospitals(self.city_rows[c] + top, ws * 64 + top, features)
+
+    def locate(self, pincode):
+        """Place (centroid) of a pincode, or None when it is not in the local file"""
+        return self.pincodes.get(str(pincode or "").replace(" ", ""))
+
+    def _counts(self, ids, rows):
+        """How many of the feature ids each row has"""
+        if not ids:
+            return np.zeros(len(rows), dtype=np.int64)
+        positions = self.positions[rows]
+        flags = (self.bits[np.ix_(ids, positions >> 6)] >> (positions & 63).astype(np.uint64)) & np.uint64(1)
+        return flags.sum(axis=0, dtype=np.int64)
+
+    def _around(self, lat, lon, ids, radius_km, enough=None):
+        """(rows nearest first, distances, feature counts) within radius_km, doubling it until enough(counts)"""
+        while True:
+            rows, distances = self.grid.within(lat, lon, radius_km)
+            counts = self._counts(ids, rows)
+            if enough is None or radius_km >= NEAREST_MAX_KM or enough(counts):
+                return rows, distances, counts
+            radius_km *= 2
+
+    def nearest(self, lat, lon, features=(), k=TOP_K, radius_km=None):
+        """Nearest k hospitals having all features, then nearby ones having most of them.
+
+        With radius_km only hospitals within it are considered. Without, when
+        few hospitals anywhere have everything, they are measured directly;
+        otherwise the grid search widens until k of them are found.
+        """
+        ids = [self.features[f] for f in features if f in self.features]
+        if radius_km:
+            rows, distances, counts = self._around(lat, lon, ids, radius_km)
+        elif not ids:
+            rows, distances, counts = self._around(lat, lon, ids, NEAREST_START_KM, lambda c: len(c) >= k)
+        else:
+            full = np.bitwise_and.reduce(self.bits[ids], axis=0)
+            flags = np.unpackbits(full.view(np.uint8), bitorder="little").view(bool)
+            if np.count_nonzero(flags) > NEAREST_DIRECT:
+                rows, distances, counts = self._around(
+                    lat, lon, ids, NEAREST_START_KM, lambda c: np.count_nonzero(c == len(ids)) >= k)
+            else:
+                rows = self.bit_rows[np.flatnonzero(flags)]
+                distances = haversine_km(lat, lon, self.columns["lat"][rows], self.columns["lon"][rows])
+                distances = np.where(np.isnan(distances), np.inf, distances)   # hospitals without coordinates
+                order = np.argpartition(distances, k)[:k] if len(rows) > k else np.arange(len(rows))
+                order = order[np.argsort(distances[order], kind="stable")]
+                order = order[np.isfinite(distances[order])]
+                rows, distances = rows[order], distances[order]
+                counts = np.full(len(rows), len(ids))
+                if len(rows) < k:
+                    more = self._around(lat, lon, ids, NEAREST_START_KM,
+                                        lambda c: np.count_nonzero((c > 0) & (c < len(ids))) >= k - len(order))
+                    partial = more[2] < len(ids)
+                    rows, distances, counts = (np.concatenate([have, extra[partial]])
+                                               for have, extra in zip((rows, distances, counts), more))
+        # rows are nearest first (all-feature matches ahead of the rest), and the sort by count is stable
+        top = np.argsort(-counts, kind="stable")[:k]
+        if ids:
+            top = top[counts[top] > 0]
+        return self._hospitals(rows[top], self.positions[rows[top]], features, distances[top])
+
+    def _hospitals(self, rows, positions, features, distances=None):
+        """Hospital tuples for rows, their features read from one gather of their bit columns"""
+        flags = (self.bits[:, positions >> 6] >> (positions & 63).astype(np.uint64)) & np.uint64(1)
+        names = [[] for _ in range(len(rows))]
+        for j, i in zip(*(a.tolist() for a in np.nonzero(flags.T))):
+            names[j].append(self.feature_names[i])
+        col = self.columns
+        distances = [None] * len(rows) if distances is None else np.round(distances, 1).tolist()
+        hospitals = []
+        for row, row_names, distance in zip(rows.tolist(), names, distances):
+            has = set(row_names)
+            hospitals.append(Hospital(
+                col["name"][row], self.city_names[self.row_city[row]], col["area"][row], int(col["pincode"][row]),
+                col["ownership"][row],
+                int(col["beds"][row]), [a for a, f in (("NABH", "NABH Accredited"), ("NABL", "NABL Lab")) if f in has],
+                [f for f in row_names if f in _SPECIALIZATIONS], [f[len(TPA):] for f in row_names if f[:5] == TPA],
+                [f for f in features if f in has], [f for f in features if f not in has], distance))
+        return hospitals
+
+    def find(self, city, query="", specializations=(), preferences=(), insurance="", k=TOP_K, pincode="",
+             radius_km=None):
+        """Search near pincode when it is known, else in city"""
+        features = self.requested(query, specializations, preferences, insurance)
+        place = self.locate(pincode)
+        if place is not None:
+            return self.nearest(place.lat, place.lon, features, k, radius_km)
+        return self.search(city, features, k)
+
+
+def hospital_rows(hospitals):
+    """Shortlisted hospitals as display rows for st.dataframe, with city and distance for searches near a pincode"""
+    rows = []
+    for h in hospitals:
+        row = {"Hospital": h.name, "Area": h.area}
+        if h.distance_km is not None:
+            row.update({"City": h.city, "Distance": f"{h.distance_km:g} km"})
+        row.update({
+            "Type": h.ownership,
+            "Beds": h.beds,
+            "Accreditation": ", ".join(h.accreditations),
+            "Matches": ", ".join(f.removeprefix(TPA) for f in h.matched),
+            "Missing": ", ".join(f.removeprefix(TPA) for f in h.missing),
+        })
+        rows.append(row)
+    return rows
+
+
+def benchmark(n=100_000, cities=16, towns=500, queries=2000, seed=0):
+    """Microseconds per city search, per 10 km radius search and per 5-nearest search over n synthetic hospitals"""
+    import random
+    import time
+    rng = random.Random(seed)
+    tpas = ["Star Health", "Medi Assist", "CGHS", "Ayushman Bharat", "HDFC Ergo", "ECHS"]
+    centres = [(rng.uniform(8, 32), rng.uniform(70, 92)) for _ in range(towns)]   # hospitals cluster in towns
+    rows = []
+    for i in range(n):
+        town = min(int(rng.paretovariate(1.2)) - 1, towns - 1) if rng.random() < 0.5 else rng.randrange(towns)
+        rows.append({"name": f"Hospital {i}", "city": f"City {town % cities}", "area": "", "pincode": "0",
+                     "lat": str(rng.gauss(centres[town][0], 0.08)), "lon": str(rng.gauss(centres[town][1], 0.08)),
+                     "ownership": rng.choice(["Government", "Private", "Trust"]),
+                     "beds": str(rng.randint(20, 2000)), "emergency": rng.choice("YN"), "teaching": rng.choice("NNY"),
+                     "day_care": rng.choice("YN"), "accreditations": rng.choice(["", "NABH", "NABH;NABL", "NABL"]),
+                     "specializations": ";".join(rng.sample(SPECIALIZATIONS, rng.randint(1, 12))),
+                     "tpas": ";".join(rng.sample(tpas, rng.randint(0, 4)))})
+    directory = HospitalDirectory.from_rows(rows)
+    asks = [(f"City {rng.randrange(cities)}", rng.sample(SPECIALIZATIONS, rng.randint(1, 3))
+             + rng.sample(PREFERENCES, rng.randint(0, 3)) + [TPA + rng.choice(tpas)] * rng.randint(0, 1),
+             *(c + rng.gauss(0, 0.05) for c in rng.choice(centres)))
+            for _ in range(queries)]
+    timings = []
+    for search in (lambda city, features, lat, lon: directory.search(city, features),
+                   lambda city, features, lat, lon: directory.nearest(lat, lon, features, radius_km=10),
+                   lambda city, features, lat, lon: directory.nearest(lat, lon, features)):
+        started = time.perf_counter()
+        for ask in asks:
+            search(*ask)
+        timings.append((time.perf_counter() - started) / queries * 1e6)
+    return timings, directory.bits.nbytes
+
+
+if __name__ == "__main__":
+    (city, radius, nearest), size = benchmark()
+    print(f"{city:.0f} µs per city search over 100,000 hospitals ({size / 1024:.0f} KiB of bitsets)")
+    print(f"{radius:.0f} µs per 10 km radius search, {nearest:.0f} µs per 5-nearest search")
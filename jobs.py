@@ -0,0 +1,168 @@
+"""Background jobs for tool calls.
+
+A job runs one tool call on a shared, bounded worker pool, independent of
+the Streamlit script run that submitted it. A rerun (any widget click) no
+longer throws the work away: the job keeps going, its id stays in
+``st.session_state`` and the page picks the result up on the next run. Text
+is collected as it streams in, so a page can also follow a running job live.
+Finished jobs are kept for ``ttl`` seconds so users can navigate away and
+come back. A job that is no longer needed can be cancelled: a queued one never
+runs, and a streaming one stops reading and closes its stream, which drops the
+backend connection.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, STREAMING, DONE, FAILED, CANCELLED = (
+    "queued", "running", "streaming", "done", "failed", "cancelled")
+
+
+class Job:
+    def __init__(self, job_id, meta=None):
+        self.id = job_id
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.result = None     # head of the tool result ("stream" replaced by the final "message")
+        self.chunks = []
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.cond = threading.Condition()
+        self._callbacks = []
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def streaming(self):
+        return self.status == STREAMING
+
+    @property
+    def text(self):
+        with self.cond:
+            return "".join(self.chunks)
+
+    def _set(self, **fields):
+        """Update fields and wake waiters; a cancelled job keeps its state. True if applied"""
+        with self.cond:
+            if self.status == CANCELLED:
+                return False
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.cond.notify_all()
+            callbacks = self._callbacks if self.done else []
+            if self.done:
+                self._callbacks = []
+        for fn in callbacks:
+            fn(self)
+        return True
+
+    def add_done_callback(self, fn):
+        """Call fn(job) once the job has finished, failed or been cancelled (now, if it already has)"""
+        with self.cond:
+            if not self.done:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def cancel(self):
+        """Stop the job if it hasn't finished; its worker closes the stream at the next chunk"""
+        with self.cond:
+            if self.done:
+                return False
+            self.status, self.finished = CANCELLED, time.time()
+            self.cond.notify_all()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+        return True
+
+    def wait_started(self, timeout=None):
+        """Block until the tool call returned its head (or failed); True if it did"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.status in (STREAMING, DONE, FAILED), timeout)
+
+    def wait_done(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.done, timeout)
+
+    def follow(self):
+        """Yield the answer text: what has arrived so far, then new chunks until the job ends"""
+        i = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: i < len(self.chunks) or self.done)
+                new = self.chunks[i:]
+                i = len(self.chunks)
+                finished = self.done
+            for chunk in new:
+                yield chunk
+            if finished and i == len(self.chunks):
+                return
+
+
+class JobQueue:
+    """Shared bounded pool of tool-call workers plus a TTL store of their jobs"""
+
+    def __init__(self, max_workers=16, ttl=3600, lanes=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chronocheck-job")
+        # separately bounded pools, so one bulk request can't take every worker
+        self.lanes = {name: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"chronocheck-{name}")
+                      for name, n in (lanes or {}).items()}
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, meta=None, lane=None, **kwargs):
+        """Queue fn(*args, **kwargs) (a tool call returning a result dict) and return its Job"""
+        job = Job(uuid.uuid4().hex, meta)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        pool = self.lanes[lane] if lane else self.pool
+        pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        if not job._set(status=RUNNING):
+            return
+        try:
+            result = dict(fn(*args, **kwargs))
+            stream = result.pop("stream", None)
+            if stream is None:
+                job._set(result=result, chunks=[result.get("message", "")], status=DONE,
+                         finished=time.time())
+                return
+            if job._set(result=result, status=STREAMING):
+                for chunk in stream:
+                    with job.cond:
+                        if job.status == CANCELLED:
+                            break
+                        job.chunks.append(chunk)
+                        job.cond.notify_all()
+            if job.status == CANCELLED:
+                stream.close()   # releases the backend response instead of reading it to the end
+                return
+            result["message"] = job.text
+            job._set(status=DONE, finished=time.time())
+        except Exception as e:
+            # a stream that breaks off keeps its partial text, but the answer is not a success
+            job._set(result={**(job.result or {}), "success": False, "error": str(e), "message": job.text},
+                     error=str(e), status=FAILED, finished=time.time())
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.done)
+            return {"jobs": len(self._jobs), "active": active}
@@ -0,0 +1,266 @@
+"""Pooled, thread-safe Langflow client shared by every CHRONOCHECK session.
+
+Configured from the environment:
+
+    LANGFLOW_BASE_URL      e.g. http://localhost:7860 (required)
+    LANGFLOW_API_KEY       sent as x-api-key when set
+    LANGFLOW_FLOW_QNA      flow id for Medical Q&A and Symptom Checker
+    LANGFLOW_FLOW_REPORT   flow id for Report Analyzer
+    LANGFLOW_FLOW_HOSPITAL flow id for Hospital Finder
+    LANGFLOW_FLOW_MEDICINE flow id for Medicine Explainer
+    LANGFLOW_FLOW_BILL     flow id for Bill Auditor
+    LANGFLOW_FLOW_TRANSLATE flow id for translating answers (default: the Q&A flow)
+    LANGFLOW_POOL_SIZE     max keep-alive connections (default 32)
+    LANGFLOW_TIMEOUT       read timeout in seconds (default 120)
+    LANGFLOW_WARMUP        "1" to open a connection at startup
+    LANGFLOW_FILE_COMPONENT id of the File component that receives uploaded documents
+"""
+import json
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from uploads import iter_multipart, new_boundary
+
+FLOW_ENV = {
+    "qna": "LANGFLOW_FLOW_QNA",
+    "report": "LANGFLOW_FLOW_REPORT",
+    "hospital": "LANGFLOW_FLOW_HOSPITAL",
+    "medicine": "LANGFLOW_FLOW_MEDICINE",
+    "bill": "LANGFLOW_FLOW_BILL",
+    "translate": "LANGFLOW_FLOW_TRANSLATE",
+}
+
+
+class StreamError(Exception):
+    """A streamed answer broke off before Langflow's end event"""
+
+
+def with_file_name(message, file_uploaded, file_name):
+    if file_uploaded and file_name:
+        return f"[Uploaded file: {file_name}]\n{message}"
+    return message
+
+
+TOOL_FLOWS = {
+    "qna_medical": "qna",
+    "analyze_report": "report",
+    "find_hospitals": "hospital",
+    "explain_medicines": "medicine",
+    "analyze_bill": "bill",
+    "symptom_check": "qna",
+}
+
+# tool method name -> (flow, input text[, uploaded file path])
+ROUTES = {
+    "qna_medical": lambda question: ("qna", question),
+    "analyze_report": lambda user_message, file_uploaded=False, file_name=None, file_path=None:
+        ("report", with_file_name(user_message, file_uploaded, file_name), file_path),
+    "find_hospitals": lambda query, location="": ("hospital", query),
+    "explain_medicines": lambda user_message, file_uploaded=False, file_name=None, file_path=None:
+        ("medicine", with_file_name(user_message, file_uploaded, file_name), file_path),
+    "analyze_bill": lambda user_message, file_uploaded=False, file_name=None, file_path=None:
+        ("bill", with_file_name(user_message, file_uploaded, file_name), file_path),
+    "symptom_check": lambda symptoms, age, gender:
+        ("qna", f"Patient: {age}-year-old {gender}\nSymptoms: {symptoms}"),
+    "translate": lambda message: ("translate", message),
+}
+
+
+class LangflowClient:
+    """Langflow run-API client backed by one bounded keep-alive connection pool.
+
+    A single instance is meant to live for the whole server process. The
+    underlying urllib3 pool is thread-safe, and ``pool_block=True`` makes
+    extra concurrent callers wait for a free connection instead of opening
+    unbounded new ones.
+    """
+
+    def __init__(self, base_url, flows, api_key=None, pool_size=32, timeout=120.0, file_component=None):
+        self.base_url = base_url.rstrip("/")
+        self.flows = flows
+        self.file_component = file_component
+        self.timeout = (5.0, timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.2,
+                              allowed_methods=frozenset({"GET"})),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+        if api_key:
+            self.session.headers["x-api-key"] = api_key
+
+    @classmethod
+    def from_env(cls):
+        flows = {tool: os.environ.get(var, "") for tool, var in FLOW_ENV.items()}
+        flows["translate"] = flows["translate"] or flows["qna"]
+        return cls(
+            os.environ["LANGFLOW_BASE_URL"],
+            flows,
+            api_key=os.environ.get("LANGFLOW_API_KEY"),
+            pool_size=int(os.environ.get("LANGFLOW_POOL_SIZE", "32")),
+            timeout=float(os.environ.get("LANGFLOW_TIMEOUT", "120")),
+            file_component=os.environ.get("LANGFLOW_FILE_COMPONENT"),
+        )
+
+    def warm_up(self):
+        """Open a pooled connection (TCP + TLS) before the first real request"""
+        try:
+            self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+            return True
+        except requests.RequestException:
+            return False
+
+    def close(self):
+        self.session.close()
+
+    # ---------- transport ----------
+    def _payload(self, message, file_path):
+        payload = {"input_value": message, "input_type": "chat", "output_type": "chat"}
+        if file_path and self.file_component:
+            payload["tweaks"] = {self.file_component: {"path": file_path}}
+        return payload
+
+    def _run(self, flow, message, file_path=None):
+        flow_id = self.flows.get(flow)
+        if not flow_id:
+            return {"success": False, "error": f"Langflow flow for '{flow}' is not configured"}
+        payload = self._payload(message, file_path)
+        try:
+            resp = self.session.post(f"{self.base_url}/api/v1/run/{flow_id}",
+                                     json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+            return {"success": True, "message": extract_message(resp.json())}
+        except requests.RequestException as e:
+            return {"success": False, "error": f"Langflow request failed: {e}"}
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return {"success": False, "error": f"Unexpected Langflow response: {e}"}
+
+    def _stream(self, flow, message, file_path=None):
+        flow_id = self.flows.get(flow)
+        if not flow_id:
+            return {"success": False, "error": f"Langflow flow for '{flow}' is not configured"}
+        payload = self._payload(message, file_path)
+        try:
+            resp = self.session.post(f"{self.base_url}/api/v1/run/{flow_id}",
+                                     params={"stream": "true"}, json=payload,
+                                     timeout=self.timeout, stream=True)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            return {"success": False, "error": f"Langflow request failed: {e}"}
+        return {"success": True, "stream": TokenStream(resp)}
+
+    def stream(self, tool, *args, **kwargs):
+        """Call a tool in streaming mode; on success the result's "stream" key yields text chunks"""
+        return self._stream(*ROUTES[tool](*args, **kwargs))
+
+    def upload_file(self, tool, fileobj, file_name, content_type=None):
+        """Send a document to a tool's flow as a streamed multipart body; returns its server path"""
+        flow = TOOL_FLOWS[tool]
+        flow_id = self.flows.get(flow)
+        if not flow_id:
+            return {"success": False, "error": f"Langflow flow for '{flow}' is not configured"}
+        boundary = new_boundary()
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/api/v1/files/upload/{flow_id}",
+                data=iter_multipart(fileobj, file_name, content_type, boundary),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            return {"success": True, "file_path": resp.json()["file_path"]}
+        except requests.RequestException as e:
+            return {"success": False, "error": f"Langflow upload failed: {e}"}
+        except (ValueError, KeyError) as e:
+            return {"success": False, "error": f"Unexpected Langflow upload response: {e}"}
+
+    # ---------- tools ----------
+    def qna_medical(self, question):
+        return self._run(*ROUTES["qna_medical"](question))
+
+    def analyze_report(self, user_message, file_uploaded=False, file_name=None, file_path=None):
+        return self._run(*ROUTES["analyze_report"](user_message, file_uploaded, file_name, file_path))
+
+    def find_hospitals(self, query, location=""):
+        return self._run(*ROUTES["find_hospitals"](query, location))
+
+    def explain_medicines(self, user_message, file_uploaded=False, file_name=None, file_path=None):
+        return self._run(*ROUTES["explain_medicines"](user_message, file_uploaded, file_name, file_path))
+
+    def analyze_bill(self, user_message, file_uploaded=False, file_name=None, file_path=None):
+        return self._run(*ROUTES["analyze_bill"](user_message, file_uploaded, file_name, file_path))
+
+    def symptom_check(self, symptoms, age, gender):
+        return self._run(*ROUTES["symptom_check"](symptoms, age, gender))
+
+    def translate(self, message):
+        return self._run(*ROUTES["translate"](message))
+
+
+class TokenStream:
+    """Token chunks of a streamed response (see iter_stream_tokens) that own the response.
+
+    close() releases the pooled connection even before the first chunk is read; closing a
+    generator that never started runs none of its code, so its finally would never run.
+    """
+
+    def __init__(self, resp):
+        self.resp = resp
+        self.chunks = iter_stream_tokens(resp)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def close(self):
+        self.chunks.close()
+        self.resp.close()
+
+
+def iter_stream_tokens(resp):
+    """Yield token chunks from a Langflow ?stream=true response, then release the connection.
+
+    Raises StreamError when the connection fails, a line is not a valid event
+    or the response ends without an end event, so a cut-off answer is never
+    taken for a complete one.
+    """
+    streamed = False
+    try:
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            data = event.get("data") or {}
+            if event.get("event") == "token" and data.get("chunk"):
+                streamed = True
+                yield data["chunk"]
+            elif event.get("event") == "end":
+                # flows without a streaming-capable model only report the final message
+                if not streamed and data.get("result"):
+                    yield extract_message(data["result"])
+                return
+        raise StreamError("Langflow stream ended before the answer was complete")
+    except requests.RequestException as e:
+        raise StreamError(f"Langflow stream failed: {e}") from e
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise StreamError(f"Unexpected Langflow stream event: {e}") from e
+    finally:
+        resp.close()
+
+
+def extract_message(data):
+    """Pull the chat text out of a Langflow /run response"""
+    result = data["outputs"][0]["outputs"][0]["results"]["message"]
+    if isinstance(result.get("text"), str):
+        return result["text"]
+    return result["data"]["text"]
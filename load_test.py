@@ -0,0 +1,155 @@
+"""Requests per second of the HTTP API against the Streamlit app, over a stub Langflow.
+
+    python load_test.py --requests 200 --concurrency 16 --latency 0.2
+
+A local stub stands in for Langflow and answers every flow run after --latency
+seconds, so both paths pay the same backend time and the difference is what
+serving costs. The API path POSTs /v1/qna to server.py under uvicorn. The
+Streamlit path runs a fresh session of code.py per request through Streamlit's
+AppTest (first run, type the question, click the button), the script reruns a
+browser session triggers; AppTest drives one session per process, so those run
+in --concurrency worker processes. Every request asks a different question, so no
+answer comes from a cache.
+"""
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+
+import requests
+
+QUESTION = "What does a raised {} level in a blood test mean for patient {}?"
+MARKERS = ["ALT", "creatinine", "HbA1c", "TSH", "ferritin", "CRP", "bilirubin", "urea"]
+
+
+class StubLangflow(BaseHTTPRequestHandler):
+    """Langflow's run endpoint, answering after self.server.latency seconds"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.server.latency)
+        text = "Stub answer to: " + str(body.get("input_value", ""))[:60]
+        message = {"results": {"message": {"text": text}}}
+        if "stream=true" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for event in ({"event": "token", "data": {"chunk": text}},
+                          {"event": "end", "data": {"result": {"outputs": [{"outputs": [message]}]}}}):
+                data = (json.dumps(event) + "\n\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        data = json.dumps({"outputs": [{"outputs": [message]}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency):
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubLangflow)
+    stub.latency = latency
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    return stub
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def questions(n, offset):
+    return [QUESTION.format(MARKERS[i % len(MARKERS)], offset + i) for i in range(n)]
+
+
+def timed(pool, fn, items):
+    """(requests per second, failures) of fn over items on pool"""
+    started = time.perf_counter()
+    failures = sum(not ok for ok in pool.map(fn, items))
+    return len(items) / (time.perf_counter() - started), failures
+
+
+def api_rate(items, concurrency):
+    import uvicorn
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config("server:app", host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    local = threading.local()
+
+    def ask(question):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        resp = local.session.post(f"http://127.0.0.1:{port}/v1/qna", json={"question": question})
+        return resp.ok and resp.json().get("success")
+
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            return timed(pool, ask, items)
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def streamlit_session(question=None):
+    """One fresh browser session of code.py asking question on the Q&A page"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "code.py"),
+                           default_timeout=120)
+    at.session_state["selected_tool"] = "🧠 Medical Q&A"
+    at.run()
+    if question:
+        at.text_area[0].set_value(question)
+        next(b for b in at.button if b.proto.type == "primary").click().run()
+    return not at.exception and not at.error
+
+
+def _warm(seconds):
+    time.sleep(seconds)   # holds each worker so every one starts and runs its first session
+
+
+def streamlit_rate(items, concurrency):
+    # AppTest drives one session per process at a time, so concurrent sessions need processes;
+    # it also runs code.py as the workers' __main__, so tasks are pickled by this module's name
+    import load_test
+    with ProcessPoolExecutor(concurrency, mp_context=get_context("spawn"),
+                             initializer=load_test.streamlit_session) as pool:
+        list(pool.map(load_test._warm, [1.0] * concurrency))
+        return timed(pool, load_test.streamlit_session, items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare API and Streamlit requests per second")
+    parser.add_argument("--requests", type=int, default=200, help="questions asked on each path (default 200)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once (default 16)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub Langflow answer time in seconds")
+    args = parser.parse_args(argv)
+    stub = start_stub(args.latency)
+    os.environ["LANGFLOW_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}"
+    os.environ.setdefault("LANGFLOW_FLOW_QNA", "qna")
+    os.environ["LANGFLOW_POOL_SIZE"] = str(args.concurrency)
+    print(f"{args.requests} Q&A requests, {args.concurrency} at a time, {args.latency:.2f}s backend latency")
+    for name, rate in (("HTTP API", api_rate), ("Streamlit", streamlit_rate)):
+        offset = 0 if name == "HTTP API" else args.requests
+        per_second, failures = rate(questions(args.requests, offset), args.concurrency)
+        print(f"{name:10} {per_second:8.1f} req/s" + (f"  ({failures} failed)" if failures else ""))
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
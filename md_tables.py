@@ -0,0 +1,89 @@
+"""Markdown tables in model answers, split out and converted to Arrow.
+
+Large pipe tables render slowly as markdown and are re-sent whole on every
+rerun. ``split_markdown`` cuts an answer into prose and table blocks so the
+app can hand big tables to ``st.dataframe`` as typed ``pyarrow`` tables
+(client-side sort and filter) while the rest stays markdown.
+"""
+import hashlib
+import re
+
+import pyarrow as pa
+
+LARGE_TABLE_ROWS = 15
+_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_NUMBER = re.compile(r"^(?:₹|rs\.?|inr)?\s*(-?\d[\d,]*(?:\.\d+)?)\s*(?:/-|%)?$", re.I)
+_MARKUP = re.compile(r"^[*_`]+|[*_`]+$")
+
+
+def _cells(line):
+    return [_MARKUP.sub("", c.strip()) for c in line.strip().strip("|").split("|")]
+
+
+def split_markdown(text):
+    """[("text", str) | ("table", header, rows)] blocks in the order they appear"""
+    blocks, prose = [], []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        if "|" in lines[i] and i + 1 < len(lines) and _SEPARATOR.match(lines[i + 1]):
+            header = _cells(lines[i])
+            j = i + 2
+            rows = []
+            while j < len(lines) and "|" in lines[j] and lines[j].strip():
+                rows.append(_cells(lines[j]))
+                j += 1
+            if prose:
+                blocks.append(("text", "\n".join(prose)))
+                prose = []
+            blocks.append(("table", header, rows))
+            i = j
+            continue
+        prose.append(lines[i])
+        i += 1
+    if prose:
+        blocks.append(("text", "\n".join(prose)))
+    return blocks
+
+
+def table_markdown(header, rows):
+    """Back to a pipe table, for tables small enough to stay markdown"""
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def table_digest(header, rows):
+    content = "\n".join("\x1f".join(row) for row in [header, *rows])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _column(values):
+    """float64 column when every non-empty cell is a number or amount, else strings"""
+    numbers = []
+    for value in values:
+        if not value or value in ("-", "—", "N/A"):
+            numbers.append(None)
+            continue
+        match = _NUMBER.match(value)
+        if not match:
+            return pa.array(values, type=pa.string())
+        numbers.append(float(match.group(1).replace(",", "")))
+    if all(n is None for n in numbers):
+        return pa.array(values, type=pa.string())
+    return pa.array(numbers, type=pa.float64())
+
+
+def to_arrow(header, rows):
+    """Typed Arrow table from a parsed markdown table (ragged rows are padded)"""
+    names, seen = [], set()
+    for i, name in enumerate(header):
+        name = name or f"Column {i + 1}"
+        while name in seen:
+            name += " "
+        seen.add(name)
+        names.append(name)
+    width = len(names)
+    padded = [(row + [""] * width)[:width] for row in rows]
+    columns = [_column([row[i] for row in padded]) for i in range(width)]
+    return pa.table(columns, names=names)
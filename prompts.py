@@ -0,0 +1,206 @@
+"""Prompt builders for the six tools, shared by the Streamlit app and batch_runner.py.
+
+Each builder takes plain values (what the page widgets produce) and returns
+the message sent to the backend, so the same request can be made from a
+browser session or from the command line.
+"""
+import re
+
+from bill_audit import line_item_checks, rate_check
+from hospital_directory import TPA
+from prescriptions import describe
+
+LEVEL_PROMPTS = {
+    "Patient-Friendly": "Please explain this simply, as if talking to a patient with no medical background. Avoid jargon. Use analogies where helpful.",
+    "Medical Student": "Explain at a medical student level. Include relevant pathophysiology, clinical correlations, and medical terminology with brief explanations.",
+    "Professional": "Provide a comprehensive, professional clinical analysis. Include mechanisms, differentials, clinical guidelines, evidence-based recommendations, and full medical terminology."
+}
+
+# key -> (section title, instruction), in page order
+MEDICINE_SECTIONS = {
+    "generics": ("💰 Generic Alternatives", "List generic alternatives with cost savings percentage"),
+    "interactions": ("⚠️ Drug Interactions", "Check all drug-drug interactions with severity levels"),
+    "side_effects": ("🩺 Side Effects", "List common and serious side effects"),
+    "food": ("🍽️ Food Interactions", "List food-drug interactions"),
+    "timing": ("⏰ Best Time to Take", "Provide optimal timing for each medicine"),
+    "missed": ("📌 Missed Dose Guidance", "Include missed dose instructions"),
+}
+DEFAULT_MEDICINE_SECTIONS = ("generics", "interactions", "side_effects", "food", "timing")
+
+DEFAULT_BILL_OPTIONS = {"overcharges": True, "duplicates": True, "unbundling": True, "upcoding": True,
+                        "hospital_type": "Private", "insurance_type": "Self Pay", "city": "Pune", "notes": ""}
+
+
+def attach_document(message, document_text):
+    """Append extracted document text to a tool message"""
+    if not document_text.strip():
+        return message
+    return f"{message}\n\nDocument content:\n{document_text}"
+
+
+def qna_prompt(question, level="Patient-Friendly", lang_name="English"):
+    enhanced_q = question
+    enhanced_q += f"\n\n[Instruction: {LEVEL_PROMPTS.get(level, '')}]"
+    if lang_name != "English":
+        enhanced_q += f"\n\n[CRITICAL: Respond ENTIRELY in {lang_name}. All explanations, headings, and content must be in {lang_name}.]"
+    return enhanced_q
+
+
+def report_prompt(document_text, analysis_focus="Comprehensive", patient_age=35, normal_ranges=True,
+                  recommendations=True, risk_flags=True, notes="", output_lang="English"):
+    parts = [f"{analysis_focus} analysis", f"Patient age: {patient_age}"]
+    if normal_ranges: parts.append("Include normal ranges")
+    if recommendations: parts.append("Provide actionable recommendations")
+    if risk_flags: parts.append("Flag any critical/risk values with urgency level")
+    if notes: parts.append(f"Additional context: {notes}")
+    if output_lang != "English": parts.append(f"Respond in {output_lang}")
+    return attach_document(" | ".join(parts), document_text)
+
+
+def hospital_query(query, location, specializations=(), preferences=(), insurance=""):
+    search_q = f"Find hospitals in {location} for: {query}"
+    if specializations: search_q += f" | Specializations: {', '.join(specializations)}"
+    if preferences: search_q += f" | Preferences: {', '.join(preferences)}"
+    if insurance: search_q += f" | Insurance: {insurance}"
+    search_q += " | Provide hospital names, estimated costs, contact info, and recommendation reasoning."
+    return search_q
+
+
+def hospital_reasoning_prompt(query, location, hospitals, insurance=""):
+    """Reasoning only, for hospitals already shortlisted and ranked from the local directory"""
+    lines = []
+    for i, h in enumerate(hospitals, 1):
+        facts = [f"{h.ownership}, {h.beds} beds", ", ".join(h.accreditations) or "no NABH/NABL listed"]
+        if h.distance_km is not None:
+            facts.insert(0, f"{h.distance_km:g} km away")
+        if h.missing:
+            facts.append(f"lacks: {', '.join(f.removeprefix(TPA) for f in h.missing)}")
+        lines.append(f"{i}. {h.name}, {h.area}, {h.city} ({'; '.join(facts)})")
+    need = f"Patient need in {location}: {query}" + (f" | Insurance: {insurance}" if insurance else "")
+    return (f"{need}\n\nThese hospitals were shortlisted and ranked from a local directory:\n" + "\n".join(lines)
+            + "\n\nFor each hospital, in this order, write 2-3 sentences on why it suits this need and what to "
+              "confirm before visiting (availability, estimated costs, insurance acceptance). Do not add other "
+              "hospitals or change the order.")
+
+
+def _medicine_parts(detail_level, medicines, conditions, prescription=None):
+    parts = [f"{detail_level} medicine analysis"]
+    rows = "; ".join(map(describe, prescription.rows)) if prescription else ""
+    if rows and not prescription.unrecognised: parts.append(f"Medicines: {rows}")
+    elif medicines.strip(): parts.append(f"Medicines/text: {medicines}" + (f" (recognised: {rows})" if rows else ""))
+    if conditions: parts.append(f"Patient conditions: {conditions}")
+    return parts
+
+
+def interaction_instruction(check=None):
+    """The interactions instruction without the pairs checked locally; None when none are left for the model"""
+    default = MEDICINE_SECTIONS["interactions"][1]
+    if check is None or not (check.complete or check.known):
+        return default
+    if not check.complete:   # the text may name medicines the local list does not know
+        return f"{default}, except these pairs, which were already checked: " + "; ".join(
+            f"{i.a} + {i.b}" for i in check.known)
+    if not check.unknown:
+        return None
+    return "Check drug-drug interactions with severity levels only for these pairs (the others were checked): " + \
+        "; ".join(f"{a} + {b}" for a, b in check.unknown)
+
+
+def _section_instructions(sections, interactions=None):
+    """[(key, title, instruction)] of the enabled sections the model still has to write"""
+    instructions = []
+    for key, (title, instruction) in MEDICINE_SECTIONS.items():
+        if key == "interactions":
+            instruction = interaction_instruction(interactions)
+        if key in sections and instruction:
+            instructions.append((key, title, instruction))
+    return instructions
+
+
+def medicine_prompt(document_text, detail_level="Basic", medicines="", conditions="",
+                    sections=DEFAULT_MEDICINE_SECTIONS, interactions=None, prescription=None):
+    parts = _medicine_parts(detail_level, medicines, conditions, prescription)
+    parts += [instruction for _, _, instruction in _section_instructions(sections, interactions)]
+    return attach_document(" | ".join(parts), document_text)
+
+
+def medicine_section_prompts(document_text, detail_level="Basic", medicines="", conditions="",
+                             sections=DEFAULT_MEDICINE_SECTIONS, interactions=None, prescription=None):
+    """[(section title, message)]: one smaller request per enabled section the model still has to write"""
+    parts = _medicine_parts(detail_level, medicines, conditions, prescription)
+    return [(title, attach_document(" | ".join(parts + [instruction, "Cover only this section, concisely"]),
+                                    document_text))
+            for _, title, instruction in _section_instructions(sections, interactions)]
+
+
+def bill_prompt(bills, options, index, rules):
+    """Local checks and the audit prompt for one admission's (name, text) bills; returns (message, meta)"""
+    document_text = bills[0][1]
+    line_checks = None
+    if (options["duplicates"] or options["unbundling"]) and document_text:
+        line_checks = line_item_checks(bills, options["duplicates"], options["unbundling"], rules)
+    rate_rows, local_overcharge = [], 0
+    if options["overcharges"] and document_text:
+        rate_rows, local_overcharge, document_text = rate_check(
+            document_text, options["city"], options["hospital_type"], index)
+    parts = ["Comprehensive medical bill audit"]
+    if options["overcharges"]: parts.append("Check all items vs. standard government/NPPA rates")
+    if options["duplicates"]: parts.append("Identify duplicate charges")
+    if options["unbundling"]: parts.append("Flag unbundled procedure items")
+    if options["upcoding"]: parts.append("Flag potential upcoding")
+    parts.append(f"Hospital type: {options['hospital_type']} | Payment: {options['insurance_type']} | City: {options['city']}")
+    if options.get("notes"): parts.append(f"Context: {options['notes']}")
+    parts.append("Provide an itemized table, total potential overcharge, and specific recommendations to dispute each item.")
+
+    analysis_msg = attach_document(" | ".join(parts), document_text)
+    if line_checks and line_checks["item"]:
+        flagged = "\n".join(f"- {item}: {note}" for item, note in zip(line_checks["item"], line_checks["note"]))
+        analysis_msg += f"\n\nAlready flagged locally as duplicate/unbundled (do not add to your total):\n{flagged}"
+    return analysis_msg, {"rate_rows": rate_rows, "local_overcharge": local_overcharge, "line_checks": line_checks}
+
+
+def translation_prompt(text, language):
+    return (f"Translate the following medical text into {language}. Keep the markdown formatting, numbers, units, "
+            f"medicine names and test names exactly as they are. Reply with the translation only.\n\n{text}")
+
+
+def symptom_prompt(age, gender, symptoms, duration="", severity=5, known_conditions="", current_meds=""):
+    return f"""Patient: {age}-year-old {gender}
+Symptoms: {symptoms}
+Duration: {duration}
+Severity: {severity}/10
+Known conditions: {known_conditions if known_conditions else 'None'}
+Current medications: {current_meds if current_meds else 'None'}
+
+Please provide:
+1. TRIAGE LEVEL: (Emergency / Urgent / Semi-Urgent / Non-Urgent) with color coding
+2. POSSIBLE CONDITIONS: Top 3-5 differential diagnoses with likelihood
+3. RED FLAGS: Any emergency warning signs to watch for
+4. IMMEDIATE ACTIONS: What to do right now
+5. RECOMMENDED SPECIALIST: Which type of doctor to consult
+6. HOME CARE: Safe symptomatic relief while awaiting appointment
+7. TIMELINE: When to seek care (immediately / within 24h / within a week / routine)
+
+Format clearly with headings. Include a clear triage classification at the top."""
+
+
+def symptom_triage_prompt(age, gender, symptoms, duration="", severity=5, known_conditions="", current_meds=""):
+    """Triage level only: the short request sent alongside symptom_prompt's full assessment"""
+    return f"""Patient: {age}-year-old {gender}
+Symptoms: {symptoms}
+Duration: {duration}
+Severity: {severity}/10
+Known conditions: {known_conditions if known_conditions else 'None'}
+Current medications: {current_meds if current_meds else 'None'}
+
+Give ONLY the triage, in at most 60 words and exactly three lines:
+TRIAGE LEVEL: Emergency / Urgent / Semi-Urgent / Non-Urgent
+SEEK CARE: immediately / within 24h / within a week / routine
+WHY: one short sentence
+No diagnoses, no other sections."""
+
+
+def triage_section(assessment):
+    """The triage part of a full symptom_prompt answer (everything before POSSIBLE CONDITIONS)"""
+    head = re.split(r"\n[#*>\s]*(?:2\s*[.)]|POSSIBLE CONDITIONS)", assessment, maxsplit=1)[0]
+    return head.strip()
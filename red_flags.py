@@ -0,0 +1,149 @@
+"""Local red-flag pre-triage for the Symptom Checker.
+
+The phrases in data/red_flags.csv (English, romanised Hindi and the nine
+Indian scripts the app offers) are compiled into one trie-shaped regex that
+starts with a word-separator class, so the scan skips straight from word
+start to word start and each is tried against every phrase at once. A batch
+of texts is normalised and scanned as one string, with matches mapped back to
+their text by binary search. Severity, age and known conditions then adjust
+the level.
+
+This only looks for warning signs; "no red flags" is not a triage level, and
+the model's assessment still follows.
+"""
+import csv
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+
+RED_FLAGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "red_flags.csv")
+LEVELS = (None, "urgent", "emergency")
+HIGH_SEVERITY = 8       # urgent on its own, with no red-flag phrase
+ESCALATE_SEVERITY = 7   # urgent becomes emergency at this severity for high-risk patients
+RISK_AGES = (2, 65)     # younger than 2 or at least 65
+NEGATIONS = ("no", "not", "without", "denies", "denied")
+_SEPARATOR = r"[\s\x00,.;:!?()\[\]\"'/\-]"   # phrases only match at the start of a word
+_NEGATED = re.compile(r"\b(?:%s)\s+$" % "|".join(NEGATIONS))
+
+Triage = namedtuple("Triage", "level flags")   # level: "emergency", "urgent" or None
+NO_FLAGS = Triage(None, ())
+
+
+def normalize(text):
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text).replace("’", "'")
+    return text.lower()
+
+
+def trie_pattern(phrases):
+    """Regex alternation of phrases with shared prefixes factored out"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        ends = "" in node
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if ends else body
+
+    return build(trie)
+
+
+class RedFlagMatcher:
+    """Emergency/urgent classification of symptom descriptions from a compiled phrase table"""
+
+    def __init__(self, path=RED_FLAGS_PATH):
+        with open(path, encoding="utf-8") as f:
+            rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+        self.phrases = {}   # normalised phrase -> (level index, flag)
+        self.risks = {}
+        for r in rows:
+            table = self.risks if r["level"] == "risk" else self.phrases
+            table[normalize(r["phrase"])] = (LEVELS.index(r["level"]) if table is self.phrases else 0, r["flag"])
+        self.symptom_re = re.compile(f"{_SEPARATOR}({trie_pattern(self.phrases)})")
+        self.risk_re = re.compile(f"{_SEPARATOR}({trie_pattern(self.risks)})")
+
+    @staticmethod
+    def _scan(pattern, table, texts, negation=False):
+        """(text index, table entry) for every match, in one pass over all texts"""
+        joined = "\x00" + "\x00".join(texts)
+        if joined.count("\x00") != len(texts):   # a NUL inside a text would shift every later row
+            joined = "\x00" + "\x00".join(t.replace("\x00", " ") for t in texts)
+        if not joined.isascii():
+            joined = "\x00" + "\x00".join(map(normalize, joined[1:].split("\x00")))
+        joined = joined.lower()
+        matches = [(m.start(1), m.group(1)) for m in pattern.finditer(joined)
+                   if not (negation and _NEGATED.search(joined, max(0, m.start(1) - 12), m.start(1)))]
+        if not matches:
+            return []
+        starts = np.flatnonzero(np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32) == 0)
+        rows = np.searchsorted(starts, [pos for pos, _ in matches], side="right") - 1
+        return [(row, table.get(phrase) or table[re.sub(r"\s+", " ", phrase)])
+                for row, (_, phrase) in zip(rows.tolist(), matches)]
+
+    def classify_many(self, symptoms, severity=None, age=None, known_conditions=None):
+        """[Triage] for parallel sequences (severity, age and known_conditions may be None)"""
+        n = len(symptoms)
+        severity = np.asarray([5] * n if severity is None else severity, dtype=np.int64)
+        age = np.asarray([30] * n if age is None else age, dtype=np.int64)
+        levels = np.zeros(n, dtype=np.int64)
+        flags = [[] for _ in range(n)]
+        symptoms = [t or "" for t in symptoms]
+        for row, (level, flag) in self._scan(self.symptom_re, self.phrases, symptoms, negation=True):
+            if level > levels[row]:
+                levels[row] = level
+            if flag not in flags[row]:
+                flags[row].append(flag)
+        high = (severity >= HIGH_SEVERITY) & (levels == 0)
+        for row in np.flatnonzero(high):
+            flags[row].append(f"Severity {severity[row]}/10")
+        levels[high] = 1
+        risk = (age < RISK_AGES[0]) | (age >= RISK_AGES[1])
+        risk_flags = [[] for _ in range(n)]
+        if known_conditions is not None:
+            for row, (_, flag) in self._scan(self.risk_re, self.risks, [t or "" for t in known_conditions]):
+                risk_flags[row].append(flag)
+                risk[row] = True
+        escalate = (levels == 1) & risk & (severity >= ESCALATE_SEVERITY)
+        for row in np.flatnonzero(escalate):
+            flags[row].append(f"Age {age[row]}" if not risk_flags[row] else ", ".join(dict.fromkeys(risk_flags[row])))
+        levels[escalate] = 2
+        return [Triage(LEVELS[level], tuple(f)) if f else NO_FLAGS for level, f in zip(levels.tolist(), flags)]
+
+    def classify(self, symptoms, severity=5, age=30, known_conditions=""):
+        return self.classify_many([symptoms], [severity], [age], [known_conditions])[0]
+
+
+def benchmark(n=100_000, seed=0):
+    """Texts per second classified by classify_many on this core"""
+    import random
+    import time
+    rng = random.Random(seed)
+    matcher = RedFlagMatcher()
+    phrases = list(matcher.phrases)
+    fillers = ["headache for two days", "mild fever and body ache", "runny nose and cough", "loose motions",
+               "feeling tired since morning", "pain after eating", "rash on arms", "itching at night"]
+    texts = [f"{rng.choice(fillers)}, {rng.choice(fillers)}" + (f" and {rng.choice(phrases)}" if rng.random() < 0.3 else "")
+             for _ in range(n)]
+    severity = [rng.randint(1, 10) for _ in range(n)]
+    age = [rng.randint(0, 90) for _ in range(n)]
+    conditions = [rng.choice(["", "", "diabetes", "asthma", "none"]) for _ in range(n)]
+    started = time.perf_counter()
+    matcher.classify_many(texts, severity, age, conditions)
+    elapsed = time.perf_counter() - started
+    return n / elapsed, sum(map(len, texts)) / n
+
+
+if __name__ == "__main__":
+    rate, length = benchmark()
+    print(f"{rate:,.0f} symptom texts/s (average {length:.0f} characters)")
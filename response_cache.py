@@ -0,0 +1,148 @@
+"""Process-wide LRU + TTL cache for tool responses.
+
+Entries are keyed on the final prompt string each tool sends (plus the upload
+hash, if any), so two sessions asking the exact same question share one
+answer. Only successful responses are stored.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import ClosingStream
+
+# seconds an answer stays fresh, per tool method
+TOOL_TTLS = {
+    "qna_medical": 24 * 3600,
+    "find_hospitals": 6 * 3600,
+    "explain_medicines": 12 * 3600,
+    "analyze_report": 3600,
+    "analyze_bill": 3600,
+    "symptom_check": 600,
+    "translate": 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and a byte budget"""
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl, size=1):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CachedAPI:
+    """Wraps an API object so every tool call goes through a TTLCache first.
+
+    Tool methods keep their usual signatures and accept an extra ``file_hash``
+    keyword that only takes part in the cache key.
+    """
+
+    def __init__(self, api, cache=None, ttls=None):
+        self.api = api
+        self.cache = cache or TTLCache()
+        self.ttls = {**TOOL_TTLS, **(ttls or {})}
+
+    @staticmethod
+    def make_key(tool, args, kwargs, file_hash=None):
+        raw = json.dumps([tool, list(args), sorted(kwargs.items()), file_hash],
+                         ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _store(self, key, tool, message):
+        self.cache.set(key, message, self.ttls.get(tool, DEFAULT_TTL),
+                       size=len(message.encode("utf-8")))
+
+    def call(self, tool, *args, file_hash=None, **kwargs):
+        key = self.make_key(tool, args, kwargs, file_hash)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {"success": True, "message": cached, "cached": True}
+        result = getattr(self.api, tool)(*args, **kwargs)
+        if result.get("success") and result.get("message"):
+            self._store(key, tool, result["message"])
+        return result
+
+    def stream(self, tool, *args, file_hash=None, **kwargs):
+        """Streaming call; hits come back as a plain message, misses are cached once fully read"""
+        key = self.make_key(tool, args, kwargs, file_hash)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {"success": True, "message": cached, "cached": True}
+        inner = getattr(self.api, "stream", None)
+        if inner is None:
+            result = getattr(self.api, tool)(*args, **kwargs)
+            if result.get("success") and result.get("message"):
+                self._store(key, tool, result["message"])
+            return result
+        result = inner(tool, *args, **kwargs)
+        if result.get("success") and "stream" in result:
+            result["stream"] = ClosingStream(self._record(key, tool, result["stream"]), result["stream"])
+        return result
+
+    def _record(self, key, tool, chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        if parts:
+            self._store(key, tool, "".join(parts))
+
+    def __getattr__(self, name):
+        if name in TOOL_TTLS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        return getattr(self.api, name)
@@ -0,0 +1,198 @@
+"""Semantic near-duplicate cache for Medical Q&A answers.
+
+The exact-prompt cache in response_cache.py misses rephrasings such as "what
+does high ALT mean" and "what does elevated ALT mean in LFT". Here a question
+is reduced to its sorted key terms (filler dropped, safe synonyms merged; see
+data/qna_terms.csv) and embedded with the hashed n-gram vectorizer of
+text_index, locally and without a network. Each (language, level) partition
+keeps its vectors in one contiguous float32 matrix, searched with a single
+batched matrix product.
+
+A cached answer is reused when its cosine similarity reaches the threshold
+and the key terms are the same, or the new question's terms are a subset of
+the cached one's and none of the cached question's extra terms is a
+population or condition qualifier (child, pregnancy, kidney, ...). Character
+n-grams alone score "ALT" against "ALP" or "paracetamol for a child" against
+"paracetamol" far too high for a medical answer, so a swapped, added or
+dropped qualifier is never a hit.
+"""
+import csv
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from response_cache import TOOL_TTLS
+from text_index import normalize, vectorize
+
+TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "qna_terms.csv")
+DEFAULT_THRESHOLD = 0.85
+SEMANTIC_DIM = 512        # key-term strings are short; the containment check absorbs bucket collisions
+MAX_PARTITION_ENTRIES = 1024
+CANDIDATES = 4
+# who the answer is for or what it depends on: never dropped as filler, never extra context on a hit
+QUALIFIERS = frozenset("""
+    child children kid kids infant infants baby babies newborn neonate neonatal toddler pediatric paediatric
+    adolescent teen teenager adult adults elderly old senior geriatric age aged man men woman women male female
+    pregnant pregnancy trimester breastfeeding lactating lactation nursing postpartum
+    kidney renal ckd dialysis liver hepatic cirrhosis heart cardiac diabetic diabetes asthma epilepsy allergy
+    allergic weight obese
+""".split())
+
+Hit = namedtuple("Hit", "answer question similarity")
+
+
+def load_terms(path=TERMS_PATH):
+    """{term: canonical term or ""}, phrases first so they win over their words"""
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    terms = {normalize(r["term"]): normalize(r["canonical"] or "") for r in rows}
+    return dict(sorted(terms.items(), key=lambda kv: -len(kv[0])))
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")) else word
+
+
+_QUALIFIER_TERMS = frozenset(map(_stem, QUALIFIERS))
+
+
+class QuestionTerms:
+    """Reduces questions to frozensets of key terms"""
+
+    def __init__(self, terms=None):
+        terms = load_terms() if terms is None else terms
+        terms = {t: c for t, c in terms.items() if c or t not in QUALIFIERS}
+        phrases = [t for t in terms if " " in t]
+        self.phrases = re.compile(r"\b(" + "|".join(map(re.escape, phrases)) + r")\b") if phrases else None
+        self.terms = terms
+
+    def __call__(self, question):
+        text = normalize(question)
+        if self.phrases:
+            text = self.phrases.sub(lambda m: self.terms[m.group(1)], text)
+        words = (self.terms.get(word, word) for word in text.split())
+        return frozenset(_stem(word) for word in words if word)
+
+
+def same_question(terms, cached):
+    """Whether a cached answer to key terms cached also answers key terms terms"""
+    return terms == cached or (terms < cached and not (cached - terms) & _QUALIFIER_TERMS)
+
+
+class _Partition:
+    """Vectors, key terms and answers of one (language, level), oldest overwritten first when full"""
+
+    def __init__(self, dim, capacity=16):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.terms, self.questions, self.answers = [None] * capacity, [None] * capacity, [None] * capacity
+        self.slots = {}   # key terms -> row
+        self.count = 0
+        self.next = 0
+
+    def add(self, terms, vector, question, answer, expires, max_entries):
+        row = self.slots.get(terms)
+        if row is None:
+            if self.count == len(self.answers) and self.count < max_entries:
+                self._grow(min(self.count * 2, max_entries))
+            row = self.next
+            if self.terms[row] is not None:
+                del self.slots[self.terms[row]]
+            self.next = (row + 1) % len(self.answers)
+            self.count = max(self.count, row + 1)
+            self.slots[terms] = row
+        self.matrix[row] = vector
+        self.expires[row] = expires
+        self.terms[row], self.questions[row], self.answers[row] = terms, question, answer
+
+    def _grow(self, capacity):
+        extra = capacity - len(self.answers)
+        self.matrix = np.vstack([self.matrix, np.zeros((extra, self.matrix.shape[1]), dtype=np.float32)])
+        self.expires = np.concatenate([self.expires, np.zeros(extra)])
+        for column in (self.terms, self.questions, self.answers):
+            column.extend([None] * extra)
+        self.next = self.count
+
+
+class SemanticCache:
+    """Answers to earlier questions, found by key-term similarity within a (language, level) partition"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl=TOOL_TTLS["qna_medical"], dim=SEMANTIC_DIM,
+                 max_entries=MAX_PARTITION_ENTRIES, terms=None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        self.max_entries = max_entries
+        self.key_terms = QuestionTerms(terms)
+        self._partitions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(threshold=float(os.environ.get("CHRONOCHECK_QNA_SIMILARITY", DEFAULT_THRESHOLD)))
+
+    def _embed(self, term_sets):
+        return vectorize([" ".join(sorted(terms)) for terms in term_sets], dim=self.dim)
+
+    def lookup_many(self, questions, language, level, k=CANDIDATES):
+        """[Hit or None] per question, searching the partition in one batched product"""
+        term_sets = [self.key_terms(q) for q in questions]
+        hits = [None] * len(questions)
+        with self._lock:
+            part = self._partitions.get((language, level))
+            if part is not None and part.count:
+                sims = self._embed(term_sets) @ part.matrix[:part.count].T
+                sims[:, part.expires[:part.count] <= time.monotonic()] = -1.0
+                k = min(k, part.count)
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                for i, terms in enumerate(term_sets):
+                    for row in sorted(top[i], key=lambda r: -sims[i, r]):
+                        other = part.terms[row]
+                        if sims[i, row] < self.threshold:
+                            break
+                        if terms and same_question(terms, other):
+                            hits[i] = Hit(part.answers[row], part.questions[row], float(sims[i, row]))
+                            break
+            found = sum(hit is not None for hit in hits)
+            self.hits += found
+            self.misses += len(questions) - found
+        return hits
+
+    def lookup(self, question, language, level):
+        return self.lookup_many([question], language, level)[0]
+
+    def store(self, question, language, level, answer):
+        terms = self.key_terms(question)
+        if not terms or not answer:
+            return
+        vector = self._embed([terms])[0]
+        with self._lock:
+            part = self._partitions.get((language, level))
+            if part is None:
+                part = self._partitions[(language, level)] = _Partition(self.dim, min(16, self.max_entries))
+            part.add(terms, vector, question, answer, time.monotonic() + self.ttl, self.max_entries)
+
+    def record(self, chunks, question, language, level):
+        """Pass a streamed answer through, storing it once it has been read to the end"""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.store(question, language, level, "".join(parts))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "partitions": len(self._partitions),
+                "entries": sum(p.count for p in self._partitions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,187 @@
+"""JSON-over-HTTP API for the six CHRONOCHECK tools.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000 --workers 4
+
+Each tool is ``POST /v1/<tool>`` with a JSON object whose fields are the
+service method's keyword arguments (see service.py), for example
+
+    POST /v1/qna        {"question": "What is HbA1c?", "language": "Hindi"}
+    POST /v1/bill       {"file": {"name": "bill.pdf", "content_base64": "..."}, "city": "Mumbai"}
+
+Documents are sent inline as {"name", "content_base64", "content_type"} under
+"file" (and "other_files" for the bill audit's other bills), or as plain
+"text". The response is the tool's result: {"success", "message", "error", ...};
+the bill audit adds its itemized "findings" and total "overcharge", and the
+hospital finder the locally ranked "hospitals" the message explains (nearest
+first when a "pincode", and optionally "radius_km", is given); the medicine
+explainer the "interactions" it answered from the local graph. With
+``"stream": true`` the answer arrives as NDJSON: {"chunk": ...} lines, then
+one final line with the result without its message (with "success": false
+and the "error" if the answer broke off partway). The symptom checker's
+local "pre_triage" and the hospital finder's "hospitals" come first, before
+the model has answered. ``POST
+/v1/triage`` takes the same fields as /v1/symptoms and asks only for the
+triage level; send both at once to show the level before the full assessment.
+
+Every worker process holds one ChronoService, so concurrent requests share
+its response cache, in-flight coalescing, connection pool and extraction
+pool. Tool calls are blocking and run on Starlette's thread pool.
+"""
+import base64
+import binascii
+import contextlib
+import json
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from bill_audit import bill_findings, finding_records
+from prompts import DEFAULT_BILL_OPTIONS
+from service import ChronoService, text_document
+from uploads import MAX_UPLOAD_BYTES, NamedUpload, UploadTooLarge
+
+TOOL_METHODS = {"report": "analyze_report", "medicines": "explain_medicines", "bill": "analyze_bill"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def decode_file(payload):
+    """NamedUpload from an inline {"name", "content_base64", "content_type"} object"""
+    if not isinstance(payload, dict) or "content_base64" not in payload:
+        raise BadRequest("file must be an object with name and content_base64")
+    if len(payload["content_base64"]) > MAX_UPLOAD_BYTES * 4 // 3 + 4:
+        raise UploadTooLarge(f"file is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    try:
+        data = base64.b64decode(payload["content_base64"], validate=True)
+    except (binascii.Error, TypeError) as e:
+        raise BadRequest(f"content_base64 is not valid base64: {e}")
+    return NamedUpload(data, payload.get("name") or "upload", payload.get("content_type"))
+
+
+def read_document(service, tool, body, field="file"):
+    if field in body:
+        return service.read_document(decode_file(body[field]), TOOL_METHODS[tool])
+    return text_document(tool, body.get("text", ""))
+
+
+def pick(body, *names):
+    return {name: body[name] for name in names if name in body}
+
+
+def require(body, name):
+    if not str(body.get(name) or "").strip():
+        raise BadRequest(f"{name} is required")
+    return body[name]
+
+
+# tool -> fn(service, body, stream) calling the service method
+HANDLERS = {
+    "qna": lambda service, body, stream: service.qna(
+        require(body, "question"), stream=stream, **pick(body, "level", "language")),
+    "report": lambda service, body, stream: service.report(
+        read_document(service, "report", body), stream=stream,
+        **pick(body, "analysis_focus", "patient_age", "normal_ranges", "recommendations", "risk_flags", "notes",
+               "output_lang")),
+    "hospitals": lambda service, body, stream: service.hospitals(
+        require(body, "query"), stream=stream, **pick(body, "location", "specializations", "preferences", "insurance", "pincode", "radius_km")),
+    "medicines": lambda service, body, stream: service.medicines(
+        read_document(service, "medicines", body) if "file" in body or "text" in body else None, stream=stream,
+        **pick(body, "detail_level", "medicines", "conditions", "sections")),
+    "bill": lambda service, body, stream: service.bill(
+        [read_document(service, "bill", body)]
+        + [service.read_document(decode_file(f), "analyze_bill") for f in body.get("other_files", ())],
+        pick(body, *DEFAULT_BILL_OPTIONS), stream=stream),
+    "symptoms": lambda service, body, stream: service.symptoms(
+        require(body, "symptoms"), stream=stream,
+        **pick(body, "age", "gender", "duration", "severity", "known_conditions", "current_meds")),
+    "triage": lambda service, body, stream: service.symptom_triage(
+        require(body, "symptoms"), stream=stream,
+        **pick(body, "age", "gender", "duration", "severity", "known_conditions", "current_meds")),
+}
+
+
+async def call_tool(request):
+    tool = request.path_params["tool"]
+    if tool not in HANDLERS:
+        return JSONResponse({"success": False, "error": f"unknown tool {tool}"}, status_code=404)
+    try:
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise BadRequest("body must be a JSON object")
+        stream = bool(body.pop("stream", False))
+        result = await run_in_threadpool(HANDLERS[tool], request.app.state.service, body, stream)
+    except UploadTooLarge as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=413)
+    except (BadRequest, json.JSONDecodeError, TypeError) as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    if stream:
+        return StreamingResponse(stream_result(tool, result), media_type="application/x-ndjson")
+    return JSONResponse(result_json(tool, result, result.get("message", "")))
+
+
+async def stream_result(tool, result):
+    """NDJSON chunks of the answer, then the final result; cached answers arrive as one chunk"""
+    parts = []
+    if "pre_triage" in result:
+        yield json.dumps({"pre_triage": result["pre_triage"]}, ensure_ascii=False) + "\n"
+    if tool == "hospitals":
+        yield json.dumps({"hospitals": [h._asdict() for h in result["local"]]}, ensure_ascii=False) + "\n"
+    chunks = result["stream"] if "stream" in result else [result.get("message")] if result.get("message") else []
+    error = None
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            parts.append(chunk)
+            yield json.dumps({"chunk": chunk}, ensure_ascii=False) + "\n"
+    except Exception as e:   # the chunks so far were a partial answer
+        error = str(e)
+    final = result_json(tool, result, "".join(parts))
+    final.pop("message", None)
+    if error is not None:
+        final.update(success=False, error=error)
+    yield json.dumps(final, ensure_ascii=False) + "\n"
+
+
+def result_json(tool, result, message):
+    """JSON-safe response body; the bill audit's local checks become its itemized findings"""
+    body = {k: v for k, v in result.items() if k not in ("stream", "local")}
+    body["message"] = message
+    if tool == "bill":
+        findings = bill_findings(message, result["local"])
+        body["overcharge"] = float(findings["overcharge"].sum())
+        body["findings"] = [{k: v for k, v in r.items() if k != "bill"} for r in finding_records(None, findings)]
+    if tool == "hospitals":
+        body["hospitals"] = [h._asdict() for h in result["local"]]
+    if tool == "medicines" and "local" in result:
+        body["interactions"] = [i._asdict() for i in result["local"].known]
+    return body
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def stats(request):
+    return JSONResponse(request.app.state.service.stats())
+
+
+def create_app(service=None):
+    """The API app; without a service, one is built from the environment at startup"""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.service = service or ChronoService.from_env()
+        yield
+        if service is None:
+            app.state.service.close()
+
+    return Starlette(routes=[
+        Route("/health", health),
+        Route("/v1/stats", stats),
+        Route("/v1/{tool}", call_tool, methods=["POST"]),
+    ], lifespan=lifespan)
+
+
+app = create_app()
@@ -0,0 +1,294 @@
+"""The six CHRONOCHECK tools as an importable service layer.
+
+``ChronoService`` owns everything a tool call needs besides the UI: the
+cached, coalescing backend client, the upload store and extraction pool, the
+bill reference data, and the prompt builders in prompts.py. The Streamlit app,
+batch_runner.py and the HTTP API in server.py all call it, so one process
+shares one set of caches and connections however requests arrive.
+
+Every tool method returns the backend's result dict ({"success", "message",
+"error", ...}). With ``stream=True`` it returns {"success": True, "stream":
+iterator} instead when the backend can stream.
+
+With ``translate`` on, Q&A answers and report analyses in other languages are
+made from the English one by a translation call: the English answer is
+generated once per question (or document and options) and every language
+after that costs one translation, each cached on its own.
+"""
+import os
+from collections import namedtuple
+
+from bill_audit import ReferencePriceIndex, load_bundle_rules
+from drug_interactions import NO_CHECK, InteractionGraph, interaction_markdown
+from extraction import DocumentExtractor
+from hospital_directory import TOP_K, HospitalDirectory
+from prescriptions import MedicineRecognizer, generic_names
+from prompts import (DEFAULT_BILL_OPTIONS, DEFAULT_MEDICINE_SECTIONS, bill_prompt, hospital_query,
+                     hospital_reasoning_prompt, interaction_instruction, medicine_prompt, medicine_section_prompts,
+                     qna_prompt, report_prompt, symptom_prompt,
+                     symptom_triage_prompt, translation_prompt)
+from red_flags import RedFlagMatcher
+from response_cache import CachedAPI
+from semantic_cache import SemanticCache
+from singleflight import ClosingStream, CoalescingAPI
+from uploads import UploadStore, decode_text, hash_upload
+
+# an uploaded document: file name, SHA-256, extracted text ("" if unreadable), backend copy (or None)
+Document = namedtuple("Document", "name digest text file_path")
+
+
+def create_client(fallback=None):
+    """Backend client from the environment: Langflow, then api_integration, then fallback()"""
+    if os.environ.get("LANGFLOW_BASE_URL"):
+        from langflow_client import LangflowClient
+        client = LangflowClient.from_env()
+        if os.environ.get("LANGFLOW_WARMUP") == "1":
+            client.warm_up()
+        return client
+    try:
+        from api_integration import LangflowAPI
+        return LangflowAPI()
+    except ImportError:
+        if fallback is None:
+            raise RuntimeError("No backend configured: set LANGFLOW_BASE_URL (and the LANGFLOW_FLOW_* ids)")
+        return fallback()
+
+
+def prefixed(first, chunks):
+    """A stream that starts with a locally produced chunk"""
+    def stream():
+        yield first
+        yield from chunks
+    return ClosingStream(stream(), chunks)
+
+
+def text_document(name, text):
+    """A Document for text that arrived as text (API bodies, JSONL records)"""
+    return Document(name, None, text or "", None)
+
+
+class ChronoService:
+    """Prompt building, local checks and backend calls for the six tools"""
+
+    def __init__(self, api, uploads=None, extractor=None, price_index=None, bundle_rules=None, answers=None,
+                 translate=False, red_flags=None, directory=None, interactions=None, recognizer=None):
+        self.api = api
+        self.directory = directory or HospitalDirectory.load()
+        self.interactions = interactions or InteractionGraph.load()
+        self.recognizer = recognizer or MedicineRecognizer.load(self.interactions.drugs)
+        self.red_flags = red_flags or RedFlagMatcher()
+        self.translate = translate
+        self.answers = answers or SemanticCache.from_env()
+        self.uploads = uploads or UploadStore()
+        self.extractor = extractor or DocumentExtractor()
+        self.price_index = price_index or ReferencePriceIndex.load()
+        self.bundle_rules = bundle_rules if bundle_rules is not None else load_bundle_rules()
+
+    @classmethod
+    def from_env(cls, fallback=None, **kwargs):
+        client = create_client(fallback)
+        kwargs.setdefault("translate", hasattr(client, "translate")
+                          and os.environ.get("CHRONOCHECK_TRANSLATE_ANSWERS", "1") == "1")
+        return cls(CachedAPI(CoalescingAPI(client)), **kwargs)
+
+    def call(self, tool, *args, stream=False, **kwargs):
+        """One backend call, streaming when asked for and supported"""
+        if stream and hasattr(self.api, "stream"):
+            return self.api.stream(tool, *args, **kwargs)
+        return getattr(self.api, tool)(*args, **kwargs)
+
+    # ---------- documents ----------
+    def extract_text(self, fileobj):
+        """Text of an upload ("" when nothing can be read locally)"""
+        try:
+            if "text" in (fileobj.type or ""):
+                return decode_text(fileobj)
+            return self.extractor.extract(fileobj, fileobj.name, fileobj.type)
+        except Exception:
+            return ""
+
+    def read_document(self, fileobj, tool, digest=None):
+        """Hash and extract an upload once per content; unreadable ones are sent to the backend once"""
+        digest = digest or hash_upload(fileobj)
+        text = self.uploads.text(digest, lambda: self.extract_text(fileobj))
+        file_path = None
+        if not text and hasattr(self.api, "upload_file"):
+            file_path = self.uploads.remote_path(digest, tool, lambda: self.api.upload_file(
+                tool, fileobj, fileobj.name, fileobj.type).get("file_path"))
+        return Document(fileobj.name, digest, text, file_path)
+
+    def translated(self, english, language, stream=False):
+        """An English answer in another language, or None if the translation call fails"""
+        result = self.call("translate", translation_prompt(english, language), stream=stream)
+        if not result.get("success"):
+            return None
+        return {**result, "translated_from": "English"}
+
+    @staticmethod
+    def file_kwargs(document):
+        if document is None or document.digest is None:
+            return {}
+        kwargs = {"file_uploaded": True, "file_name": document.name, "file_hash": document.digest}
+        if document.file_path:
+            kwargs["file_path"] = document.file_path
+        return kwargs
+
+    # ---------- tools ----------
+    def qna(self, question, level="Patient-Friendly", language="English", stream=False):
+        """Answer a question, reusing the answer to an earlier rephrasing of it when there is one"""
+        hit = self.answers.lookup(question, language, level)
+        if hit:
+            return {"success": True, "message": hit.answer, "cached": True,
+                    "similar_question": hit.question, "similarity": hit.similarity}
+        result = None
+        if self.translate and language != "English":
+            english = self.qna(question, level)
+            if not english.get("success"):
+                return english
+            result = self.translated(english["message"], language, stream)
+        if result is None:
+            result = self.call("qna_medical", qna_prompt(question, level, language), stream=stream)
+        if result.get("success") and "stream" in result:
+            result["stream"] = ClosingStream(self.answers.record(result["stream"], question, language, level),
+                                             result["stream"])
+        elif result.get("success") and result.get("message"):
+            self.answers.store(question, language, level, result["message"])
+        return result
+
+    def report(self, document, analysis_focus="Comprehensive", patient_age=35, normal_ranges=True,
+               recommendations=True, risk_flags=True, notes="", output_lang="English", stream=False):
+        if self.translate and output_lang != "English":
+            english = self.report(document, analysis_focus, patient_age, normal_ranges, recommendations,
+                                  risk_flags, notes)
+            if not english.get("success"):
+                return english
+            result = self.translated(english["message"], output_lang, stream)
+            if result is not None:
+                return result
+        message = report_prompt(document.text, analysis_focus, patient_age, normal_ranges,
+                                recommendations, risk_flags, notes, output_lang)
+        return self.call("analyze_report", message, stream=stream, **self.file_kwargs(document))
+
+    def hospitals(self, query, location="Pune", specializations=(), preferences=(), insurance="", pincode="",
+                  radius_km=None, stream=False):
+        """Rank directory hospitals locally and have the model explain the shortlist.
+
+        A pincode in the local centroid file searches around it (within
+        radius_km when given) instead of the location. The ranked hospitals
+        are under "local"; with none found, the model searches on its own as before.
+        """
+        radius_km = float(radius_km) if radius_km else None
+        place = self.directory.locate(pincode)
+        if place is not None:
+            location = f"{place.name}, {place.city} ({place.pincode})" + (f", within {radius_km:g} km" if radius_km else "")
+        shortlist = self.local_hospitals(query, location, specializations, preferences, insurance,
+                                         pincode=pincode, radius_km=radius_km)
+        if shortlist:
+            message = hospital_reasoning_prompt(query, location, shortlist, insurance)
+        else:
+            message = hospital_query(query, location, specializations, preferences, insurance)
+        result = dict(self.call("find_hospitals", message, location, stream=stream))
+        result["local"] = shortlist
+        return result
+
+    def local_hospitals(self, query, location="Pune", specializations=(), preferences=(), insurance="", k=TOP_K,
+                        pincode="", radius_km=None):
+        """Top k directory hospitals with all requested features, then most of them: nearest to pincode when
+        it is known, else in location"""
+        return self.directory.find(location, query, specializations, preferences, insurance, k, pincode, radius_km)
+
+    def recognize(self, medicines):
+        """Prescription rows (name, generics, form, strength, frequency, ...) of the typed medicines"""
+        return self.recognizer.scan(medicines)
+
+    def medicine_interactions(self, document=None, prescription=None):
+        """Pairs among the typed and extracted medicines, the ones in the local graph already answered.
+
+        The check is complete only when every typed item was recognised and there is no document;
+        an upload counts even when nothing could be read from it, a typed-only record does not.
+        """
+        found = generic_names(prescription) if prescription else []
+        has_document = document is not None and bool(document.text or document.digest or document.file_path)
+        if has_document:
+            found += generic_names(self.recognizer.scan(document.text))
+        complete = not has_document and not (prescription and prescription.unrecognised)
+        return self.interactions.check(list(dict.fromkeys(found)), complete)
+
+    @staticmethod
+    def with_interactions(result, check):
+        """Put the locally known interactions ahead of the model's answer"""
+        result = dict(result)
+        result["local"] = check
+        if check.known and result.get("success"):
+            table = f"**⚠️ Interactions checked locally**\n\n{interaction_markdown(check)}\n\n"
+            if "stream" in result:
+                result["stream"] = prefixed(table, result["stream"])
+            else:
+                result["message"] = table + (result.get("message") or "")
+        return result
+
+    def medicines(self, document=None, detail_level="Basic", medicines="", conditions="",
+                  sections=DEFAULT_MEDICINE_SECTIONS, stream=False):
+        """The medicine guide; interaction pairs in the local graph come first and are left out of the request"""
+        prescription = self.recognize(medicines)
+        check = self.medicine_interactions(document, prescription) if "interactions" in sections else NO_CHECK
+        if interaction_instruction(check) is None and set(sections) <= {"interactions"}:
+            return {"success": True, "message": interaction_markdown(check), "local": check}
+        message = medicine_prompt(document.text if document else "", detail_level, medicines, conditions, sections,
+                                  check, prescription)
+        return self.with_interactions(
+            self.call("explain_medicines", message, stream=stream, **self.file_kwargs(document)), check)
+
+    def medicine_section(self, section, document=None, detail_level="Basic", medicines="", conditions="",
+                         stream=False):
+        """One section of the medicine guide as its own, smaller request"""
+        prescription = self.recognize(medicines)
+        check = self.medicine_interactions(document, prescription) if section == "interactions" else NO_CHECK
+        prompts = medicine_section_prompts(document.text if document else "", detail_level,
+                                           medicines, conditions, (section,), check, prescription)
+        if not prompts:
+            return {"success": True, "message": interaction_markdown(check), "local": check}
+        [(_, message)] = prompts
+        return self.with_interactions(
+            self.call("explain_medicines", message, stream=stream, **self.file_kwargs(document)), check)
+
+    def bill(self, documents, options=None, stream=False):
+        """Audit the first document, checking duplicates/unbundling across all of them.
+
+        The result carries the local checks under "local" (see bill_audit.bill_findings).
+        """
+        options = {**DEFAULT_BILL_OPTIONS, **(options or {})}
+        bills = [(d.name, d.text) for d in documents]
+        message, local = bill_prompt(bills, options, self.price_index, self.bundle_rules)
+        result = dict(self.call("analyze_bill", message, stream=stream, **self.file_kwargs(documents[0])))
+        result["local"] = local
+        return result
+
+    def symptoms(self, symptoms, age=30, gender="Male", duration="", severity=5, known_conditions="",
+                 current_meds="", stream=False):
+        """Full triage from the model, with the local red-flag result under pre_triage"""
+        prompt = symptom_prompt(age, gender, symptoms, duration, severity, known_conditions, current_meds)
+        result = dict(self.call("qna_medical", prompt, stream=stream))
+        result["pre_triage"] = self.pre_triage(symptoms, age, severity, known_conditions)._asdict()
+        return result
+
+    def symptom_triage(self, symptoms, age=30, gender="Male", duration="", severity=5, known_conditions="",
+                       current_meds="", stream=False):
+        """Triage level only, a short request to send alongside symptoms() and show first"""
+        prompt = symptom_triage_prompt(age, gender, symptoms, duration, severity, known_conditions, current_meds)
+        return self.call("qna_medical", prompt, stream=stream)
+
+    def pre_triage(self, symptoms, age=30, severity=5, known_conditions=""):
+        """Instant local emergency/urgent classification from red-flag phrases"""
+        return self.red_flags.classify(symptoms, int(severity), int(age), known_conditions)
+
+    def stats(self):
+        stats = {"uploads": self.uploads.stats(), "answers": self.answers.stats()}
+        if hasattr(self.api, "cache"):
+            stats["cache"] = self.api.cache.stats()
+        return stats
+
+    def close(self):
+        self.extractor.shutdown()
+        if hasattr(self.api, "close"):
+            self.api.close()
@@ -0,0 +1,257 @@
+"""Single-flight coalescing of identical in-flight tool calls.
+
+When several Streamlit sessions send the exact same request at the same
+moment, only the first one (the leader) goes upstream; the others block on
+the leader's call and receive the same result. Streamed answers are shared
+too: every caller gets its own reader over one upstream chunk stream.
+"""
+import threading
+import time
+
+TOOL_METHODS = (
+    "qna_medical",
+    "analyze_report",
+    "find_hospitals",
+    "explain_medicines",
+    "analyze_bill",
+    "symptom_check",
+    "translate",
+)
+
+_NOTHING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Run fn once per key among concurrent callers; everyone gets its result.
+
+    Entries older than ``max_age`` seconds are ignored so a wedged call can't
+    hold a key forever.
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def begin(self, key):
+        """Return (call, is_leader) for key, registering a new call if none is in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and time.monotonic() - call.started < self.max_age:
+                call.followers += 1
+                self.shared += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def do(self, key, fn, *args, **kwargs):
+        call, leader = self.begin(key)
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                self.finish(key, call)
+                call.done.set()
+            return call.result
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+class ClosingStream:
+    """Iterator over chunks whose close() also closes source and calls on_close, exactly once.
+
+    Stream wrappers written as generators can't be trusted with cleanup: closing a generator
+    before its first chunk runs none of its code, so the upstream response it wraps would stay
+    open. Ending, failing or closing this iterator always releases what it wraps.
+    """
+
+    def __init__(self, chunks, source=None, on_close=None):
+        self.chunks = chunks
+        self.source = source
+        self.on_close = on_close
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        try:
+            return next(self.chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.chunks.close()
+            close = getattr(self.source, "close", None)
+            if close is not None:
+                close()
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+class SharedStream:
+    """Fan one upstream chunk iterator out to any number of readers.
+
+    Chunks are buffered, so a reader that joins late replays from the start.
+    Whichever reader needs the next chunk first pulls it from upstream; the
+    rest wait on the condition, so an abandoned reader never stalls others.
+    When every reader has been closed before the end, upstream is closed too.
+    """
+
+    def __init__(self, source, on_done=None):
+        self.source = iter(source)
+        self.on_done = on_done
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.pumping = False
+        self.readers = 0
+        self.cond = threading.Condition()
+
+    def reader(self):
+        with self.cond:
+            self.readers += 1
+        return ClosingStream(self._chunks(), on_close=self._leave)
+
+    def _leave(self):
+        with self.cond:
+            self.readers -= 1
+            abandoned = not self.readers and not self.finished
+        if abandoned:
+            self._close()
+
+    def _chunks(self):
+        i = 0
+        while True:
+            chunk = _NOTHING
+            with self.cond:
+                while i >= len(self.chunks) and not self.finished and self.pumping:
+                    self.cond.wait()
+                if i < len(self.chunks):
+                    chunk = self.chunks[i]
+                    i += 1
+                elif self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    self.pumping = True
+            if chunk is not _NOTHING:
+                yield chunk
+                continue
+            self._pump()
+
+    def _pump(self):
+        try:
+            chunk = next(self.source)
+        except StopIteration:
+            self._finish(None)
+        except Exception as e:
+            self._finish(e)
+        else:
+            with self.cond:
+                self.chunks.append(chunk)
+                self.pumping = False
+                self.cond.notify_all()
+
+    def _close(self):
+        close = getattr(self.source, "close", None)
+        if close is not None:
+            close()
+        self._finish(RuntimeError("stream closed by all of its readers"))
+
+    def _finish(self, error):
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.pumping = False
+            self.cond.notify_all()
+        if self.on_done:
+            self.on_done()
+
+
+class CoalescingAPI:
+    """Wraps an API object so identical concurrent tool calls share one upstream call"""
+
+    def __init__(self, api, flight=None):
+        self.api = api
+        self.flight = flight or SingleFlight()
+
+    @staticmethod
+    def make_key(tool, args, kwargs):
+        return (tool, args, tuple(sorted(kwargs.items())))
+
+    def call(self, tool, *args, **kwargs):
+        key = self.make_key(tool, args, kwargs)
+        return self.flight.do(key, getattr(self.api, tool), *args, **kwargs)
+
+    def stream(self, tool, *args, **kwargs):
+        key = ("stream",) + self.make_key(tool, args, kwargs)
+        call, leader = self.flight.begin(key)
+        if leader:
+            try:
+                inner = getattr(self.api, "stream", None)
+                if inner is None:
+                    result = getattr(self.api, tool)(*args, **kwargs)
+                else:
+                    result = inner(tool, *args, **kwargs)
+                if "stream" in result:
+                    # keep the key in flight until upstream is drained so late joiners share it
+                    result["stream"] = SharedStream(result["stream"],
+                                                    on_done=lambda: self.flight.finish(key, call))
+                else:
+                    self.flight.finish(key, call)
+                call.result = result
+            except BaseException as e:
+                call.error = e
+                self.flight.finish(key, call)
+                raise
+            finally:
+                call.done.set()
+        else:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+        result = dict(call.result)
+        if isinstance(result.get("stream"), SharedStream):
+            result["stream"] = result["stream"].reader()
+        return result
+
+    def __getattr__(self, name):
+        if name in TOOL_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        return getattr(self.api, name)
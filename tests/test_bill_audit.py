@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from bill_audit import (ReferencePriceIndex, bill_findings, line_item_checks, load_bundle_rules, parse_bill_lines,
+                        rate_check)
+from prompts import DEFAULT_BILL_OPTIONS, bill_prompt
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ReferencePriceIndex.load()
+
+
+def priced(text, index, city="Mumbai", hospital_type="Private"):
+    lines = parse_bill_lines(text)
+    return index.audit(lines.names, lines.amounts, city, hospital_type, quantities=lines.quantities,
+                       packs=lines.packs)
+
+
+def test_multi_day_room_rent_is_priced_per_day(index):
+    audit = priced("Semi-Private Room Rent 3 days 12000", index)
+    assert audit["matched"][0]
+    assert audit["reference"][0] == 3 * 4000
+    assert audit["overcharge"][0] == 0
+
+
+def test_multiplied_lines_are_priced_per_unit(index):
+    audit = priced("ICU Bed Charges x 2 16000\nTab. Paracetamol 500mg 2 strips 40", index)
+    assert audit["matched"].all()
+    assert audit["quantity"].tolist() == [2, 2]
+    assert audit["overcharge"].tolist() == [0, 0]
+
+
+def test_single_units_of_a_strip_priced_item(index):
+    audit = priced("Tab. Paracetamol 500mg 10 tabs 20", index)
+    assert audit["matched"][0] and audit["quantity"][0] == 1
+    assert audit["overcharge"][0] == 0
+
+
+def test_quantity_column_of_a_table_row(index):
+    lines = parse_bill_lines("| 1 | ICU Bed Charges | 3 | 8000 | 24000 |\n| 2 | ECG | 2 | 900 |")
+    assert lines.quantities[0] == 3
+    assert lines.quantities[1] == 0   # qty or rate? can't tell
+    audit = priced("| 1 | ICU Bed Charges | 3 | 8000 | 24000 |", index)
+    assert audit["reference"][0] == 24000 and audit["overcharge"][0] == 0
+
+
+def test_unknown_quantity_is_left_to_the_model(index):
+    text = "Semi-Private Room Rent 12000\n| 2 | ECG | 2 | 900 |\nComplete Blood Count (CBC) 1500"
+    audit = priced(text, index)
+    assert audit["matched"].tolist() == [False, False, True]
+    rows, overcharge, remaining = rate_check(text, "Mumbai", "Private", index)
+    assert overcharge == 300
+    assert "Semi-Private Room Rent 12000" in remaining.split("\n\n")[0]
+    assert "| 2 | ECG | 2 | 900 |" in remaining.split("\n\n")[0]
+
+
+def test_quantities_default_to_not_stated():
+    lines = parse_bill_lines("Complete Blood Count (CBC) 1200")
+    assert np.isnan(lines.quantities[0]) and not lines.packs[0]
+
+
+def duplicate_items(text):
+    return line_item_checks([("bill.pdf", text)], True, False, load_bundle_rules())["item"]
+
+
+def test_daily_charges_on_different_dates_are_not_duplicates():
+    bill = ("12/03/2024 | Inj. Ceftriaxone 1g | 450\n13/03/2024 | Inj. Ceftriaxone 1g | 450\n"
+            "Day 1: Monitoring Charges 1500\nDay 2: Monitoring Charges 1500\n14-Mar-2024 | Inj Ceftriaxone 1 g | 450")
+    assert duplicate_items(bill) == []
+
+
+def test_same_charge_twice_on_one_date_is_a_duplicate():
+    bill = "12/03/2024 | Inj. Ceftriaxone 1g | 450\n12-03-24 | Inj. Ceftriaxone 1g | 450\n12/03/2024 | Room Rent | 4000\n" \
+           "12 Mar 2024 | Room Rent | 4000"
+    assert duplicate_items(bill) == ["Inj. Ceftriaxone 1g", "Room Rent"]
+
+
+def test_undated_repeats_flag_all_but_per_day_categories():
+    bill = "MRI Brain 8500\nICU Charges 8000\nMRI Brain 8500\nICU Charges 8000\nOxygen Charges 600\nOxygen Charges 600"
+    assert duplicate_items(bill) == ["MRI Brain"]
+
+
+def test_duplicated_overpriced_line_keeps_the_first_lines_rate_finding(index):
+    bill = "Complete Blood Count (CBC) 1500\nComplete Blood Count (CBC) 1500"
+    options = {**DEFAULT_BILL_OPTIONS, "city": "Mumbai", "hospital_type": "Private"}
+    _, local = bill_prompt([("bill.pdf", bill)], options, index, load_bundle_rules())
+    assert local["local_overcharge"] == 600
+    findings = bill_findings("", local)
+    # line 1 is ₹300 over the ₹1200 reference; line 2 repeats it and is overcharged in full
+    assert findings["line"] == [(0, 1), (0, 2)]
+    assert list(findings["overcharge"]) == [300, 1500]
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from extraction import DocumentExtractor
+
+
+@pytest.fixture
+def extractor():
+    extractor = DocumentExtractor(max_workers=1)
+    yield extractor
+    extractor.shutdown()
+
+
+def test_hung_worker_is_terminated_and_the_pool_replaced(extractor):
+    extractor._run([(abs, -1)], 30)   # wait out worker start-up
+    old = extractor.pool
+    workers = list(old._processes.values())
+    began = time.monotonic()
+    assert isinstance(extractor._run([(time.sleep, 60)], 0.5)[0], FutureTimeout)
+    assert time.monotonic() - began < 10
+    assert extractor.recycled == 1 and extractor.pool is not old
+    for worker in workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+    assert extractor._run([(abs, -3)], 30) == [3]
+
+
+def test_deadline_is_shared_from_submission(extractor):
+    extractor._run([(abs, -1)], 30)
+    # one worker runs them back to back: the second overruns the shared deadline
+    outcomes = extractor._run([(time.sleep, 0.8), (time.sleep, 0.8)], 1.2)
+    assert outcomes[0] is None and isinstance(outcomes[1], FutureTimeout)
+
+
+def test_errors_are_returned_not_raised(extractor):
+    [error] = extractor._run([(int, "not a number")], 30)
+    assert isinstance(error, ValueError)
+    assert extractor.recycled == 0
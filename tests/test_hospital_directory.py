@@ -0,0 +1,31 @@
+import os
+import shutil
+
+import pytest
+
+from hospital_directory import HOSPITALS_PATH, TERMS_PATH, HospitalDirectory, load_terms
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    shutil.copy(HOSPITALS_PATH, path)
+    return str(path)
+
+
+def test_save_leaves_only_the_finished_archive(csv_path):
+    compiled = csv_path[:-4] + ".npz"
+    HospitalDirectory._load(csv_path, load_terms(TERMS_PATH))
+    assert sorted(os.listdir(os.path.dirname(csv_path))) == ["hospitals.csv", "hospitals.npz"]
+    directory = HospitalDirectory.read(compiled, load_terms(TERMS_PATH))
+    assert len(directory.columns["name"]) == len(HospitalDirectory.from_csv(csv_path).columns["name"])
+
+
+def test_truncated_archive_is_recompiled(csv_path):
+    terms = load_terms(TERMS_PATH)
+    compiled = csv_path[:-4] + ".npz"
+    expected = len(HospitalDirectory._load(csv_path, terms).columns["name"])
+    with open(compiled, "r+b") as f:   # what a reader saw mid-write before saves were atomic
+        f.truncate(os.path.getsize(compiled) // 2)
+    assert len(HospitalDirectory._load(csv_path, terms).columns["name"]) == expected
+    assert len(HospitalDirectory.read(compiled, terms).columns["name"]) == expected
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from jobs import DONE, FAILED, JobQueue
+from langflow_client import LangflowClient, StreamError
+from singleflight import CoalescingAPI
+
+TOKENS = [{"event": "token", "data": {"chunk": "Paracetamol is "}}, {"event": "token", "data": {"chunk": "safe "}}]
+END = {"event": "end", "data": {}}
+
+
+class BreakingStream(BaseHTTPRequestHandler):
+    """Streams two tokens, then fails the way self.server.failure says"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.failure == "slow head":   # answers only after the caller has given up
+            self.server.arrived.set()
+            time.sleep(0.5)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        lines = [json.dumps(e) for e in TOKENS]
+        lines += {"drop": [], "bad json": ["{not json"], "no end": [], "complete": [json.dumps(END)],
+                  "slow head": [json.dumps(END)]}[self.server.failure]
+        for line in lines:
+            data = (line + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+        if self.server.failure != "drop":
+            self.wfile.write(b"0\r\n\r\n")   # a well-formed end of the body
+        self.close_connection = True         # "drop": the connection goes away mid-body
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BreakingStream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = LangflowClient(f"http://127.0.0.1:{server.server_address[1]}", {"qna": "flow-qna"})
+    client.server = server
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("failure", ["drop", "bad json", "no end"])
+def test_stream_failing_partway_fails_the_job_with_partial_text(client, failure):
+    client.server.failure = failure
+    queue = JobQueue(max_workers=1)
+    job = queue.submit(client.stream, "qna_medical", "Is paracetamol safe?")
+    assert job.wait_done(timeout=10)
+    assert job.status == FAILED
+    assert job.result["success"] is False
+    assert job.result["error"] == job.error and "Langflow stream" in job.error
+    assert job.result["message"] == job.text == "Paracetamol is safe "
+
+
+def test_iterator_raises_stream_error(client):
+    client.server.failure = "drop"
+    result = client.stream("qna_medical", "Is paracetamol safe?")
+    chunks = []
+    with pytest.raises(StreamError):
+        for chunk in result["stream"]:
+            chunks.append(chunk)
+    assert chunks == ["Paracetamol is ", "safe "]
+
+
+def test_complete_stream_succeeds(client):
+    client.server.failure = "complete"
+    queue = JobQueue(max_workers=1)
+    job = queue.submit(client.stream, "qna_medical", "Is paracetamol safe?")
+    assert job.wait_done(timeout=10)
+    assert job.status == DONE and job.result["success"] and job.text == "Paracetamol is safe "
+
+
+def test_cancel_before_the_stream_head_releases_the_response(client):
+    client.server.failure = "slow head"
+    client.server.arrived = threading.Event()
+    responses = []
+    client.session.hooks["response"].append(lambda resp, *args, **kwargs: responses.append(resp))
+    api = CoalescingAPI(client)
+    job = JobQueue(max_workers=1).submit(api.stream, "qna_medical", "Is paracetamol safe?")
+    assert client.server.arrived.wait(timeout=10)
+    job.cancel()   # e.g. the full assessment came from the cache before the quick triage's head
+    deadline = time.monotonic() + 10
+    while not (responses and responses[0].raw.closed and api.flight.stats()["in_flight"] == 0):
+        assert time.monotonic() < deadline, "the streamed response was never released"
+        time.sleep(0.05)
@@ -0,0 +1,67 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from langflow_client import LangflowClient
+
+ANSWER = {"outputs": [{"outputs": [{"results": {"message": {"text": "stub answer"}}}]}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "stream=true" in self.path:
+            events = [{"event": "token", "data": {"chunk": "stub "}}, {"event": "token", "data": {"chunk": "answer"}},
+                      {"event": "end", "data": {}}]
+            body = "".join(json.dumps(e) + "\n" for e in events).encode()
+        else:
+            body = json.dumps(ANSWER).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.connections, server.lock = 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server):
+    return LangflowClient(f"http://127.0.0.1:{server.server_address[1]}", {"qna": "flow-qna"})
+
+
+def test_calls_reuse_one_connection(stub):
+    client = client_for(stub)
+    for i in range(5):
+        assert client.qna_medical(f"question {i}") == {"success": True, "message": "stub answer"}
+    client.close()
+    assert stub.connections == 1
+
+
+def test_streamed_calls_reuse_one_connection(stub):
+    client = client_for(stub)
+    for i in range(5):
+        result = client.stream("qna_medical", f"question {i}")
+        assert "".join(result["stream"]) == "stub answer"
+        assert client.qna_medical(f"question {i}")["success"]
+    client.close()
+    assert stub.connections == 1
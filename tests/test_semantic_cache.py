@@ -0,0 +1,25 @@
+from semantic_cache import SemanticCache
+
+ADULT = "what is the normal dose of paracetamol for adults"
+CHILD = "what is the normal dose of paracetamol for a child"
+
+
+def test_rephrased_question_hits():
+    cache = SemanticCache()
+    cache.store("what does high ALT mean", "English", "Patient-Friendly", "ALT answer")
+    hit = cache.lookup("what does elevated ALT mean in LFT", "English", "Patient-Friendly")
+    assert hit is not None and hit.answer == "ALT answer"
+
+
+def test_child_dose_never_reuses_adult_answer():
+    cache = SemanticCache()
+    cache.store(ADULT, "English", "Patient-Friendly", "adult dose")
+    cache.store("what is the normal dose of paracetamol", "English", "Patient-Friendly", "general dose")
+    assert cache.lookup(CHILD, "English", "Patient-Friendly") is None
+
+
+def test_qualified_answer_not_reused_for_general_question():
+    cache = SemanticCache()
+    cache.store(CHILD, "English", "Patient-Friendly", "child dose")
+    assert cache.lookup("what is the normal dose of paracetamol", "English", "Patient-Friendly") is None
+    assert cache.lookup(ADULT, "English", "Patient-Friendly") is None
@@ -0,0 +1,40 @@
+import pytest
+
+from service import ChronoService, Document, text_document
+
+TYPED = "Tab Warfarin 5mg OD, Tab Aspirin 75mg OD"
+
+
+class NoBackend:
+    """Fails the test if the medicine guide reaches the model"""
+
+    def explain_medicines(self, *args, **kwargs):
+        raise AssertionError("the model was asked for interactions the local graph answers")
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = ChronoService(NoBackend())
+    yield service
+    service.close()
+
+
+def test_typed_only_record_is_a_complete_local_check(service):
+    check = service.medicine_interactions(text_document("medicine", ""), service.recognize(TYPED))
+    assert check.complete and len(check.known) == 1 and not check.unknown
+
+
+def test_typed_only_interactions_are_answered_locally(service):
+    result = service.medicines(text_document("medicine", ""), medicines=TYPED, sections=("interactions",))
+    assert result["success"] and result["local"].complete and "Warfarin" in result["message"]
+
+
+def test_unreadable_upload_leaves_the_check_incomplete(service):
+    upload = Document("prescription.jpg", "digest", "", None)
+    assert not service.medicine_interactions(upload, service.recognize(TYPED)).complete
+
+
+def test_document_medicines_are_checked_too(service):
+    document = text_document("medicine", "Tab Metformin 500mg BD")
+    check = service.medicine_interactions(document, service.recognize(TYPED))
+    assert "Metformin" in check.medicines and not check.complete
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import CoalescingAPI, SingleFlight
+
+CALLERS = 8
+
+
+class SlowStub:
+    """Upstream that holds each call until every caller has joined it"""
+
+    def __init__(self, flight, fail=False, chunks=("one ", "two ", "three")):
+        self.flight = flight
+        self.fail = fail
+        self.chunks = chunks
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _wait_for_followers(self):
+        with self.lock:
+            self.calls += 1
+        deadline = time.monotonic() + 5
+        while self.flight.stats()["shared"] < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def qna_medical(self, question):
+        self._wait_for_followers()
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return {"success": True, "message": f"answer to {question}"}
+
+    def stream(self, tool, question):
+        self._wait_for_followers()
+        return {"success": True, "stream": self._chunks()}
+
+    def _chunks(self):
+        for i, chunk in enumerate(self.chunks):
+            time.sleep(0.01)
+            if self.fail and i == 1:
+                raise ConnectionError("stream dropped")
+            yield chunk
+
+
+def concurrently(fn):
+    """Outcomes (result or exception) of CALLERS simultaneous calls of fn"""
+    start = threading.Barrier(CALLERS)
+
+    def run():
+        start.wait()
+        try:
+            return fn()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        return list(pool.map(lambda _: run(), range(CALLERS)))
+
+
+def test_identical_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    stub = SlowStub(flight)
+    api = CoalescingAPI(stub, flight)
+    results = concurrently(lambda: api.qna_medical("what is HbA1c?"))
+    assert stub.calls == 1
+    assert all(r is results[0] for r in results)
+    assert results[0] == {"success": True, "message": "answer to what is HbA1c?"}
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": CALLERS - 1}
+
+
+def test_upstream_error_reaches_every_caller():
+    flight = SingleFlight()
+    stub = SlowStub(flight, fail=True)
+    api = CoalescingAPI(stub, flight)
+    errors = concurrently(lambda: api.qna_medical("what is HbA1c?"))
+    assert stub.calls == 1
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_shared_stream_fans_out_to_every_caller():
+    flight = SingleFlight()
+    stub = SlowStub(flight)
+    api = CoalescingAPI(stub, flight)
+    texts = concurrently(lambda: "".join(api.stream("qna_medical", "what is HbA1c?")["stream"]))
+    assert stub.calls == 1
+    assert texts == ["one two three"] * CALLERS
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_shared_stream_error_reaches_every_reader():
+    flight = SingleFlight()
+    stub = SlowStub(flight, fail=True)
+    api = CoalescingAPI(stub, flight)
+    outcomes = concurrently(lambda: "".join(api.stream("qna_medical", "what is HbA1c?")["stream"]))
+    assert stub.calls == 1
+    assert all(isinstance(o, ConnectionError) for o in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_calls_are_not_coalesced():
+    flight = SingleFlight()
+    api = CoalescingAPI(type("Echo", (), {"qna_medical": lambda self, q: {"success": True, "message": q}})(), flight)
+    assert api.qna_medical("a")["message"] == "a"
+    assert api.qna_medical("b")["message"] == "b"
+    assert flight.stats()["leaders"] == 2
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_late_reader_replays_the_stream(fail):
+    flight = SingleFlight()
+    stub = SlowStub(flight, fail=fail)
+    flight.shared = CALLERS   # don't wait for followers
+    api = CoalescingAPI(stub, flight)
+    first = api.stream("qna_medical", "q")["stream"]
+    assert next(first) == "one "
+    second = api.stream("qna_medical", "q")["stream"]
+    if fail:
+        with pytest.raises(ConnectionError):
+            list(first)
+        with pytest.raises(ConnectionError):
+            list(second)
+    else:
+        assert "".join(second) == "one two three"
+        assert "".join(first) == "two three"
+    assert stub.calls == 1
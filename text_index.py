@@ -0,0 +1,58 @@
+"""CPU-only fuzzy text matching with hashed character n-grams.
+
+Texts are turned into L2-normalised bag-of-n-gram vectors using a stable
+hash (crc32) into a fixed number of buckets, so no vocabulary or network is
+needed. Vectors live in one contiguous float32 matrix and queries are scored
+in a single batched matrix product.
+"""
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_DIM = 2048
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text):
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def ngram_buckets(text, n=3, dim=DEFAULT_DIM):
+    """Hash buckets of the character n-grams of " text " (word boundaries count)"""
+    padded = f" {normalize(text)} "
+    if len(padded) < n:
+        return [zlib.crc32(padded.encode("utf-8")) % dim]
+    return [zlib.crc32(padded[i:i + n].encode("utf-8")) % dim for i in range(len(padded) - n + 1)]
+
+
+def vectorize(texts, n=3, dim=DEFAULT_DIM):
+    """(len(texts), dim) float32 matrix of unit-length n-gram count vectors"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        np.add.at(matrix[row], ngram_buckets(text, n, dim), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class NgramIndex:
+    """Cosine top-k search over a fixed list of texts"""
+
+    def __init__(self, texts, n=3, dim=DEFAULT_DIM):
+        self.texts = list(texts)
+        self.n = n
+        self.dim = dim
+        self.matrix = vectorize(self.texts, n, dim)
+
+    def search(self, queries, k=1):
+        """(scores, indices), each of shape (len(queries), k), best match first"""
+        if not self.texts or not len(queries):
+            return (np.zeros((len(queries), 0), dtype=np.float32),
+                    np.zeros((len(queries), 0), dtype=np.int64))
+        sims = vectorize(queries, self.n, self.dim) @ self.matrix.T
+        k = min(k, sims.shape[1])
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
@@ -0,0 +1,229 @@
+"""Content-addressed, bounded-memory handling of uploaded documents.
+
+Uploads are identified by the SHA-256 of their bytes. Work derived from an
+upload (extracted text, the backend's copy of the file) is kept in a
+process-wide store under that hash, so re-clicking or changing an option
+never re-reads, re-extracts or re-sends the same document. Analysis results
+for a given option set are cached by ``response_cache.CachedAPI`` under the
+same hash.
+
+Every pass over the bytes walks a memoryview in CHUNK_SIZE slices: the
+Streamlit upload buffer is viewed in place and files on disk are mmapped, so
+hashing, decoding, base64 and multipart encoding never hold a second full
+copy of the document.
+
+Extraction is the one step whose memory depends on the document rather than
+on the chunk size, so it runs in worker processes whose address space is
+capped at MAX_EXTRACT_MEMORY_BYTES above their size at startup (see
+limit_address_space); an upload that needs more fails its extraction and is
+sent to the model instead. The store records how much the current RSS of this
+process grew around each extraction.
+"""
+import base64
+import codecs
+import hashlib
+import io
+import mimetypes
+import mmap
+import os
+import resource
+import uuid
+import zipfile
+from contextlib import contextmanager
+
+from response_cache import TTLCache
+from singleflight import SingleFlight
+
+CHUNK_SIZE = 1024 * 1024
+TEXT_TTL = 6 * 3600
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024   # matches the "Max 200MB" the UI advertises
+MAX_TEXT_BYTES = 2 * 1024 * 1024       # decoded text beyond this never fits a prompt anyway
+MAX_ZIP_MEMBERS = 500
+MAX_EXTRACT_MEMORY_BYTES = int(os.environ.get("CHRONOCHECK_MAX_EXTRACT_MB", "768")) * 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@contextmanager
+def upload_view(fileobj):
+    """Zero-copy memoryview over an upload: the in-memory buffer, or an mmap of a real file"""
+    size = os.fstat(fileobj.fileno()).st_size if _has_fileno(fileobj) else None
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"upload is {size} bytes, limit is {MAX_UPLOAD_BYTES}")
+    if hasattr(fileobj, "getbuffer"):
+        view = fileobj.getbuffer()
+    elif size:
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+    else:
+        view = memoryview(fileobj.read())
+    try:
+        if len(view) > MAX_UPLOAD_BYTES:
+            raise UploadTooLarge(f"upload is {len(view)} bytes, limit is {MAX_UPLOAD_BYTES}")
+        yield view
+    finally:
+        view.release()
+        if not hasattr(fileobj, "getbuffer") and size:
+            mapped.close()
+
+
+class NamedUpload(io.BytesIO):
+    """In-memory file with the name/type/size attributes of a Streamlit upload"""
+
+    def __init__(self, data, name, content_type=None):
+        super().__init__(data)
+        self.name = name
+        self.type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.size = len(data)
+
+
+def iter_zip_uploads(fileobj, suffixes, max_members=MAX_ZIP_MEMBERS):
+    """Files with one of suffixes inside a zip upload, one at a time, each within MAX_UPLOAD_BYTES"""
+    with zipfile.ZipFile(fileobj) as archive:
+        members = [m for m in archive.infolist()
+                   if not m.is_dir() and m.filename.lower().endswith(suffixes)
+                   and not os.path.basename(m.filename).startswith(".")]
+        if len(members) > max_members:
+            raise UploadTooLarge(f"zip holds {len(members)} files, limit is {max_members}")
+        for member in members:
+            if member.file_size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"{member.filename} is {member.file_size} bytes, limit is {MAX_UPLOAD_BYTES}")
+            yield NamedUpload(archive.read(member), os.path.basename(member.filename))
+
+
+def _has_fileno(fileobj):
+    try:
+        fileobj.fileno()
+        return True
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def iter_chunks(view, chunk_size=CHUNK_SIZE):
+    """Consecutive slices of view; each slice is released once the consumer moves on"""
+    for start in range(0, len(view), chunk_size):
+        with view[start:start + chunk_size] as chunk:
+            yield chunk
+
+
+def hash_upload(fileobj, chunk_size=CHUNK_SIZE):
+    """SHA-256 of an upload, fed slice by slice from a zero-copy view"""
+    digest = hashlib.sha256()
+    with upload_view(fileobj) as view:
+        for chunk in iter_chunks(view, chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def decode_text(fileobj, max_bytes=MAX_TEXT_BYTES, chunk_size=CHUNK_SIZE):
+    """UTF-8 text of an upload, decoded incrementally and capped at max_bytes of input"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts = []
+    with upload_view(fileobj) as view, view[:max_bytes] as head:
+        for chunk in iter_chunks(head, chunk_size):
+            parts.append(decoder.decode(chunk))
+        truncated = len(view) > max_bytes
+    parts.append(decoder.decode(b"", final=True))
+    if truncated:
+        parts.append(f"\n[... truncated after {max_bytes // 1024} KB]")
+    return "".join(parts)
+
+
+def iter_base64(fileobj, chunk_size=CHUNK_SIZE):
+    """Base64 of an upload as a stream of ASCII chunks instead of one large string"""
+    chunk_size -= chunk_size % 3  # whole 3-byte groups keep chunks independently decodable
+    with upload_view(fileobj) as view:
+        for chunk in iter_chunks(view, chunk_size):
+            yield base64.b64encode(chunk)
+
+
+def iter_multipart(fileobj, file_name, content_type, boundary, field="file", chunk_size=CHUNK_SIZE):
+    """multipart/form-data body for one file, generated chunk by chunk"""
+    yield (f"--{boundary}\r\n"
+           f'Content-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'
+           f"Content-Type: {content_type or 'application/octet-stream'}\r\n\r\n").encode("utf-8")
+    with upload_view(fileobj) as view:
+        for chunk in iter_chunks(view, chunk_size):
+            yield bytes(chunk)
+    yield f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+def new_boundary():
+    return f"chronocheck-{uuid.uuid4().hex}"
+
+
+def _statm(field):
+    """A /proc/self/statm field in bytes (0: address space, 1: resident), or None without /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[field]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def current_rss_bytes():
+    """Resident set size of this process right now, or None where it can't be read"""
+    return _statm(1)
+
+
+def limit_address_space(extra=MAX_EXTRACT_MEMORY_BYTES):
+    """Cap this process's address space at its current size plus extra; allocations beyond raise MemoryError.
+
+    Meant as the initializer of extraction worker processes. Returns whether the limit was set.
+    """
+    size = _statm(0)
+    if size is None:
+        return False
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = size + extra if hard == resource.RLIM_INFINITY else min(size + extra, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+class UploadStore:
+    """Extracted text and backend file paths per upload hash, shared by every session"""
+
+    def __init__(self, max_entries=256, max_bytes=128 * 1024 * 1024):
+        self.texts = TTLCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.remote_paths = TTLCache(max_entries=max_entries)
+        self.flight = SingleFlight()
+        self.last_rss_growth = 0   # bytes the current RSS grew around the latest extraction
+        self.max_rss_growth = 0
+
+    def text(self, digest, extract):
+        """Extracted text for digest, running extract() only on the first request"""
+        if digest is None:
+            return ""
+        cached = self.texts.get(digest)
+        if cached is not None:
+            return cached
+        return self.flight.do(digest, self._extract, digest, extract)
+
+    def _extract(self, digest, extract):
+        before = current_rss_bytes()
+        text = extract()
+        after = current_rss_bytes()
+        if before is not None and after is not None:
+            self.last_rss_growth = max(after - before, 0)
+            self.max_rss_growth = max(self.max_rss_growth, self.last_rss_growth)
+        self.texts.set(digest, text, TEXT_TTL, size=len(text.encode("utf-8")))
+        return text
+
+    def remote_path(self, digest, tool, upload):
+        """Backend path of an upload for a tool, running upload() only on the first request"""
+        key = (digest, tool)
+        cached = self.remote_paths.get(key)
+        if cached is not None:
+            return cached
+        path = self.flight.do(key, upload)
+        if path:
+            self.remote_paths.set(key, path, TEXT_TTL)
+        return path
+
+    def stats(self):
+        return {**self.texts.stats(), "last_rss_growth": self.last_rss_growth, "max_rss_growth": self.max_rss_growth}